@@ -6,12 +6,15 @@ import sys
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, backend_dir)
 #Import the Base from your models package
-from database import Base, SQLALCHEMY_DATABASE_URL
+from database import SQLALCHEMY_DATABASE_URL
 from models.base import Base
 from models.user import User
 from models.transaction import Transaction
 from models.daily_expense import DailyExpense
 from models.bill_of_lading import BillOfLading, BOLVehicle
+from models.work_order_payment import WorkOrderPayment
+from models.signature_blob import SignatureBlob
+from models.analytics_rollup import AnalyticsRollup
 
 from logging.config import fileConfig
 
@@ -36,6 +39,16 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Database-maintained objects that are not mapped on the models
+UNMAPPED_OBJECTS = {
+    ("column", "search_vector"),
+    ("index", "ix_bill_of_lading_search_vector"),
+    ("index", "ix_bill_of_lading_search_text_trgm"),
+}
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and (type_, name) in UNMAPPED_OBJECTS)
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -57,6 +70,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -82,7 +96,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
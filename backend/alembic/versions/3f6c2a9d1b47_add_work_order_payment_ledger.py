@@ -0,0 +1,64 @@
+"""Add work order payment ledger
+
+Revision ID: 3f6c2a9d1b47
+Revises: 895ccc679cdb
+Create Date: 2026-10-17 09:12:03.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d1b47'
+down_revision = '895ccc679cdb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('work_order_payments',
+    sa.Column('bol_id', sa.Integer(), nullable=False),
+    sa.Column('work_order_no', sa.String(length=50), nullable=True),
+    sa.Column('total_amount', sa.Float(), nullable=True),
+    sa.Column('total_collected', sa.Float(), nullable=False),
+    sa.Column('due_amount', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=True),
+    sa.Column('last_payment_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['bol_id'], ['bill_of_lading.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bol_id')
+    )
+    op.create_index(op.f('ix_work_order_payments_work_order_no'), 'work_order_payments', ['work_order_no'], unique=False)
+    op.create_index(op.f('ix_work_order_payments_status'), 'work_order_payments', ['status'], unique=False)
+
+    # Backfill the ledger from existing transactions
+    op.execute("""
+        INSERT INTO work_order_payments
+            (bol_id, work_order_no, total_amount, total_collected, due_amount, status, last_payment_at)
+        SELECT
+            b.id,
+            b.work_order_no,
+            b.total_amount,
+            COALESCE(t.total_collected, 0),
+            COALESCE(b.total_amount, 0) - COALESCE(t.total_collected, 0),
+            CASE
+                WHEN b.total_amount IS NULL THEN NULL
+                WHEN COALESCE(t.total_collected, 0) >= b.total_amount THEN 'paid'
+                ELSE 'pending'
+            END,
+            t.last_payment_at
+        FROM bill_of_lading b
+        LEFT OUTER JOIN (
+            SELECT work_order_no,
+                   SUM(collected_amount) AS total_collected,
+                   MAX(date) AS last_payment_at
+            FROM transactions
+            GROUP BY work_order_no
+        ) t ON t.work_order_no = b.work_order_no
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_work_order_payments_status'), table_name='work_order_payments')
+    op.drop_index(op.f('ix_work_order_payments_work_order_no'), table_name='work_order_payments')
+    op.drop_table('work_order_payments')
@@ -0,0 +1,158 @@
+"""Move BOL signatures into a content-addressed blob store
+
+Revision ID: 7c1e4b8f2a90
+Revises: 3f6c2a9d1b47
+Create Date: 2026-10-17 11:40:27.905112
+
+"""
+import base64
+import binascii
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4b8f2a90'
+down_revision = '3f6c2a9d1b47'
+branch_labels = None
+depends_on = None
+
+# BOLs processed per batch while moving signatures
+BATCH_SIZE = 500
+
+SIGNATURE_FIELDS = ('pickup_signature', 'delivery_signature', 'receiver_signature')
+
+# Kept local to the migration so later changes to the app cannot alter it
+_DATA_URL = re.compile(r"^data:([\w.+-]+/[\w.+-]+);base64,(.*)$", re.DOTALL)
+
+signature_blobs = sa.table(
+    'signature_blobs',
+    sa.column('sha256', sa.String),
+    sa.column('content_type', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('size', sa.Integer),
+)
+
+bill_of_lading = sa.table(
+    'bill_of_lading',
+    sa.column('id', sa.Integer),
+    *[sa.column(field, sa.Text) for field in SIGNATURE_FIELDS],
+    *[sa.column(f'{field}_sha256', sa.String) for field in SIGNATURE_FIELDS],
+)
+
+
+def _encode(value):
+    match = _DATA_URL.match(value)
+    if match:
+        try:
+            return match.group(1), base64.b64decode(match.group(2), validate=True)
+        except (binascii.Error, ValueError):
+            pass
+    return None, value.encode('utf-8')
+
+
+def _decode(content_type, data):
+    if content_type is None:
+        return data.decode('utf-8')
+    return f"data:{content_type};base64,{base64.b64encode(data).decode()}"
+
+
+def upgrade() -> None:
+    op.create_table('signature_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    for field in SIGNATURE_FIELDS:
+        op.add_column('bill_of_lading', sa.Column(f'{field}_sha256', sa.String(length=64), nullable=True))
+        op.create_foreign_key(
+            f'fk_bill_of_lading_{field}_sha256', 'bill_of_lading', 'signature_blobs',
+            [f'{field}_sha256'], ['sha256']
+        )
+
+    # Move existing signatures in id order, one batch at a time
+    conn = op.get_bind()
+    seen = set()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(bill_of_lading.c.id, *[bill_of_lading.c[field] for field in SIGNATURE_FIELDS])
+            .where(bill_of_lading.c.id > last_id)
+            .order_by(bill_of_lading.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        new_blobs = []
+        updates = []
+        for row in rows:
+            refs = {'bol_id': row.id}
+            for field in SIGNATURE_FIELDS:
+                value = getattr(row, field)
+                if not value:
+                    refs[f'{field}_sha256'] = None
+                    continue
+                content_type, data = _encode(value)
+                sha = hashlib.sha256(data).hexdigest()
+                refs[f'{field}_sha256'] = sha
+                if sha not in seen:
+                    seen.add(sha)
+                    new_blobs.append({'sha256': sha, 'content_type': content_type, 'data': data, 'size': len(data)})
+            updates.append(refs)
+        if new_blobs:
+            conn.execute(signature_blobs.insert(), new_blobs)
+        conn.execute(
+            bill_of_lading.update()
+            .where(bill_of_lading.c.id == sa.bindparam('bol_id'))
+            .values({f'{field}_sha256': sa.bindparam(f'{field}_sha256') for field in SIGNATURE_FIELDS}),
+            updates
+        )
+        last_id = rows[-1].id
+
+    for field in SIGNATURE_FIELDS:
+        op.drop_column('bill_of_lading', field)
+
+
+def downgrade() -> None:
+    for field in SIGNATURE_FIELDS:
+        op.add_column('bill_of_lading', sa.Column(field, sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(bill_of_lading.c.id, *[bill_of_lading.c[f'{field}_sha256'] for field in SIGNATURE_FIELDS])
+            .where(bill_of_lading.c.id > last_id)
+            .order_by(bill_of_lading.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        shas = {getattr(row, f'{field}_sha256') for row in rows for field in SIGNATURE_FIELDS} - {None}
+        blobs = {}
+        if shas:
+            blobs = {
+                blob.sha256: _decode(blob.content_type, blob.data)
+                for blob in conn.execute(sa.select(signature_blobs).where(signature_blobs.c.sha256.in_(shas)))
+            }
+        conn.execute(
+            bill_of_lading.update()
+            .where(bill_of_lading.c.id == sa.bindparam('bol_id'))
+            .values({field: sa.bindparam(field) for field in SIGNATURE_FIELDS}),
+            [
+                {'bol_id': row.id, **{field: blobs.get(getattr(row, f'{field}_sha256')) for field in SIGNATURE_FIELDS}}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    for field in SIGNATURE_FIELDS:
+        op.drop_constraint(f'fk_bill_of_lading_{field}_sha256', 'bill_of_lading', type_='foreignkey')
+        op.drop_column('bill_of_lading', f'{field}_sha256')
+    op.drop_table('signature_blobs')
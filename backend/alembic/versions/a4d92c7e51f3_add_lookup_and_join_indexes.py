@@ -0,0 +1,58 @@
+"""Add indexes for the hot lookup and join columns
+
+Revision ID: a4d92c7e51f3
+Revises: 7c1e4b8f2a90
+Create Date: 2026-10-17 13:05:41.220318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d92c7e51f3'
+down_revision = '7c1e4b8f2a90'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_bill_of_lading_work_order_no', 'bill_of_lading', ['work_order_no'], True),
+    ('ix_bill_of_lading_date_id', 'bill_of_lading', ['date', 'id'], False),
+    ('ix_bill_of_lading_driver_name_id', 'bill_of_lading', ['driver_name', 'id'], False),
+    ('ix_bol_vehicle_bill_of_lading_id', 'bol_vehicle', ['bill_of_lading_id'], False),
+    ('ix_transactions_work_order_no', 'transactions', ['work_order_no'], False),
+    ('ix_transactions_bol_id', 'transactions', ['bol_id'], False),
+    ('ix_transactions_user_id_date', 'transactions', ['user_id', 'date'], False),
+    ('ix_transactions_date', 'transactions', ['date'], False),
+    ('ix_daily_expenses_user_id_date', 'daily_expenses', ['user_id', 'date'], False),
+]
+
+
+def upgrade() -> None:
+    # A failed CREATE UNIQUE INDEX CONCURRENTLY leaves an invalid index
+    # behind, so refuse up front if work order numbers are not unique yet
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT work_order_no FROM bill_of_lading WHERE work_order_no IS NOT NULL "
+        "GROUP BY work_order_no HAVING COUNT(*) > 1 ORDER BY work_order_no LIMIT 20"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add the unique index on bill_of_lading.work_order_no; "
+            f"resolve these duplicate work orders first: {', '.join(duplicates)}"
+        )
+
+    # CONCURRENTLY keeps the tables writable on Postgres but cannot run in a
+    # transaction; other databases build the indexes normally
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name, table, columns, unique=unique,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
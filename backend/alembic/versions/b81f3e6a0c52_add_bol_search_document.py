@@ -0,0 +1,82 @@
+"""Add the BOL search document and its full-text indexes
+
+Revision ID: b81f3e6a0c52
+Revises: a4d92c7e51f3
+Create Date: 2026-10-17 15:22:08.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f3e6a0c52'
+down_revision = 'a4d92c7e51f3'
+branch_labels = None
+depends_on = None
+
+# Snapshot of utils.bol_search.SEARCH_FIELDS / VEHICLE_SEARCH_FIELDS at this revision
+SEARCH_FIELDS = [
+    'work_order_no', 'driver_name',
+    'broker_name', 'broker_address', 'broker_phone',
+    'pickup_name', 'pickup_address', 'pickup_city', 'pickup_state', 'pickup_zip',
+    'delivery_name', 'delivery_address', 'delivery_city', 'delivery_state', 'delivery_zip',
+    'pickup_agent_name', 'delivery_agent_name', 'receiver_agent_name',
+    'condition_codes', 'remarks',
+]
+VEHICLE_SEARCH_FIELDS = ['vin', 'make', 'model']
+
+
+def _concat(columns):
+    return " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column('bill_of_lading', sa.Column('search_text', sa.Text(), nullable=True))
+
+    aggregate = "string_agg({}, ' ')" if is_postgres else "group_concat({}, ' ')"
+    vehicles = aggregate.format(_concat(f"v.{field}" for field in VEHICLE_SEARCH_FIELDS))
+    document = (
+        f"lower({_concat(SEARCH_FIELDS)} || ' ' || coalesce(("
+        f"SELECT {vehicles} FROM bol_vehicle v WHERE v.bill_of_lading_id = bill_of_lading.id"
+        "), ''))"
+    )
+    if is_postgres:
+        # Collapse the gaps left by empty fields, as the application does,
+        # so that phrase matches on search_text behave the same for old rows
+        document = f"trim(regexp_replace({document}, '\\s+', ' ', 'g'))"
+    op.execute(f"UPDATE bill_of_lading SET search_text = {document}")
+
+    if not is_postgres:
+        # Elsewhere the application searches search_text with an in-process index
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "ALTER TABLE bill_of_lading ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(search_text, ''))) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_bill_of_lading_search_vector', 'bill_of_lading', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_bill_of_lading_search_text_trgm', 'bill_of_lading', ['search_text'],
+            postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name in ('ix_bill_of_lading_search_text_trgm', 'ix_bill_of_lading_search_vector'):
+                op.drop_index(name, table_name='bill_of_lading', postgresql_concurrently=True, if_exists=True)
+        op.drop_column('bill_of_lading', 'search_vector')
+
+    with op.batch_alter_table('bill_of_lading') as batch_op:
+        batch_op.drop_column('search_text')
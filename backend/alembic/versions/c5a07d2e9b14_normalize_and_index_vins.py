@@ -0,0 +1,78 @@
+"""Normalize bol_vehicle VINs and index them for exact and prefix lookups
+
+Revision ID: c5a07d2e9b14
+Revises: b81f3e6a0c52
+Create Date: 2026-10-17 16:48:30.512664
+
+"""
+import logging
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a07d2e9b14'
+down_revision = 'b81f3e6a0c52'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Snapshot of the VINs utils.vin.validate_vin accepts at this revision: 17
+# characters without I, O or Q, or a shorter legacy serial
+VALID_VIN = '^([A-HJ-NPR-Z0-9]{17}|[A-Z0-9]{1,16})$'
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # Same normalization as utils.vin.normalize_vin for the VINs already stored
+    if is_postgres:
+        normalized = "upper(regexp_replace(vin, '[[:space:]-]+', '', 'g'))"
+    else:
+        normalized = "vin"
+        for separator in ("' '", "'-'", "char(9)", "char(10)", "char(13)"):
+            normalized = f"replace({normalized}, {separator}, '')"
+        normalized = f"upper({normalized})"
+    op.execute(f"UPDATE bol_vehicle SET vin = {normalized} WHERE vin IS NOT NULL")
+
+    # The API now rejects anything else ("N/A", 17 characters with an O, ...),
+    # which would make the BOLs holding such a value impossible to edit, so
+    # those are cleared to the empty VIN the API accepts
+    bind = op.get_bind()
+    if is_postgres:
+        cleared = bind.execute(sa.text(
+            "UPDATE bol_vehicle SET vin = '' WHERE vin <> '' AND vin !~ :pattern"
+        ), {'pattern': VALID_VIN}).rowcount
+    else:
+        valid = re.compile(VALID_VIN)
+        invalid = [
+            row.id for row in bind.execute(sa.text("SELECT id, vin FROM bol_vehicle WHERE vin <> ''"))
+            if not valid.match(row.vin)
+        ]
+        if invalid:
+            bind.execute(sa.text("UPDATE bol_vehicle SET vin = '' WHERE id = :id"), [{'id': row_id} for row_id in invalid])
+        cleared = len(invalid)
+    if cleared:
+        logger.warning("Cleared %d invalid VINs in bol_vehicle", cleared)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_bol_vehicle_vin', 'bol_vehicle', ['vin'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        if is_postgres:
+            # The default B-tree cannot serve LIKE 'prefix%' under a non-C collation
+            op.create_index(
+                'ix_bol_vehicle_vin_pattern', 'bol_vehicle', ['vin'],
+                postgresql_ops={'vin': 'varchar_pattern_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_bol_vehicle_vin_pattern', table_name='bol_vehicle', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_bol_vehicle_vin', table_name='bol_vehicle', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,74 @@
+"""Add analytics rollups
+
+Revision ID: d3e8b61f4a27
+Revises: c5a07d2e9b14
+Create Date: 2026-10-17 18:10:52.307741
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3e8b61f4a27'
+down_revision = 'c5a07d2e9b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('analytics_rollups',
+    sa.Column('granularity', sa.String(length=5), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('driver_name', sa.String(length=100), nullable=False),
+    sa.Column('broker_name', sa.String(length=100), nullable=False),
+    sa.Column('bol_count', sa.Integer(), nullable=False),
+    sa.Column('vehicle_count', sa.Integer(), nullable=False),
+    sa.Column('billed_amount', sa.Float(), nullable=False),
+    sa.Column('collected_amount', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'period_start', 'driver_name', 'broker_name')
+    )
+
+    # Backfill the daily rollup from existing BOLs and transactions...
+    op.execute("""
+        INSERT INTO analytics_rollups
+            (granularity, period_start, driver_name, broker_name,
+             bol_count, vehicle_count, billed_amount, collected_amount)
+        SELECT 'day', day, driver_name, broker_name,
+               SUM(bols), SUM(vehicles), SUM(billed), SUM(collected)
+        FROM (
+            SELECT b.date AS day,
+                   b.driver_name AS driver_name,
+                   COALESCE(b.broker_name, '') AS broker_name,
+                   1 AS bols,
+                   (SELECT COUNT(*) FROM bol_vehicle v WHERE v.bill_of_lading_id = b.id) AS vehicles,
+                   COALESCE(b.total_amount, 0) AS billed,
+                   0 AS collected
+            FROM bill_of_lading b
+            UNION ALL
+            SELECT t.date, b.driver_name, COALESCE(b.broker_name, ''), 0, 0, 0, t.collected_amount
+            FROM transactions t
+            JOIN bill_of_lading b ON b.id = t.bol_id
+        ) facts
+        GROUP BY day, driver_name, broker_name
+    """)
+
+    # ...and the monthly one from the daily one
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "CAST(date_trunc('month', period_start) AS date)"
+    else:
+        month = "date(period_start, 'start of month')"
+    op.execute(f"""
+        INSERT INTO analytics_rollups
+            (granularity, period_start, driver_name, broker_name,
+             bol_count, vehicle_count, billed_amount, collected_amount)
+        SELECT 'month', {month}, driver_name, broker_name,
+               SUM(bol_count), SUM(vehicle_count), SUM(billed_amount), SUM(collected_amount)
+        FROM analytics_rollups
+        WHERE granularity = 'day'
+        GROUP BY {month}, driver_name, broker_name
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,43 @@
+"""Index the transaction and daily expense lists by (user_id, date, id)
+
+Revision ID: e7a2c94d1b58
+Revises: d3e8b61f4a27
+Create Date: 2026-10-17 19:02:14.581930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c94d1b58'
+down_revision = 'd3e8b61f4a27'
+branch_labels = None
+depends_on = None
+
+# (new index, superseded index, table); the id column makes the lists'
+# (date, id) order and keyset cursors index-only
+INDEXES = [
+    ('ix_transactions_user_id_date_id', 'ix_transactions_user_id_date', 'transactions'),
+    ('ix_daily_expenses_user_id_date_id', 'ix_daily_expenses_user_id_date', 'daily_expenses'),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, old_name, table in INDEXES:
+            op.create_index(
+                name, table, ['user_id', 'date', 'id'],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(old_name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, old_name, table in reversed(INDEXES):
+            op.create_index(
+                old_name, table, ['user_id', 'date'],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
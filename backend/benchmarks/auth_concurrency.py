@@ -0,0 +1,115 @@
+"""
+Concurrency benchmark for the authenticated request path.
+
+Sends GET /dashboard (which resolves the bearer token through
+get_current_user) through the ASGI app at increasing numbers of in-flight
+requests. Statements against the scratch SQLite database are slowed down by
+--query-delay to stand in for the round trip to Postgres.
+
+Each level is run twice: once with the real dependency, which FastAPI runs in
+its threadpool, and once with an `async def` wrapper around the same lookup,
+which is how the dependency used to be written. Throughput of the former
+should grow with concurrency; the latter stays flat because every query
+blocks the event loop.
+
+    python benchmarks/auth_concurrency.py --requests 200 --levels 1,4,16,32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from main import app
+from database import get_db
+from dependencies import get_current_user, oauth2_scheme
+from models.base import Base
+from models.user import User
+from utils.auth import create_access_token
+
+def build_database(path: str, query_delay: float):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=64,
+        max_overflow=0,
+    )
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _simulate_latency(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(query_delay)
+
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        db.add(User(email="bench@example.com", hashed_password="x", full_name="Bench", is_active=True))
+        db.commit()
+    return factory
+
+async def blocking_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """The previous shape of the dependency: a sync query inside `async def`"""
+    return get_current_user(token, db)
+
+async def run_level(client: httpx.AsyncClient, headers: dict, total: int, concurrency: int) -> float:
+    """Issue `total` requests with at most `concurrency` in flight; return requests/second"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.get("/dashboard", headers=headers)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        factory = build_database(os.path.join(workdir, "bench.db"), args.query_delay)
+
+        def override_get_db():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+        levels = [int(level) for level in args.levels.split(",")]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            print(f"{'in-flight':>9} {'threadpool req/s':>17} {'blocking req/s':>15}")
+            for level in levels:
+                app.dependency_overrides.pop(get_current_user, None)
+                threaded = await run_level(client, headers, args.requests, level)
+                app.dependency_overrides[get_current_user] = blocking_current_user
+                blocking = await run_level(client, headers, args.requests, level)
+                print(f"{level:>9} {threaded:>17.1f} {blocking:>15.1f}")
+        app.dependency_overrides.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="comma-separated in-flight request counts")
+    parser.add_argument("--query-delay", type=float, default=0.01, help="seconds added to every SQL statement")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
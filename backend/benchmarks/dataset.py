@@ -0,0 +1,290 @@
+"""
+Seeded synthetic dataset for the benchmarks.
+
+Generates drivers, BOLs with 1 to 9 vehicles and realistically sized
+signature images, several partial payments per work order and daily
+expenses, and bulk-loads them: BOLs go through utils.bol_import (the same
+multi-row path as the import endpoint), transactions and expenses through
+multi-row inserts, after which the payment ledger and analytics rollups are
+rebuilt from them. The same --seed always produces the same data.
+
+    python benchmarks/dataset.py --database-url sqlite:////tmp/bench.db --bols 20000
+    python benchmarks/dataset.py --database-url postgresql://.../scratch --users 50 --bols 200000
+
+--database-url must point at an empty scratch database. Every user's
+password is BENCH_PASSWORD; ADMIN_EMAIL is a superuser and DRIVER_EMAIL the
+driver with the longest history.
+"""
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+# Publishing BOL invalidations must not need a Postgres server
+os.environ.setdefault("CACHE_INVALIDATION", "loopback")
+
+import sqlalchemy as sa
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+BENCH_PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "admin@bench.example"
+DRIVER_EMAIL = "driver1@bench.example"
+
+CITIES = [
+    ("Houston", "TX"), ("Dallas", "TX"), ("Austin", "TX"), ("San Antonio", "TX"),
+    ("Phoenix", "AZ"), ("Denver", "CO"), ("Atlanta", "GA"), ("Miami", "FL"),
+    ("Chicago", "IL"), ("Memphis", "TN"), ("Oklahoma City", "OK"), ("Kansas City", "MO"),
+]
+BROKERS = [
+    "Central Dispatch", "Acertus", "Montway", "RoadRunner Auto", "Ship A Car",
+    "AmeriFreight", "Sherpa Auto", "Easy Auto Ship", "Nexus Auto", "Car Haul Direct",
+]
+VEHICLES = [
+    ("Ford", "F-150"), ("Chevrolet", "Silverado"), ("Toyota", "Camry"), ("Honda", "Civic"),
+    ("Tesla", "Model 3"), ("Nissan", "Altima"), ("Jeep", "Wrangler"), ("BMW", "X5"),
+    ("Ram", "1500"), ("Hyundai", "Elantra"),
+]
+PAYMENT_TYPES = ["Cash", "Check", "Zelle"]
+CONDITION_CODES = ["S", "D", "SC", "BR", "CR", "MS"]
+VIN_CHARACTERS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+# History ends here rather than today, so a seed gives the same data any day
+END_DATE = date(2025, 6, 30)
+
+@dataclass
+class DatasetConfig:
+    users: int = 10
+    bols: int = 5000
+    days: int = 365
+    signature_kb: int = 12
+    # Distinct signature images; the store is content-addressed, so a
+    # smaller pool means fewer blob rows for the same number of BOLs
+    signature_pool: int = 500
+    seed: int = 42
+
+def _vin(rng: random.Random) -> str:
+    return "".join(rng.choice(VIN_CHARACTERS) for _ in range(17))
+
+def _signatures(config: DatasetConfig, rng: random.Random) -> List[str]:
+    """PNG data URLs of about signature_kb kilobytes (random bytes behind a PNG header)"""
+    size = config.signature_kb * 1024
+    header = b"\x89PNG\r\n\x1a\n"
+    return [
+        "data:image/png;base64," + base64.b64encode(header + rng.randbytes(size)).decode()
+        for _ in range(max(1, config.signature_pool))
+    ]
+
+def _drivers(config: DatasetConfig) -> List[Tuple[str, str]]:
+    return [(f"driver{n}@bench.example", f"Driver {n:03d}") for n in range(1, config.users + 1)]
+
+def driver_emails(config: DatasetConfig) -> List[str]:
+    return [email for email, _ in _drivers(config)]
+
+def _driver_weights(count: int) -> List[float]:
+    """The first driver has the longest history, the rest taper off"""
+    return [1.0 / (n ** 0.5) for n in range(1, count + 1)]
+
+def bol_payloads(config: DatasetConfig, rng: random.Random) -> Iterator[Tuple[int, dict]]:
+    """(row, payload) pairs in the shape the import endpoint accepts"""
+    drivers = _drivers(config)
+    weights = _driver_weights(len(drivers))
+    signatures = _signatures(config, rng)
+    start = END_DATE - timedelta(days=config.days)
+    for n in range(config.bols):
+        _, driver_name = rng.choices(drivers, weights)[0]
+        day = start + timedelta(days=rng.randrange(config.days))
+        pickup_city, pickup_state = rng.choice(CITIES)
+        delivery_city, delivery_state = rng.choice(CITIES)
+        vehicles = []
+        for _ in range(rng.randint(1, 9)):
+            make, model = rng.choice(VEHICLES)
+            vehicles.append({
+                "year": str(rng.randint(2008, 2025)),
+                "make": make,
+                "model": model,
+                "vin": _vin(rng),
+                "mileage": str(rng.randint(5, 180000)),
+                "price": str(rng.choice([250, 350, 450, 500, 650, 800, 1200])),
+            })
+        delivered = day + timedelta(days=rng.randint(1, 5))
+        yield n + 1, {
+            "driver_name": driver_name,
+            "date": day.isoformat(),
+            "work_order_no": f"WO-{n + 1:07d}",
+            "broker_name": rng.choice(BROKERS),
+            "broker_address": f"{rng.randint(100, 9999)} Commerce St",
+            "broker_phone": f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "pickup_name": f"Dealer {rng.randint(1, 400)}",
+            "pickup_address": f"{rng.randint(100, 9999)} Main St",
+            "pickup_city": pickup_city,
+            "pickup_state": pickup_state,
+            "pickup_zip": f"{rng.randint(10000, 99999)}",
+            "pickup_phone": f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "delivery_name": f"Customer {rng.randint(1, 5000)}",
+            "delivery_address": f"{rng.randint(100, 9999)} Oak Ave",
+            "delivery_city": delivery_city,
+            "delivery_state": delivery_state,
+            "delivery_zip": f"{rng.randint(10000, 99999)}",
+            "delivery_phone": f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "condition_codes": ",".join(rng.sample(CONDITION_CODES, rng.randint(0, 3))) or None,
+            "remarks": rng.choice([None, None, "Minor scratches", "Keys in cup holder", "Call before delivery"]),
+            "pickup_agent_name": f"Agent {rng.randint(1, 300)}",
+            "pickup_signature": rng.choice(signatures),
+            "pickup_date": day.isoformat(),
+            "delivery_agent_name": f"Agent {rng.randint(1, 300)}",
+            "delivery_signature": rng.choice(signatures),
+            "delivery_date": delivered.isoformat(),
+            "receiver_agent_name": f"Receiver {rng.randint(1, 300)}",
+            "receiver_signature": rng.choice(signatures) if rng.random() < 0.6 else None,
+            "receiver_date": delivered.isoformat(),
+            "vehicles": vehicles,
+        }
+
+def _payment_rows(db: Session, user_ids: dict, rng: random.Random) -> Iterator[dict]:
+    """0 to 4 partial payments per work order, about a third of them paid in full"""
+    bols = db.execute(sa.text(
+        "SELECT id, work_order_no, driver_name, date, total_amount, pickup_city, delivery_city "
+        "FROM bill_of_lading ORDER BY id"
+    ))
+    for bol_id, work_order_no, driver_name, day, total_amount, pickup, dropoff in bols:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        remaining = total_amount or 0.0
+        payments = rng.choice([0, 1, 1, 2, 2, 3, 4])
+        for index in range(payments):
+            last = index == payments - 1
+            amount = remaining if last and rng.random() < 0.5 else round(remaining * rng.uniform(0.2, 0.6), 2)
+            if amount <= 0:
+                break
+            remaining = round(remaining - amount, 2)
+            yield {
+                "date": day + timedelta(days=rng.randint(1, 45)),
+                "work_order_no": work_order_no,
+                "collected_amount": amount,
+                "due_amount": remaining,
+                "bol_id": bol_id,
+                "pickup_location": pickup or "",
+                "dropoff_location": dropoff or "",
+                "payment_type": rng.choice(PAYMENT_TYPES),
+                "comments": None,
+                "user_id": user_ids[driver_name],
+            }
+
+def _expense_rows(config: DatasetConfig, user_ids: dict, rng: random.Random) -> Iterator[dict]:
+    """An expense on roughly two of every three days for each driver"""
+    start = END_DATE - timedelta(days=config.days)
+    for _, full_name in _drivers(config):
+        for offset in range(config.days):
+            if rng.random() > 0.66:
+                continue
+            diesel = round(rng.uniform(150, 900), 2)
+            def_amount = round(rng.uniform(0, 60), 2)
+            other = round(rng.uniform(5, 120), 2) if rng.random() < 0.3 else None
+            diesel_city = rng.choice(CITIES)[0]
+            yield {
+                "date": start + timedelta(days=offset),
+                "diesel_amount": diesel,
+                "diesel_location": diesel_city,
+                "def_amount": def_amount,
+                "def_location": diesel_city if rng.random() < 0.8 else rng.choice(CITIES)[0],
+                "other_expense_description": "Tolls" if other else None,
+                "other_expense_amount": other,
+                "other_expense_location": rng.choice(CITIES)[0] if other else None,
+                "total": round(diesel + def_amount + (other or 0), 2),
+                "user_id": user_ids[full_name],
+            }
+
+def _insert_batches(db: Session, model, rows: Iterator[dict], batch_size: int = 5000) -> int:
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.execute(insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+        count += len(batch)
+    return count
+
+def seed_dataset(engine, config: DatasetConfig) -> dict:
+    """Create the schema on an empty database and fill it; returns row counts and timings"""
+    # Imported here so callers can set DATABASE_URL before the app modules load
+    from models.base import Base
+    import models  # noqa: F401  # register every table on Base.metadata
+    from models.daily_expense import DailyExpense
+    from models.transaction import Transaction
+    from models.user import User
+    from utils.analytics import rebuild_rollups
+    from utils.auth import get_password_hash
+    from utils.bol_import import import_bols
+    from utils.payment_ledger import rebuild_payment_ledger
+
+    rng = random.Random(config.seed)
+    started = time.perf_counter()
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        # One bcrypt hash for everybody; hashing per user would dominate seeding
+        hashed = get_password_hash(BENCH_PASSWORD)
+        db.add(User(email=ADMIN_EMAIL, hashed_password=hashed, full_name="Bench Admin", is_active=True, is_superuser=True))
+        db.add_all(
+            User(email=email, hashed_password=hashed, full_name=full_name, is_active=True)
+            for email, full_name in _drivers(config)
+        )
+        db.commit()
+        user_ids = {full_name: user_id for user_id, full_name in db.query(User.id, User.full_name)}
+
+        result = import_bols(db, bol_payloads(config, rng))
+        if result["failed"]:
+            raise RuntimeError(f"Seeding failed for {result['failed']} BOLs: {result['errors'][:3]}")
+        transactions = _insert_batches(db, Transaction, _payment_rows(db, user_ids, rng))
+        expenses = _insert_batches(db, DailyExpense, _expense_rows(config, user_ids, rng))
+        db.commit()
+        rebuild_payment_ledger(db)
+        rebuild_rollups(db)
+
+    return {
+        "config": asdict(config),
+        "users": config.users + 1,
+        "bols": result["imported"],
+        "transactions": transactions,
+        "daily_expenses": expenses,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+def add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DatasetConfig()
+    parser.add_argument("--users", type=int, default=defaults.users, help="drivers to create")
+    parser.add_argument("--bols", type=int, default=defaults.bols, help="BOLs to create")
+    parser.add_argument("--days", type=int, default=defaults.days, help="days of history")
+    parser.add_argument("--signature-kb", type=int, default=defaults.signature_kb, help="size of each signature image")
+    parser.add_argument("--signature-pool", type=int, default=defaults.signature_pool, help="distinct signature images")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="random seed")
+
+def config_from_arguments(args) -> DatasetConfig:
+    return DatasetConfig(
+        users=args.users, bols=args.bols, days=args.days,
+        signature_kb=args.signature_kb, signature_pool=args.signature_pool, seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="empty scratch database to fill")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+    print(seed_dataset(sa.create_engine(args.database_url), config_from_arguments(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Latency benchmark for the sync (threadpool) and async (DB_ASYNC) database modes.
+
+A scratch SQLite database is seeded once, then the app is started in a fresh
+process per mode (DB_ASYNC is read at import time) and GET requests are sent
+through the ASGI app at each concurrency level. Every SQL statement is slowed
+down by --query-delay inside the driver's own thread, standing in for the
+round trip to Postgres without blocking the event loop.
+
+The async mode needs aiosqlite for SQLite (asyncpg for Postgres):
+
+    pip install aiosqlite
+    python benchmarks/db_modes.py --levels 10,50,200 --requests 1000
+
+SQLite in one process is mostly CPU-bound, so for numbers that mean anything
+for production point --database-url at an empty scratch Postgres database;
+no artificial delay is added there.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+RESULT_PREFIX = "RESULT "
+MODES = {"sync": "0", "async": "1"}
+
+def seed(url: str, bol_count: int) -> None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from models.base import Base
+    from models.bill_of_lading import BillOfLading, BOLVehicle
+    from models.user import User
+    from utils.payment_ledger import sync_bol_payment
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(email="bench@example.com", hashed_password="x", full_name="Bench", is_active=True))
+        for i in range(bol_count):
+            bol = BillOfLading(
+                driver_name=f"Driver {i % 10}",
+                date=date(2025, 1, 1) + timedelta(days=i % 365),
+                work_order_no=f"WO-{i:06d}",
+                total_amount=250.0,
+                vehicles=[BOLVehicle(year="2020", make="Ford", model="F150", vin=f"VIN{i:014d}", mileage="1000", price="250")],
+            )
+            db.add(bol)
+            sync_bol_payment(db, bol)
+        db.commit()
+    engine.dispose()
+
+def add_latency(engine, delay: float) -> None:
+    """Sleep for `delay` on every statement, in whichever thread runs the driver"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        def callback(statement):
+            time.sleep(delay)
+
+        if hasattr(dbapi_connection, "set_trace_callback"):
+            dbapi_connection.set_trace_callback(callback)
+        else:
+            # aiosqlite adapter: the sqlite3 connection lives in aiosqlite's worker thread
+            dbapi_connection.await_(dbapi_connection._connection.set_trace_callback(callback))
+
+async def measure(client, path: str, headers: dict, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+async def worker(args) -> None:
+    """Run every concurrency level against the app in the mode set by DB_ASYNC"""
+    import httpx
+
+    import database
+    from main import app
+    from utils.auth import create_access_token
+
+    database.engine.echo = False
+    if database.async_engine is not None:
+        database.async_engine.echo = False
+    if database.engine.dialect.name == "sqlite":
+        add_latency(database.engine, args.query_delay)
+        if database.async_engine is not None:
+            add_latency(database.async_engine.sync_engine, args.query_delay)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=None) as client:
+        await measure(client, args.path, headers, min(args.requests, 50), 10)  # warm-up
+        for level in args.levels.split(","):
+            result = await measure(client, args.path, headers, args.requests, int(level))
+            print(RESULT_PREFIX + json.dumps(result), flush=True)
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/bol/?limit=20", help="endpoint to request")
+    parser.add_argument("--requests", type=int, default=500, help="requests per concurrency level")
+    parser.add_argument("--levels", default="10,50,100,200", help="comma-separated in-flight request counts")
+    parser.add_argument("--query-delay", type=float, default=0.005, help="seconds added to every SQL statement")
+    parser.add_argument("--bols", type=int, default=500, help="BOLs to seed")
+    parser.add_argument("--database-url", help="empty scratch database to seed (default: temporary SQLite)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker(args))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        seed(database_url, args.bols)
+
+        results = {}
+        for mode, flag in MODES.items():
+            # The sync session is closed in a threadpool worker after the response,
+            # so a pool smaller than the number of in-flight requests can starve
+            # itself; give it one connection per request to measure the threadpool
+            env = dict(
+                os.environ, DB_ASYNC=flag, DATABASE_URL=database_url,
+                DB_POOL_SIZE=str(max(int(level) for level in args.levels.split(","))),
+                DB_MAX_OVERFLOW="0",
+            )
+            command = [sys.executable, os.path.abspath(__file__), "--worker"] + sys.argv[1:]
+            completed = subprocess.run(
+                command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            if completed.returncode != 0:
+                sys.exit(f"{mode} run failed:\n{completed.stderr}")
+            results[mode] = [
+                json.loads(line[len(RESULT_PREFIX):])
+                for line in completed.stdout.splitlines()
+                if line.startswith(RESULT_PREFIX)
+            ]
+
+    print(f"{args.path}  ({args.requests} requests per level, {args.query_delay * 1000:.1f}ms per statement)")
+    print(f"{'in-flight':>9} | {'mode':>5} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for rows in zip(*results.values()):
+        for mode, row in zip(results, rows):
+            print(f"{row['concurrency']:>9} | {mode:>5} | {row['rps']:>8.1f} | {row['p50']:>8.1f} | {row['p99']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
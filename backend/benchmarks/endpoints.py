@@ -0,0 +1,298 @@
+"""
+Endpoint micro-benchmarks against a seeded dataset (see benchmarks/dataset.py).
+
+Every case is one request through the ASGI app, repeated --iterations times
+after a short warm-up. For each case the median, p95, mean and minimum
+latency, the SQL statements it ran and the response size are written to a
+JSON file, which can be compared against a run from another commit:
+
+    python benchmarks/endpoints.py --bols 20000 --output after.json
+    python benchmarks/endpoints.py --bols 20000 --output after.json --compare before.json
+    python benchmarks/endpoints.py --only bol_list --iterations 50
+
+By default a temporary SQLite database is seeded for the run. With
+--database-url the database is seeded unless it already has BOLs, so a
+scratch Postgres database can be reused between runs of the same dataset.
+Logging is set to WARNING (LOG_LEVEL) so log I/O does not skew the timings.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("CACHE_INVALIDATION", "loopback")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dataset import (
+    ADMIN_EMAIL, BENCH_PASSWORD, DRIVER_EMAIL, END_DATE,
+    add_dataset_arguments, config_from_arguments, seed_dataset,
+)
+
+# BOL list sorts benchmarked in both directions, besides the default by date
+SORTS = ("driver_name", "work_order_no")
+
+@dataclass
+class Case:
+    name: str
+    path: str
+    params: Dict[str, str] = field(default_factory=dict)
+    method: str = "GET"
+    # "admin", "driver" or None for unauthenticated requests
+    user: Optional[str] = "admin"
+    data: Optional[dict] = None
+
+def build_cases(ctx: dict) -> List[Case]:
+    """The benchmarked requests; ctx holds ids and values taken from the dataset"""
+    month_start = (END_DATE - timedelta(days=60)).isoformat()
+    month_end = (END_DATE - timedelta(days=30)).isoformat()
+    # The analytics endpoints take whole periods: weeks start on a Monday
+    week_start = END_DATE - timedelta(days=60)
+    week_start = (week_start - timedelta(days=week_start.weekday())).isoformat()
+    cases = [
+        Case("bol_list_default", "/api/bol/"),
+        Case("bol_list_limit_100", "/api/bol/", {"limit": "100"}),
+        Case("bol_list_date_range", "/api/bol/", {"from_date": month_start, "to_date": month_end, "limit": "100"}),
+        Case("bol_list_pending", "/api/bol/", {"payment_status": "pending", "limit": "100"}),
+        Case("bol_list_paid", "/api/bol/", {"payment_status": "paid", "limit": "100"}),
+        Case("bol_list_work_order", "/api/bol/", {"work_order_no": ctx["work_order_no"]}),
+        Case("bol_list_projection", "/api/bol/", {"fields": "work_order_no,date,driver_name,due_amount", "limit": "100"}),
+        Case("bol_list_deep_offset", "/api/bol/", {"skip": str(ctx["deep_offset"]), "limit": "20"}),
+        Case("bol_list_deep_keyset", "/api/bol/", {"cursor": ctx["deep_cursor"], "limit": "20"}),
+        Case("bol_search", "/api/bol/search", {"q": "montway houston"}),
+        Case("bol_detail", f"/api/bol/{ctx['bol_id']}"),
+        Case("bol_pending_payments", "/api/bol/pending-payments"),
+        Case("bol_work_order_payment_status", f"/api/bol/work-order/{ctx['work_order_no']}/payment-status"),
+        Case("work_orders_pending", "/api/transactions/work-orders/pending"),
+        Case("work_order_status", f"/api/transactions/work-order/{ctx['work_order_no']}/status"),
+        Case("work_order_transactions", f"/api/transactions/work-order/{ctx['paid_work_order_no']}/transactions",
+             user="driver"),
+        Case("transactions_list", "/api/transactions/", user="driver"),
+        Case("transactions_list_filtered", "/api/transactions/", {"from_date": month_start, "payment_type": "Zelle"}, user="driver"),
+        Case("transactions_list_keyset", "/api/transactions/", {"cursor": "", "limit": "500"}, user="driver"),
+        Case("daily_expenses_list", "/api/transactions/daily-expenses", user="driver"),
+        Case("daily_expenses_summary_month", "/api/transactions/daily-expenses/summary", {"group_by": "month"}, user="driver"),
+        Case("daily_expenses_summary_drivers", "/api/transactions/daily-expenses/summary", {"group_by": "driver", "all_drivers": "true"}),
+        Case("analytics_revenue_month", "/api/analytics/revenue", {"granularity": "month"}),
+        Case("analytics_deliveries_week", "/api/analytics/deliveries", {"granularity": "week", "start": week_start}),
+        Case("vehicle_history", f"/api/vehicles/{ctx['vin']}/history"),
+        Case("auth_me", "/api/auth/me", user="driver"),
+        Case("auth_users", "/api/auth/users"),
+        Case("login", "/api/auth/token", method="POST", user=None,
+             data={"username": DRIVER_EMAIL, "password": BENCH_PASSWORD}),
+    ]
+    # The same deep page of every other sort, by offset and by cursor
+    for sort_by in SORTS:
+        for sort_order in ("asc", "desc"):
+            params = {"sort_by": sort_by, "sort_order": sort_order, "limit": "20"}
+            cases += [
+                Case(f"bol_list_{sort_by}_{sort_order}_offset", "/api/bol/", {**params, "skip": str(ctx["deep_offset"])}),
+                Case(f"bol_list_{sort_by}_{sort_order}_keyset", "/api/bol/",
+                     {**params, "cursor": ctx["deep_cursors"][sort_by, sort_order]}),
+            ]
+    return cases
+
+def _deep_cursor(conn, sort_by: str, sort_order: str, offset: int) -> str:
+    """Cursor for the page that starts `offset` rows into the BOL list in this order"""
+    from sqlalchemy import text
+    from utils.pagination import NEXT, encode_cursor
+
+    value, row_id = conn.execute(text(
+        f"SELECT {sort_by}, id FROM bill_of_lading ORDER BY {sort_by} {sort_order}, id {sort_order} "
+        "LIMIT 1 OFFSET :offset"
+    ), {"offset": max(0, offset - 1)}).one()
+    if sort_by == "date" and isinstance(value, str):
+        value = date.fromisoformat(value)
+    return encode_cursor(f"{sort_by}:{sort_order}", value, row_id, NEXT)
+
+def dataset_context(engine) -> dict:
+    """Values the cases need from the seeded data"""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        bol_id, work_order_no = conn.execute(text(
+            "SELECT id, work_order_no FROM bill_of_lading ORDER BY id LIMIT 1"
+        )).one()
+        # Not every BOL has been paid and a driver sees only their own payments,
+        # so the transactions case takes a work order the driver has been paid for
+        paid_work_order_no = conn.execute(text(
+            "SELECT t.work_order_no FROM transactions t JOIN users u ON u.id = t.user_id "
+            "WHERE u.email = :email ORDER BY t.id LIMIT 1"
+        ), {"email": DRIVER_EMAIL}).scalar()
+        vin = conn.execute(text(
+            "SELECT vin FROM bol_vehicle WHERE bill_of_lading_id = :id LIMIT 1"
+        ), {"id": bol_id}).scalar()
+        count = conn.execute(text("SELECT COUNT(*) FROM bill_of_lading")).scalar()
+        deep_offset = max(0, int(count * 0.9))
+        # The same positions as deep_offset, reached by seeking instead of skipping
+        deep_cursor = _deep_cursor(conn, "date", "asc", deep_offset)
+        deep_cursors = {
+            (sort_by, sort_order): _deep_cursor(conn, sort_by, sort_order, deep_offset)
+            for sort_by in SORTS for sort_order in ("asc", "desc")
+        }
+    return {
+        "bol_id": bol_id,
+        "work_order_no": work_order_no,
+        "paid_work_order_no": paid_work_order_no,
+        "vin": vin,
+        "deep_offset": deep_offset,
+        "deep_cursor": deep_cursor,
+        "deep_cursors": deep_cursors,
+    }
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_case(client, case: Case, headers: dict, statements: list, iterations: int, warmup: int) -> dict:
+    timings = []
+    counts = []
+    size = 0
+    status_code = None
+    for iteration in range(warmup + iterations):
+        statements.clear()
+        start = time.perf_counter()
+        response = client.request(
+            case.method, case.path, params=case.params,
+            data=case.data, headers=headers.get(case.user, {}),
+        )
+        elapsed = time.perf_counter() - start
+        status_code = response.status_code
+        if iteration >= warmup:
+            timings.append(elapsed * 1000)
+            counts.append(len(statements))
+            size = len(response.content)
+    return {
+        "method": case.method,
+        "path": case.path,
+        "params": case.params,
+        "status": status_code,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "statements": max(counts),
+        "bytes": size,
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend_path,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: dict, baseline_path: str) -> None:
+    """Print median latency changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline['meta'].get('revision') or baseline_path}")
+    print(f"{'case':<34} {'before ms':>10} {'after ms':>10} {'change':>8} {'stmts':>9}")
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<34} {'-':>10} {result['median_ms']:>10.2f} {'new':>8}")
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        stmts = f"{before['statements']}->{result['statements']}"
+        print(f"{name:<34} {before['median_ms']:>10.2f} {result['median_ms']:>10.2f} {change:>+7.1f}% {stmts:>9}")
+
+def prepare_database(args, prefix: str = "bench-endpoints-"):
+    """Point the app at --database-url (or a temporary SQLite file) and seed it unless it has BOLs"""
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # database.py reads these at import time, so they are set before the app loads
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("LOG_DIR", os.path.join(workdir, "logs"))
+
+    from sqlalchemy import inspect, text
+
+    from database import engine
+
+    with engine.connect() as conn:
+        seeded = inspect(conn).has_table("bill_of_lading") and conn.execute(
+            text("SELECT COUNT(*) FROM bill_of_lading")
+        ).scalar()
+    dataset = seed_dataset(engine, config_from_arguments(args)) if not seeded else {"config": None, "reused": True}
+    return engine, dataset
+
+def run(args) -> dict:
+    engine, dataset = prepare_database(args)
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from database import async_engine
+    from main import app
+
+    statements: list = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    if async_engine is not None:
+        # With DB_ASYNC the async endpoints run their queries on this engine
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _count)
+
+    cases = [case for case in build_cases(dataset_context(engine)) if not args.only or args.only in case.name]
+    results = {}
+    with TestClient(app) as client:
+        headers = {}
+        for user, email in (("admin", ADMIN_EMAIL), ("driver", DRIVER_EMAIL)):
+            token = client.post("/api/auth/token", data={"username": email, "password": BENCH_PASSWORD}).json()["access_token"]
+            headers[user] = {"Authorization": f"Bearer {token}"}
+        print(f"{'case':<34} {'status':>6} {'median ms':>10} {'p95 ms':>9} {'stmts':>6} {'bytes':>9}")
+        for case in cases:
+            result = run_case(client, case, headers, statements, args.iterations, args.warmup)
+            results[case.name] = result
+            print(f"{case.name:<34} {result['status']:>6} {result['median_ms']:>10.2f} {result['p95_ms']:>9.2f} "
+                  f"{result['statements']:>6} {result['bytes']:>9}")
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "iterations": args.iterations,
+        },
+        "dataset": dataset,
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--iterations", type=int, default=20, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per case")
+    parser.add_argument("--only", help="run only the cases whose name contains this")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to compare against")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
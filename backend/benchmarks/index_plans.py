@@ -0,0 +1,187 @@
+"""
+Before/after query plans and timings for the lookup and join indexes added in
+migration a4d92c7e51f3, and their (user_id, date, id) successors from
+e7a2c94d1b58.
+
+A dataset is seeded, the migration's indexes are dropped, and each of the
+queries the routers run on every request is planned and timed. The indexes
+are then created and everything is run again.
+
+    python benchmarks/index_plans.py --bols 50000
+    python benchmarks/index_plans.py --database-url postgresql://.../scratch
+
+--database-url must point at an empty scratch database; the default is a
+temporary SQLite file.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+
+import sqlalchemy as sa
+
+from models.base import Base
+import models  # noqa: F401  # register every table on Base.metadata
+
+VERSIONS = Path(backend_path) / "alembic" / "versions"
+MIGRATIONS = [
+    VERSIONS / "a4d92c7e51f3_add_lookup_and_join_indexes.py",
+    VERSIONS / "e7a2c94d1b58_add_list_pagination_indexes.py",
+]
+
+def migration_indexes():
+    """Index names from the migrations themselves, so the two cannot drift apart"""
+    names = set()
+    for path in MIGRATIONS:
+        spec = importlib.util.spec_from_file_location(f"index_migration_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        names.update(name for name, *_ in module.INDEXES)
+    return names
+
+def seed(engine, bol_count: int, users: int = 20) -> None:
+    rng = random.Random(42)
+    start = date(2023, 1, 1)
+    tables = Base.metadata.tables
+    with engine.begin() as conn:
+        conn.execute(tables["users"].insert(), [
+            {"id": i, "email": f"driver{i}@example.com", "hashed_password": "x", "full_name": f"Driver {i}", "is_active": True}
+            for i in range(1, users + 1)
+        ])
+        for offset in range(0, bol_count, 5000):
+            ids = range(offset + 1, min(offset + 5000, bol_count) + 1)
+            conn.execute(tables["bill_of_lading"].insert(), [
+                {"id": i, "driver_name": f"Driver {rng.randint(1, users)}", "date": start + timedelta(days=rng.randint(0, 900)),
+                 "work_order_no": f"WO-{i:07d}", "total_amount": 500.0}
+                for i in ids
+            ])
+            conn.execute(tables["bol_vehicle"].insert(), [
+                {"bill_of_lading_id": i, "year": "2020", "make": "Ford", "model": "F150", "vin": f"VIN{i:07d}{n}", "mileage": "1", "price": "250"}
+                for i in ids for n in range(2)
+            ])
+            conn.execute(tables["transactions"].insert(), [
+                {"date": start + timedelta(days=rng.randint(0, 900)), "work_order_no": f"WO-{i:07d}", "collected_amount": 250.0,
+                 "due_amount": 250.0, "bol_id": i, "pickup_location": "A", "dropoff_location": "B", "payment_type": "Cash",
+                 "user_id": rng.randint(1, users)}
+                for i in ids for _ in range(2)
+            ])
+            conn.execute(tables["daily_expenses"].insert(), [
+                {"date": start + timedelta(days=rng.randint(0, 900)), "diesel_amount": 100.0, "diesel_location": "X",
+                 "def_amount": 10.0, "def_location": "X", "total": 110.0, "user_id": rng.randint(1, users)}
+                for _ in ids
+            ])
+
+def statement(sql: str, expanding=()):
+    return sa.text(sql).bindparams(*(sa.bindparam(name, expanding=True) for name in expanding))
+
+def queries(bol_count: int):
+    """(label, SQL, params, expanding params) for the queries behind the hot endpoints"""
+    rng = random.Random(7)
+    page_ids = [rng.randint(1, bol_count) for _ in range(20)]
+    work_orders = [f"WO-{i:07d}" for i in page_ids]
+    return [
+        ("BOL by work order",
+         "SELECT id FROM bill_of_lading WHERE work_order_no = :wo", {"wo": work_orders[0]}, ()),
+        ("BOL page by date (offset)",
+         "SELECT id FROM bill_of_lading ORDER BY date, id LIMIT 20 OFFSET :skip", {"skip": bol_count // 2}, ()),
+        ("BOL page by date (keyset)",
+         "SELECT id FROM bill_of_lading WHERE date >= :d AND (date > :d OR (date = :d AND id > :id)) "
+         "ORDER BY date, id LIMIT 20",
+         {"d": date(2024, 6, 1), "id": bol_count // 2}, ()),
+        ("BOL page by driver (keyset)",
+         "SELECT id FROM bill_of_lading WHERE driver_name >= :n AND (driver_name > :n OR (driver_name = :n AND id > :id)) "
+         "ORDER BY driver_name, id LIMIT 20", {"n": "Driver 5", "id": bol_count // 2}, ()),
+        ("Vehicles for a page",
+         "SELECT * FROM bol_vehicle WHERE bill_of_lading_id IN :ids", {"ids": page_ids}, ("ids",)),
+        ("Collected per work order",
+         "SELECT work_order_no, SUM(collected_amount) FROM transactions WHERE work_order_no IN :wos "
+         "GROUP BY work_order_no", {"wos": work_orders}, ("wos",)),
+        ("Transactions for a BOL",
+         "SELECT * FROM transactions WHERE bol_id = :id", {"id": page_ids[0]}, ()),
+        ("Transactions for a user by date",
+         "SELECT * FROM transactions WHERE user_id = :u AND date BETWEEN :a AND :b ORDER BY date",
+         {"u": 3, "a": date(2024, 1, 1), "b": date(2024, 1, 31)}, ()),
+        ("Transactions in a date range",
+         "SELECT COUNT(*) FROM transactions WHERE date BETWEEN :a AND :b",
+         {"a": date(2024, 1, 1), "b": date(2024, 1, 7)}, ()),
+        ("Daily expenses for a user",
+         "SELECT * FROM daily_expenses WHERE user_id = :u AND date >= :a ORDER BY date",
+         {"u": 3, "a": date(2024, 12, 1)}, ()),
+    ]
+
+def explain(conn, sql: str, params: dict, expanding) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(statement(f"EXPLAIN QUERY PLAN {sql}", expanding), params)
+        return "; ".join(row[-1] for row in rows)
+    rows = conn.execute(statement(f"EXPLAIN {sql}", expanding), params)
+    return "; ".join(row[0].strip() for row in rows)
+
+def timed(conn, sql: str, params: dict, expanding, repeat: int) -> float:
+    query = statement(sql, expanding)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def measure(engine, bol_count: int, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for label, sql, params, expanding in queries(bol_count):
+            results[label] = (timed(conn, sql, params, expanding, repeat), explain(conn, sql, params, expanding))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bols", type=int, default=50000, help="BOLs to seed (two vehicles and transactions each)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--database-url", help="empty scratch database (default: temporary SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = sa.create_engine(args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        names = migration_indexes()
+        indexes = [
+            index for table in Base.metadata.sorted_tables for index in table.indexes if index.name in names
+        ]
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn)
+
+        print(f"Seeding {args.bols} BOLs...")
+        seed(engine, args.bols)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        before = measure(engine, args.bols, args.repeat)
+
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            conn.exec_driver_sql("ANALYZE")
+        after = measure(engine, args.bols, args.repeat)
+        engine.dispose()
+
+    print(f"{'query':<34} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label, (before_ms, _) in before.items():
+        after_ms = after[label][0]
+        print(f"{label:<34} {before_ms:>10.3f} {after_ms:>10.3f} {before_ms / max(after_ms, 1e-6):>7.1f}x")
+    print()
+    for label in before:
+        print(label)
+        print(f"  before: {before[label][1]}")
+        print(f"  after:  {after[label][1]}")
+
+if __name__ == "__main__":
+    main()
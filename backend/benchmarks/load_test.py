@@ -0,0 +1,495 @@
+"""
+Concurrent load test: virtual users of several kinds hitting the app at once.
+
+Each scenario starts sessions at a fixed average rate (Poisson arrivals, an
+open workload: new sessions keep arriving whether or not earlier ones have
+finished) for --duration seconds. A session is one user class walking
+through its requests with think time in between:
+
+    login     a driver signing in, then opening their transactions and expenses
+    payment   a driver picking an open work order and posting a payment on it
+    expense   a driver posting a daily expense and checking the monthly summary
+    reports   a dispatcher loading pending payments, revenue and driver expenses
+    paging    a dispatcher paging through the BOL list by cursor
+
+Per scenario it reports throughput, p50/p95/p99 latency (overall and per
+request), the error rate (5xx, unexpected 4xx and transport errors),
+sessions dropped at --max-sessions, and how often a checkout found the
+database pool exhausted or timed out waiting, read from /metrics.
+
+By default the app runs in-process through httpx.ASGITransport on a seeded
+temporary SQLite database (see benchmarks/endpoints.py for --database-url).
+--socket starts uvicorn on a local port with --workers processes instead,
+and --url targets a running server already seeded by benchmarks/dataset.py
+with the same --users.
+
+    python benchmarks/load_test.py --save-baseline
+    python benchmarks/load_test.py                     # exits 1 on a regression
+    python benchmarks/load_test.py --scenario dispatch --mix paging=1,payment=4 --rate 20
+
+Baselines are benchmarks/baselines/<scenario>.json. A scenario regresses
+when its p95 or p99 latency grows by more than --threshold (and by at least
+--min-delta-ms), its throughput falls by more than --threshold, its error
+rate rises by more than --max-error-increase, or it hits pool timeouts the
+baseline did not. Baselines only mean something on the machine, database
+and dataset that produced them.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("CACHE_INVALIDATION", "loopback")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from dataset import (
+    ADMIN_EMAIL, BENCH_PASSWORD, END_DATE,
+    add_dataset_arguments, config_from_arguments, driver_emails,
+)
+from endpoints import git_revision, percentile, prepare_database
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+POOL_SAMPLES = (
+    "db_pool_exhausted_total",
+    "db_pool_timeouts_total",
+    "db_pool_checkout_wait_seconds_sum",
+    "db_pool_checkout_wait_seconds_count",
+)
+
+@dataclass
+class Scenario:
+    description: str
+    # Sessions started per second, on average
+    rate: float
+    # User class name -> relative weight
+    mix: Dict[str, float] = field(default_factory=dict)
+
+SCENARIOS = {
+    "morning": Scenario("drivers signing in at the start of the day", 3.0, {"login": 8, "expense": 1, "reports": 1}),
+    "dispatch": Scenario("dispatchers paging reports while drivers post payments", 6.0, {"paging": 3, "reports": 2, "payment": 5}),
+    "peak": Scenario("every kind of user at once", 10.0, {"login": 2, "payment": 4, "expense": 2, "paging": 2, "reports": 1}),
+}
+
+class Recorder:
+    """Latency and outcome of every request in a scenario"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, name: str, elapsed_ms: float, error: Optional[str]) -> None:
+        self.samples[name].append(elapsed_ms)
+        if error:
+            self.errors[name][error] += 1
+
+def _latencies(samples: List[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(samples, 0.50), 2),
+        "p95_ms": round(percentile(samples, 0.95), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, ctx: dict, recorder: Recorder, rng: random.Random, think: float):
+        self.client = client
+        self.ctx = ctx
+        self.recorder = recorder
+        self.rng = rng
+        self.think_time = think
+        self.headers: dict = {}
+
+    def as_driver(self) -> None:
+        self.headers = self.rng.choice(self.ctx["driver_headers"])
+
+    def as_dispatcher(self) -> None:
+        self.headers = self.ctx["admin_headers"]
+
+    async def think(self) -> None:
+        if self.think_time > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def request(self, name: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record it; None if it never got a response"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.add(name, (time.perf_counter() - start) * 1000, type(e).__name__)
+            return None
+        error = str(response.status_code) if response.status_code >= 400 else None
+        self.recorder.add(name, (time.perf_counter() - start) * 1000, error)
+        return response
+
+async def login_session(user: VirtualUser) -> None:
+    response = await user.request("login", "POST", "/api/auth/token", data={
+        "username": user.rng.choice(user.ctx["drivers"]), "password": BENCH_PASSWORD,
+    })
+    if response is None or response.status_code != 200:
+        return
+    user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await user.request("auth_me", "GET", "/api/auth/me")
+    await user.think()
+    await user.request("transactions_list", "GET", "/api/transactions/", params={"limit": "20"})
+    await user.think()
+    await user.request("daily_expenses_list", "GET", "/api/transactions/daily-expenses", params={"limit": "20"})
+
+async def payment_session(user: VirtualUser) -> None:
+    user.as_driver()
+    await user.request("work_orders_pending", "GET", "/api/transactions/work-orders/pending")
+    await user.think()
+    work_order = user.rng.choice(user.ctx["work_orders"])
+    await user.request("work_order_status", "GET", f"/api/transactions/work-order/{work_order['work_order_no']}/status")
+    await user.think()
+    # A small fraction of what is due, so concurrent payments never overpay
+    amount = max(0.01, round(work_order["due_amount"] * 0.01, 2))
+    await user.request("create_transaction", "POST", "/api/transactions/", json={
+        "date": END_DATE.isoformat(),
+        "work_order_no": work_order["work_order_no"],
+        "collected_amount": amount,
+        "due_amount": 0,
+        "bol_id": work_order["id"],
+        "pickup_location": "Houston",
+        "dropoff_location": "Dallas",
+        "payment_type": user.rng.choice(["Cash", "Check", "Zelle"]),
+    })
+
+async def expense_session(user: VirtualUser) -> None:
+    user.as_driver()
+    diesel = round(user.rng.uniform(150, 900), 2)
+    await user.request("create_daily_expense", "POST", "/api/transactions/daily-expenses", json={
+        "date": END_DATE.isoformat(),
+        "diesel_amount": diesel,
+        "diesel_location": "Houston",
+        "def_amount": 20.0,
+        "def_location": "Houston",
+        "total": diesel + 20.0,
+    })
+    await user.think()
+    await user.request("daily_expenses_summary", "GET", "/api/transactions/daily-expenses/summary", params={"group_by": "month"})
+
+async def reports_session(user: VirtualUser) -> None:
+    user.as_dispatcher()
+    await user.request("bol_pending_payments", "GET", "/api/bol/pending-payments")
+    await user.think()
+    await user.request("analytics_revenue", "GET", "/api/analytics/revenue", params={"granularity": "month"})
+    await user.think()
+    start = (END_DATE - timedelta(days=90)).isoformat()
+    await user.request("daily_expenses_by_driver", "GET", "/api/transactions/daily-expenses/summary", params={
+        "group_by": "driver", "all_drivers": "true", "from_date": start,
+    })
+
+async def paging_session(user: VirtualUser) -> None:
+    user.as_dispatcher()
+    params = {"limit": "50"}
+    if user.rng.random() < 0.5:
+        params["payment_status"] = "pending"
+    for _ in range(user.rng.randint(2, 5)):
+        response = await user.request("bol_list_page", "GET", "/api/bol/", params=params)
+        cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+        if not cursor:
+            return
+        params = {**params, "cursor": cursor}
+        await user.think()
+
+USER_CLASSES = {
+    "login": login_session,
+    "payment": payment_session,
+    "expense": expense_session,
+    "reports": reports_session,
+    "paging": paging_session,
+}
+
+async def pool_counters(client: httpx.AsyncClient) -> Dict[str, float]:
+    """Pool exhaustion, timeout and checkout wait totals, summed over the server's workers"""
+    values = dict.fromkeys(POOL_SAMPLES, 0.0)
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            if sample.name in values:
+                values[sample.name] += sample.value
+    return values
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: dict, args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    classes, weights = zip(*scenario.mix.items())
+    sessions = set()
+    started = dropped = failed = 0
+
+    async def session(user_class: str) -> None:
+        nonlocal failed
+        try:
+            await USER_CLASSES[user_class](VirtualUser(client, ctx, recorder, random.Random(rng.random()), args.think))
+        except Exception:
+            failed += 1
+
+    before = await pool_counters(client)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    next_arrival = start
+    while True:
+        next_arrival += rng.expovariate(scenario.rate)
+        if next_arrival - start >= args.duration:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+        if len(sessions) >= args.max_sessions:
+            dropped += 1
+            continue
+        task = asyncio.create_task(session(rng.choices(classes, weights)[0]))
+        sessions.add(task)
+        task.add_done_callback(sessions.discard)
+        started += 1
+    # Let the sessions in flight finish; they count towards the elapsed time
+    await asyncio.gather(*sessions)
+    elapsed = loop.time() - start
+    after = await pool_counters(client)
+
+    samples = [value for values in recorder.samples.values() for value in values]
+    errors = sum(sum(counts.values()) for counts in recorder.errors.values())
+    waits = after["db_pool_checkout_wait_seconds_count"] - before["db_pool_checkout_wait_seconds_count"]
+    wait_seconds = after["db_pool_checkout_wait_seconds_sum"] - before["db_pool_checkout_wait_seconds_sum"]
+    return {
+        "description": scenario.description,
+        "rate": scenario.rate,
+        "mix": scenario.mix,
+        "duration_s": round(elapsed, 2),
+        "sessions": started,
+        "sessions_dropped": dropped,
+        "sessions_failed": failed,
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        **(_latencies(samples) if samples else {}),
+        "pool": {
+            "exhausted": int(after["db_pool_exhausted_total"] - before["db_pool_exhausted_total"]),
+            "timeouts": int(after["db_pool_timeouts_total"] - before["db_pool_timeouts_total"]),
+            "mean_wait_ms": round(wait_seconds / waits * 1000, 3) if waits else 0.0,
+        },
+        "by_request": {
+            request: {
+                "count": len(values),
+                "errors": dict(recorder.errors[request]),
+                **_latencies(values),
+            }
+            for request, values in sorted(recorder.samples.items())
+        },
+    }
+
+def print_result(name: str, result: dict) -> None:
+    pool = result["pool"]
+    print(f"\n{name}: {result['description']} ({result['rate']:g} sessions/s, {result['sessions']} sessions, "
+          f"{result['sessions_dropped']} dropped)")
+    print(f"  {result['requests']} requests in {result['duration_s']:.1f}s = {result['throughput_rps']:.1f} req/s, "
+          f"errors {result['errors']} ({result['error_rate']:.2%}), pool exhausted {pool['exhausted']} / "
+          f"timeouts {pool['timeouts']} / mean wait {pool['mean_wait_ms']:.2f} ms")
+    print(f"  {'request':<26} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for request, stats in result["by_request"].items():
+        print(f"  {request:<26} {stats['count']:>6} {sum(stats['errors'].values()):>6} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    if result["requests"]:
+        print(f"  {'all':<26} {result['requests']:>6} {result['errors']:>6} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+def regressions(name: str, result: dict, baseline: dict, args) -> List[str]:
+    """Ways in which `result` is worse than `baseline` beyond the allowed margins"""
+    found = []
+    for key in ("p95_ms", "p99_ms"):
+        before, after = baseline.get(key), result.get(key)
+        if before is not None and after is not None and after > before * (1 + args.threshold) and after - before >= args.min_delta_ms:
+            found.append(f"{name}: {key} {before:.1f} -> {after:.1f}")
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - args.threshold):
+        found.append(f"{name}: throughput {baseline['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} req/s")
+    if result["error_rate"] > baseline["error_rate"] + args.max_error_increase:
+        found.append(f"{name}: error rate {baseline['error_rate']:.2%} -> {result['error_rate']:.2%}")
+    if result["pool"]["timeouts"] > baseline["pool"]["timeouts"]:
+        found.append(f"{name}: pool timeouts {baseline['pool']['timeouts']} -> {result['pool']['timeouts']}")
+    return found
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        user_class, _, weight = part.partition("=")
+        if user_class not in USER_CLASSES:
+            raise argparse.ArgumentTypeError(f"unknown user class {user_class!r}, expected one of {', '.join(USER_CLASSES)}")
+        mix[user_class] = float(weight or 1)
+    return mix
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextlib.contextmanager
+def local_server(workers: int):
+    """Run uvicorn on a free local port with this process's environment; yields its base URL"""
+    env = dict(os.environ)
+    if workers > 1:
+        # Aggregate /metrics over the workers (see utils.metrics)
+        env["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="bench-metrics-")
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=backend_path, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not become healthy within 60s")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+async def login_headers(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/api/auth/token", data={"username": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def build_context(client: httpx.AsyncClient, args) -> dict:
+    """Tokens for every benchmark user and the open work orders to pay against"""
+    drivers = driver_emails(config_from_arguments(args))
+    admin_headers = await login_headers(client, ADMIN_EMAIL)
+    driver_headers = list(await asyncio.gather(*(login_headers(client, email) for email in drivers)))
+    response = await client.get("/api/bol/pending-payments", headers=admin_headers)
+    response.raise_for_status()
+    work_orders = [row for row in response.json() if row["work_order_no"] and row["due_amount"] > 1]
+    if not work_orders:
+        raise RuntimeError("the dataset has no open work orders to post payments against")
+    return {
+        "drivers": drivers,
+        "admin_headers": admin_headers,
+        "driver_headers": driver_headers,
+        "work_orders": work_orders,
+    }
+
+async def run_scenarios(client: httpx.AsyncClient, scenarios: Dict[str, Scenario], args) -> dict:
+    ctx = await build_context(client, args)
+    results = {}
+    for name, scenario in scenarios.items():
+        results[name] = await run_scenario(client, scenario, ctx, args)
+        print_result(name, results[name])
+    return results
+
+async def run(scenarios: Dict[str, Scenario], args) -> dict:
+    limits = httpx.Limits(max_connections=args.max_sessions, max_keepalive_connections=args.max_sessions)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            return await run_scenarios(client, scenarios, args)
+
+    engine, _ = prepare_database(args, prefix="bench-load-")
+    if args.socket:
+        # The server opens its own connections to the seeded database
+        engine.dispose()
+        with local_server(args.workers) as url:
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+                return await run_scenarios(client, scenarios, args)
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=timeout) as client:
+            return await run_scenarios(client, scenarios, args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (repeatable; default all)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of arrivals per scenario")
+    parser.add_argument("--rate", type=float, help="sessions per second, overriding each scenario's rate")
+    parser.add_argument("--mix", type=parse_mix, help="user mix overriding each scenario's, e.g. login=3,payment=1")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between a session's requests, in seconds")
+    parser.add_argument("--max-sessions", type=int, default=200, help="sessions in flight before new arrivals are dropped")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--socket", action="store_true", help="serve the app with uvicorn on a local port")
+    target.add_argument("--url", help="base URL of a running, already seeded server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --socket")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline-dir", default=str(BASELINE_DIR), help="directory of <scenario>.json baselines")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baselines instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative latency growth / throughput drop")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="latency growth always allowed, in milliseconds")
+    parser.add_argument("--max-error-increase", type=float, default=0.01, help="allowed rise in error rate")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = {}
+    for name in args.scenario or SCENARIOS:
+        scenario = SCENARIOS[name]
+        scenarios[name] = Scenario(scenario.description, args.rate or scenario.rate, args.mix or scenario.mix)
+
+    results = asyncio.run(run(scenarios, args))
+    meta = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "target": args.url or ("socket" if args.socket else "asgi"),
+        "workers": args.workers if args.socket else None,
+        "duration_s": args.duration,
+        "think_s": args.think,
+        "dataset": {"users": args.users, "bols": args.bols, "seed": args.seed},
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "scenarios": results}, f, indent=2)
+
+    baseline_dir = Path(args.baseline_dir)
+    if args.save_baseline:
+        baseline_dir.mkdir(parents=True, exist_ok=True)
+        for name, result in results.items():
+            with open(baseline_dir / f"{name}.json", "w") as f:
+                json.dump({"meta": meta, **result}, f, indent=2)
+        print(f"\nbaselines written to {baseline_dir}")
+        return
+
+    found = []
+    for name, result in results.items():
+        path = baseline_dir / f"{name}.json"
+        if not path.exists():
+            print(f"\n{name}: no baseline at {path}")
+            continue
+        with open(path) as f:
+            found.extend(regressions(name, result, json.load(f), args))
+    if found:
+        print("\nregressions:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nno regressions")
+
+if __name__ == "__main__":
+    main()
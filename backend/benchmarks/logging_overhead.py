@@ -0,0 +1,126 @@
+"""
+Per-request logging overhead, as seen by the thread handling the request.
+
+A "request" here is the handful of log calls a list endpoint makes (INFO
+lines and one DEBUG payload). Each setup is timed from several threads at
+once, the way the threadpool runs sync endpoints:
+
+    disabled  logging turned off entirely, the floor
+    legacy    the previous setup: a FileHandler and a stdout handler on each
+              router logger at DEBUG, plus three root handlers
+    queue     utils.logger: records handed to a background listener
+    limited   utils.logger with LOG_RATE_LIMIT applied under a burst
+
+Console output goes to /dev/null so the terminal does not skew the numbers.
+
+    python benchmarks/logging_overhead.py --requests 20000 --threads 8
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+
+import utils.logger as log_pipeline
+
+LOGGER_NAME = "routers.transaction"
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def simulated_request(logger: logging.Logger, user: str, records: int) -> None:
+    for index in range(records):
+        logger.info(f"Fetching transactions for user: {user} ({index})")
+    logger.debug(f"Transaction data: {{'user': {user!r}, 'amount': 125.0}}")
+
+def reset_logging() -> None:
+    log_pipeline.shutdown_logging()
+    for name in ("", LOGGER_NAME):
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logger.setLevel(logging.NOTSET)
+    logging.disable(logging.NOTSET)
+
+def legacy_setup(log_dir: Path) -> None:
+    """The handlers main.setup_logging and utils.logger.setup_logger used to attach"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=FORMAT,
+        handlers=[
+            logging.FileHandler(log_dir / "ideal-transportation.log"),
+            logging.FileHandler(log_dir / "ideal-transportation.error.log"),
+            logging.StreamHandler(),
+        ],
+        force=True,
+    )
+    logging.getLogger().handlers[1].setLevel(logging.ERROR)
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.DEBUG)
+    for handler in (logging.FileHandler(log_dir / "transaction.log"), logging.StreamHandler(sys.stdout)):
+        handler.setFormatter(logging.Formatter(FORMAT))
+        logger.addHandler(handler)
+
+def pipeline_setup(log_dir: Path, rate_limit: int) -> None:
+    os.environ["LOG_DIR"] = str(log_dir)
+    os.environ["LOG_RATE_LIMIT"] = str(rate_limit)
+    log_pipeline.setup_logger(LOGGER_NAME, "transaction.log")
+
+def timed(threads: int, requests: int, records: int) -> float:
+    """Microseconds of logging per request on the calling threads"""
+    logger = logging.getLogger(LOGGER_NAME)
+    per_thread = requests // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(number):
+        barrier.wait()
+        for _ in range(per_thread):
+            simulated_request(logger, f"driver{number}@example.com", records)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (per_thread * threads) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="simulated requests per setup")
+    parser.add_argument("--threads", type=int, default=8, help="threads issuing requests")
+    parser.add_argument("--records", type=int, default=3, help="INFO records per request")
+    parser.add_argument("--rate-limit", type=int, default=20, help="LOG_RATE_LIMIT for the 'limited' run")
+    args = parser.parse_args()
+
+    setups = [
+        ("disabled", lambda log_dir: logging.disable(logging.CRITICAL)),
+        ("legacy", legacy_setup),
+        ("queue", lambda log_dir: pipeline_setup(log_dir, 0)),
+        ("limited", lambda log_dir: pipeline_setup(log_dir, args.rate_limit)),
+    ]
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        for name, setup in setups:
+            with tempfile.TemporaryDirectory() as workdir:
+                reset_logging()
+                setup(Path(workdir))
+                results.append((name, timed(args.threads, args.requests, args.records)))
+                # Time only the callers; the listener drains the backlog here
+                reset_logging()
+
+    print(f"{'setup':>9} {'us/request':>11}")
+    for name, micros in results:
+        print(f"{name:>9} {micros:>11.1f}")
+
+if __name__ == "__main__":
+    main()
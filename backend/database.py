@@ -1,7 +1,12 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+from fastapi import Depends
+import functools
+import inspect
 import os
 from dotenv import load_dotenv
+from utils.metrics import TimedQueuePool, instrument_engine
+from utils.slow_queries import instrument_slow_queries
 
 # Load environment variables
 load_dotenv()
@@ -17,14 +22,20 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+# Log every SQL statement; off by default, slow statements are logged regardless
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
 # Create engine with pool_pre_ping to handle connection issues
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    echo=True  # Enable SQL query logging
+    poolclass=TimedQueuePool,  # Records checkout wait times (see utils.metrics)
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    echo=DB_ECHO
 )
+instrument_engine(engine)
+instrument_slow_queries(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -36,6 +47,44 @@ SessionLocal = sessionmaker(
 # Create declarative base
 Base = declarative_base()
 
+# Serve the hot read endpoints from an async engine (asyncpg / aiosqlite)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+def async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "postgresql":
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URL)
+    # aiosqlite uses its own pool class that takes no sizing arguments
+    pool_options = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+        "pool_size": int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+        "max_overflow": 10,
+    }
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        echo=DB_ECHO,
+        **pool_options
+    )
+    instrument_engine(async_engine.sync_engine)
+    instrument_slow_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -44,6 +93,36 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async DB session (only when DB_ASYNC is enabled)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def async_db_endpoint(handler):
+    """
+    Let a sync handler or dependency taking `db: Session = Depends(get_db)`
+    run on the async engine when DB_ASYNC is set. The handler body runs via
+    AsyncSession.run_sync, so its queries await the async driver on the event
+    loop instead of occupying a threadpool worker. Without DB_ASYNC the
+    handler is returned unchanged.
+    """
+    if not DB_ASYNC:
+        return handler
+
+    signature = inspect.signature(handler)
+    parameters = [
+        param.replace(default=Depends(get_async_db)) if param.name == "db" else param
+        for param in signature.parameters.values()
+    ]
+
+    @functools.wraps(handler)
+    async def endpoint(**kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda session: handler(db=session, **kwargs))
+
+    endpoint.__signature__ = signature.replace(parameters=parameters)
+    return endpoint
+
 # Test database connection
 def test_connection():
     try:
@@ -1,23 +1,33 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from typing import Optional
-import os
+from jose import JWTError
 from dotenv import load_dotenv
 
 from models.user import User
-from database import get_db
+from database import get_db, async_db_endpoint
 from utils.auth import verify_token
+from utils.principal_cache import principal_cache
 
 load_dotenv()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-async def get_current_user(
+@async_db_endpoint
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
+    """
+    Resolve the bearer token to a user. This is a plain def on purpose:
+    FastAPI runs sync dependencies in its threadpool, so the blocking user
+    query no longer stalls every other request on the event loop. With
+    DB_ASYNC it runs on the async engine instead. Resolved users are cached
+    per token, so repeat requests skip both the JWT decode and the query.
+    """
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
     try:
         payload = verify_token(token)
         email = str(payload.get("sub", ""))
@@ -37,6 +47,9 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
+        # Detach the user so the cached instance outlives this request's session
+        db.expunge(user)
+        principal_cache.put(token, user, payload.get("exp"))
         return user
     except JWTError:
         raise HTTPException(
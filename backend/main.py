@@ -1,38 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
-from contextlib import contextmanager
 import logging
 import os
 from dotenv import load_dotenv
-from routers import auth_router, transaction, bill_of_lading
+from routers import auth_router, transaction, bill_of_lading, vehicle, analytics, diagnostics
 from dependencies import get_current_active_user
-from database import get_db, engine, SessionLocal
-from utils.logger import setup_logger
+from database import SessionLocal, async_engine
+from utils.logger import configure_logging
+from utils.bol_pdf import shutdown_render_pool
+from utils.invalidation import invalidation_bus
+from utils.metrics import MetricsMiddleware, mark_worker_dead, render_metrics
+from utils.slow_queries import shutdown_explain_pool
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-def setup_logging():
-    log_dir = os.getenv('LOG_DIR', 'logs')
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # Create handlers
-    info_handler = logging.FileHandler(os.path.join(log_dir, 'ideal-transportation.log'))
-    error_handler = logging.FileHandler(os.path.join(log_dir, 'ideal-transportation.error.log'))
-    error_handler.setLevel(logging.ERROR)
-    console_handler = logging.StreamHandler()
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[info_handler, error_handler, console_handler]
-    )
-    return logging.getLogger(__name__)
-
-logger = setup_logging()
+# Configure logging (a background writer; see utils.logger)
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(title="Ideal Transportation Solutions API")
@@ -49,16 +35,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count"],
 )
 
 # Add middleware to handle forwarded headers
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
+# Per-route latency, response size and SQL use, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(transaction.router, prefix="/api/transactions", tags=["transactions"])
 app.include_router(bill_of_lading.router, prefix="/api/bol", tags=["bill_of_lading"])
+app.include_router(vehicle.router, prefix="/api/vehicles", tags=["vehicles"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
 
 @app.on_event("startup")
 async def startup_event():
@@ -73,9 +66,17 @@ async def startup_event():
         logger.error(f"Database connection failed: {str(e)}")
         logger.error(f"Database URL: {os.getenv('DATABASE_URL')}")
         raise
+    # Evict in-process cache entries when another worker writes
+    invalidation_bus.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    shutdown_render_pool()
+    invalidation_bus.stop()
+    mark_worker_dead()
+    shutdown_explain_pool()
+    if async_engine is not None:
+        await async_engine.dispose()
     logger.info("Application shutdown complete")
 
 # Test database connection
@@ -91,13 +92,19 @@ async def root():
             detail="Internal server error"
         )
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+def health_check():
     try:
         db = SessionLocal()
         try:
-            result = db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 1"))
             db.commit()
             return {
                 "status": "healthy",
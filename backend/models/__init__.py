@@ -2,5 +2,8 @@ from .user import User
 from .transaction import Transaction
 from .daily_expense import DailyExpense
 from .bill_of_lading import BillOfLading, BOLVehicle
+from .work_order_payment import WorkOrderPayment
+from .signature_blob import SignatureBlob
+from .analytics_rollup import AnalyticsRollup
 
-__all__ = ["User", "Transaction", "DailyExpense", "BillOfLading", "BOLVehicle"] 
\ No newline at end of file
+__all__ = ["User", "Transaction", "DailyExpense", "BillOfLading", "BOLVehicle", "WorkOrderPayment", "SignatureBlob", "AnalyticsRollup"] 
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Date, Float, Integer
+from .base import Base
+
+ROLLUP_DAY = "day"
+ROLLUP_MONTH = "month"
+
+class AnalyticsRollup(Base):
+    """
+    BOL and payment totals per day and per month, driver and broker. Kept
+    current by the write paths in utils.analytics; rebuilt from the raw
+    tables by scripts/rebuild_analytics.py.
+    """
+    __tablename__ = "analytics_rollups"
+
+    # "day" or "month"; period_start is the day itself or the 1st of the month
+    granularity = Column(String(5), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    driver_name = Column(String(100), primary_key=True)
+    # "" for BOLs without a broker, so the key never contains NULL
+    broker_name = Column(String(100), primary_key=True, default="")
+    # BOLs and their vehicles dated in the period
+    bol_count = Column(Integer, nullable=False, default=0)
+    vehicle_count = Column(Integer, nullable=False, default=0)
+    # Billed: BOL totals by BOL date; collected: transactions by payment date
+    billed_amount = Column(Float, nullable=False, default=0.0)
+    collected_amount = Column(Float, nullable=False, default=0.0)
@@ -1,13 +1,18 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, DateTime, Float
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, Float, Index
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 class BillOfLading(BaseModel):
     __tablename__ = 'bill_of_lading'
+    # (sort column, id) pairs back the keyset-paginated list
+    __table_args__ = (
+        Index('ix_bill_of_lading_date_id', 'date', 'id'),
+        Index('ix_bill_of_lading_driver_name_id', 'driver_name', 'id'),
+    )
 
     driver_name = Column(String(100), nullable=False)
     date = Column(Date, nullable=False)
-    work_order_no = Column(String(50), nullable=True)
+    work_order_no = Column(String(50), nullable=True, unique=True, index=True)
     # Broker information fields
     broker_name = Column(String(100), nullable=True)
     broker_address = Column(String(200), nullable=True)
@@ -27,28 +32,43 @@ class BillOfLading(BaseModel):
     condition_codes = Column(String(200), nullable=True)  # Comma-separated codes
     remarks = Column(Text, nullable=True)
     pickup_agent_name = Column(String(100), nullable=True)
-    pickup_signature = Column(Text, nullable=True)  # base64 string
+    pickup_signature_sha256 = Column(String(64), ForeignKey('signature_blobs.sha256'), nullable=True)
     pickup_date = Column(Date, nullable=True)
     delivery_agent_name = Column(String(100), nullable=True)
-    delivery_signature = Column(Text, nullable=True)  # base64 string
+    delivery_signature_sha256 = Column(String(64), ForeignKey('signature_blobs.sha256'), nullable=True)
     delivery_date = Column(Date, nullable=True)
     # New receiver agent fields
     receiver_agent_name = Column(String(100), nullable=True)
-    receiver_signature = Column(Text, nullable=True)
+    receiver_signature_sha256 = Column(String(64), ForeignKey('signature_blobs.sha256'), nullable=True)
     receiver_date = Column(Date, nullable=True)
     # Total amount field for payment tracking
     total_amount = Column(Float, nullable=True)
+    # Lower-cased text of the searchable fields and VINs (see utils/bol_search.py).
+    # On Postgres the migration also adds a generated search_vector tsvector
+    # column, which is queried directly and deliberately not mapped here.
+    search_text = Column(Text, nullable=True)
+
+    # Signature data URLs are kept in signature_blobs; these plain attributes are
+    # filled in by utils.signature_store.attach_signatures when a response needs them
+    pickup_signature = None
+    delivery_signature = None
+    receiver_signature = None
 
     vehicles = relationship('BOLVehicle', back_populates='bill_of_lading', cascade='all, delete-orphan')
+    payment = relationship('WorkOrderPayment', back_populates='bill_of_lading', uselist=False, cascade='all, delete-orphan')
 
 class BOLVehicle(BaseModel):
     __tablename__ = 'bol_vehicle'
+    # Serves VIN prefix (LIKE 'ABC%') lookups on Postgres; exact ones use ix_bol_vehicle_vin
+    __table_args__ = (
+        Index('ix_bol_vehicle_vin_pattern', 'vin', postgresql_ops={'vin': 'varchar_pattern_ops'}).ddl_if(dialect='postgresql'),
+    )
 
-    bill_of_lading_id = Column(Integer, ForeignKey('bill_of_lading.id'), nullable=False)
+    bill_of_lading_id = Column(Integer, ForeignKey('bill_of_lading.id'), nullable=False, index=True)
     year = Column(String(10), nullable=True)
     make = Column(String(50), nullable=True)
     model = Column(String(50), nullable=True)
-    vin = Column(String(50), nullable=True)
+    vin = Column(String(50), nullable=True, index=True)  # Normalized, see utils.vin
     mileage = Column(String(50), nullable=True)
     price = Column(String(50), nullable=True)
 
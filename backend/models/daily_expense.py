@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class DailyExpense(Base):
     __tablename__ = "daily_expenses"
+    __table_args__ = (
+        Index("ix_daily_expenses_user_id_date_id", "user_id", "date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Integer, LargeBinary, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+
+class SignatureBlob(Base):
+    """Content-addressed signature image, shared by every BOL that references it"""
+    __tablename__ = "signature_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    # MIME type from the original data URL; NULL when the value was stored verbatim
+    content_type = Column(String(100), nullable=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
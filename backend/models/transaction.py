@@ -1,17 +1,20 @@
-from sqlalchemy import Column, String, Date, Float, ForeignKey, Integer
+from sqlalchemy import Column, String, Date, Float, ForeignKey, Integer, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_id_date_id", "user_id", "date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     # Work order and payment tracking fields
-    work_order_no = Column(String(50), nullable=False)
+    work_order_no = Column(String(50), nullable=False, index=True)
     collected_amount = Column(Float, nullable=False)
     due_amount = Column(Float, nullable=False)
-    bol_id = Column(Integer, ForeignKey("bill_of_lading.id"), nullable=False)
+    bol_id = Column(Integer, ForeignKey("bill_of_lading.id"), nullable=False, index=True)
     # Location and payment information (kept from original)
     pickup_location = Column(String, nullable=False)
     dropoff_location = Column(String, nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import Base
+
+PAYMENT_STATUS_PAID = "paid"
+PAYMENT_STATUS_PENDING = "pending"
+
+class WorkOrderPayment(Base):
+    """Running payment totals for a BOL, maintained alongside its transactions."""
+    __tablename__ = "work_order_payments"
+
+    bol_id = Column(Integer, ForeignKey("bill_of_lading.id", ondelete="CASCADE"), primary_key=True)
+    work_order_no = Column(String(50), nullable=True, index=True)
+    total_amount = Column(Float, nullable=True)
+    total_collected = Column(Float, nullable=False, default=0.0)
+    due_amount = Column(Float, nullable=False, default=0.0)
+    # "paid" or "pending"; NULL while the BOL has no total amount
+    status = Column(String(10), nullable=True, index=True)
+    last_payment_at = Column(DateTime(timezone=True), nullable=True)
+
+    bill_of_lading = relationship("BillOfLading", back_populates="payment")
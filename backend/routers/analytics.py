@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+
+from schemas.analytics import RevenuePoint, DeliveryPoint
+from database import get_db, async_db_endpoint
+from dependencies import get_current_user
+from utils.analytics import GRANULARITIES, rollup_series
+
+router = APIRouter()
+
+GRANULARITY_PATTERN = "^(" + "|".join(GRANULARITIES) + ")$"
+
+def _series(db: Session, granularity: str, metrics: List[str], *args):
+    try:
+        return rollup_series(db, granularity, metrics, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/revenue", response_model=List[RevenuePoint])
+@async_db_endpoint
+def get_revenue(
+    granularity: str = Query("month", pattern=GRANULARITY_PATTERN),
+    start: Optional[date] = Query(None, description="First day of the first period (YYYY-MM-DD): a Monday for weeks, the 1st for months"),
+    end: Optional[date] = Query(None, description="The period containing this day is the last one, counted in full (YYYY-MM-DD)"),
+    driver: Optional[str] = Query(None, description="Driver name"),
+    broker: Optional[str] = Query(None, description="Broker name"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Billed (by BOL date) and collected (by payment date) amounts per period
+    """
+    return _series(db, granularity, ["billed_amount", "collected_amount"], start, end, driver, broker)
+
+@router.get("/deliveries", response_model=List[DeliveryPoint])
+@async_db_endpoint
+def get_deliveries(
+    granularity: str = Query("month", pattern=GRANULARITY_PATTERN),
+    start: Optional[date] = Query(None, description="First day of the first period (YYYY-MM-DD): a Monday for weeks, the 1st for months"),
+    end: Optional[date] = Query(None, description="The period containing this day is the last one, counted in full (YYYY-MM-DD)"),
+    driver: Optional[str] = Query(None, description="Driver name"),
+    broker: Optional[str] = Query(None, description="Broker name"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    BOLs and vehicles moved per period
+    """
+    return _series(db, granularity, ["bol_count", "vehicle_count"], start, end, driver, broker)
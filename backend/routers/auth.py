@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from typing import Any, Optional
-from jose import JWTError, jwt
+from typing import Any
+from jose import JWTError
 
 from models.user import User
 from schemas.auth import UserCreate, User as UserSchema, Token
@@ -16,8 +16,9 @@ from utils.auth import (
     verify_token,
 )
 from database import get_db
-from dependencies import get_current_user, get_current_admin_user
+from dependencies import get_current_admin_user
 from utils.logger import setup_logger
+from utils.invalidation import PRINCIPALS, invalidation_bus
 from schemas.user import AdminUserCreate
 from typing import List
 
@@ -92,8 +93,9 @@ def login_for_access_token(
     logger.info(f"Login successful: {form_data.username}")
     return {"access_token": access_token, "token_type": "bearer"}
 
+# Plain def: FastAPI runs it in the threadpool, so the user lookup does not block the event loop
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
@@ -230,6 +232,7 @@ def update_user(
     
     db.commit()
     db.refresh(db_user)
+    invalidation_bus.publish(PRINCIPALS, user_id)
     
     logger.info(f"User updated successfully by admin {current_user.email}: {user_id}")
     return db_user
@@ -262,6 +265,7 @@ def delete_user(
     
     db.delete(db_user)
     db.commit()
+    invalidation_bus.publish(PRINCIPALS, user_id)
     
     logger.info(f"User deleted successfully by admin {current_user.email}: {user_id}")
     return {"detail": "User deleted successfully"}
\ No newline at end of file
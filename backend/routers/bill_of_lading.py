@@ -1,20 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from schemas.bill_of_lading import BillOfLadingCreate, BillOfLading as BillOfLadingSchema
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy import select
+from schemas.bill_of_lading import BillOfLadingCreate, BillOfLading as BillOfLadingSchema, BOLVehicle as BOLVehicleSchema
 from models.bill_of_lading import BillOfLading, BOLVehicle
 from models.transaction import Transaction
-from database import get_db
-from typing import List, Dict, Any, Optional
+from models.work_order_payment import WorkOrderPayment
+from database import get_db, async_db_endpoint
+from dependencies import get_current_admin_user
+from models.user import User
+from utils.payment_ledger import (
+    sync_bol_payment,
+    get_ledger_for_work_order,
+    work_order_payment_summary,
+    list_pending_payments,
+)
+from utils.pagination import paginate
+from utils.export import EXPORT_FORMATS, stream_rows, export_response
+from utils.bol_pdf import bol_document, document_version, pdf_cache, render_documents
+from utils.signature_store import (
+    SIGNATURE_FIELDS,
+    signature_ref,
+    assign_signatures,
+    attach_signatures,
+    load_blobs,
+    release_signatures,
+    signature_refs,
+)
+from models.signature_blob import SignatureBlob
+from utils.projection import parse_projection, projected_model, projected_response
+from utils.serialization import json_response, object_dicts
+from utils.bol_import import IMPORT_FORMATS, IMPORT_CHUNK_SIZE, read_bol_payloads, import_bols
+from utils.bol_search import build_search_text, search_bol_ids
+from utils.invalidation import BOLS, invalidation_bus
+from utils.payment_cache import payment_cache, collected_by_work_order
+from utils.analytics import RollupChanges, bol_facts, record_bol
+from utils.logger import setup_logger
+from typing import List, Dict, Optional
 import time
-from functools import lru_cache
-from datetime import datetime
+from datetime import datetime, timezone
+import io
+import logging
+import zipfile
 
-router = APIRouter()
+logger = setup_logger(__name__, "bill_of_lading.log")
 
-# Simple in-memory cache for payment data (expires after 6 minutes)
-_payment_cache = {}
-_cache_expiry = {}
+router = APIRouter()
 
 def parse_date_string(date_str: Optional[str]) -> Optional[datetime]:
     """Convert string date to datetime object"""
@@ -25,35 +55,96 @@ def parse_date_string(date_str: Optional[str]) -> Optional[datetime]:
     except (ValueError, TypeError):
         return None
 
-def get_cached_payment_data(work_order_nos: List[str], db: Session) -> Dict[str, float]:
-    """Get payment data with simple caching"""
-    current_time = time.time()
-    cache_key = ",".join(sorted(work_order_nos))
-    
-    # Check if cache is valid
-    if (cache_key in _payment_cache and 
-        cache_key in _cache_expiry and 
-        current_time < _cache_expiry[cache_key]):
-        return _payment_cache[cache_key]
-    
-    # Fetch fresh data
-    if work_order_nos:
-        payment_results = db.query(
-            Transaction.work_order_no,
-            func.sum(Transaction.collected_amount).label('total_collected')
-        ).filter(
-            Transaction.work_order_no.in_(work_order_nos)
-        ).group_by(Transaction.work_order_no).all()
-        
-        payment_data = {row.work_order_no: float(row.total_collected) for row in payment_results}
-    else:
-        payment_data = {}
-    
-    # Cache for 5 minutes
-    _payment_cache[cache_key] = payment_data
-    _cache_expiry[cache_key] = current_time + 300  # 5 minutes
+def apply_bol_filters(
+    query,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    work_order_no: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    ledger_joined: bool = False,
+):
+    """Apply the BOL list filters to an ORM query or Core select over BillOfLading"""
+    # Payment status filtering uses the indexed status column of the payment ledger
+    if payment_status and payment_status != "all":
+        if not ledger_joined:
+            query = query.join(
+                WorkOrderPayment,
+                WorkOrderPayment.bol_id == BillOfLading.id
+            )
+        query = query.filter(WorkOrderPayment.status == payment_status)
     
-    return payment_data
+    if from_date:
+        query = query.filter(BillOfLading.date >= from_date)
+    if to_date:
+        query = query.filter(BillOfLading.date <= to_date)
+    if work_order_no:
+        query = query.filter(BillOfLading.work_order_no.ilike(f"%{work_order_no}%"))
+    return query
+
+# Date columns that the BOL schema renders as YYYY-MM-DD strings
+BOL_DATE_FIELDS = frozenset(["date", "pickup_date", "delivery_date", "receiver_date"])
+# Response fields computed from the payment ledger rather than read from a column
+BOL_PAYMENT_FIELDS = frozenset(["total_collected", "due_amount"])
+BOL_RESPONSE_FIELDS = [name for name in BillOfLadingSchema.model_fields if name != "vehicles"]
+BOL_VEHICLE_RESPONSE_FIELDS = list(BOLVehicleSchema.model_fields)
+
+def _bol_projection_options(projection, extra_columns=()):
+    """Loader options that fetch only the columns a projected BOL response needs"""
+    columns = {"id", *extra_columns}
+    for name in projection:
+        if name in SIGNATURE_FIELDS:
+            columns.add(signature_ref(name))
+        elif name in BOL_PAYMENT_FIELDS:
+            columns.update(("work_order_no", "total_amount"))
+        elif name != "vehicles":
+            columns.add(name)
+    options = [load_only(*[getattr(BillOfLading, column) for column in sorted(columns)])]
+    if "vehicles" in projection:
+        options.append(selectinload(BillOfLading.vehicles))
+    return options
+
+def _bol_page_query(db: Session, projection, extra_columns=()):
+    """BOL query loading what a (possibly projected) page of results needs"""
+    query = db.query(BillOfLading)
+    if projection is not None:
+        return query.options(*_bol_projection_options(projection, extra_columns))
+    # Load the vehicles of the whole page in one IN query rather than one per BOL
+    return query.options(selectinload(BillOfLading.vehicles))
+
+def _decorate_bols(db: Session, bols, projection=None):
+    """Attach signatures and payment totals to a page of BOLs, skipping what the projection leaves out"""
+    attach_signatures(db, bols, fields=SIGNATURE_FIELDS if projection is None else projection)
+    
+    if projection is None or projection & BOL_PAYMENT_FIELDS:
+        # Batch fetch payment data, querying only the work orders not cached yet
+        work_order_nos = [bol.work_order_no for bol in bols if bol.work_order_no]
+        payment_data = collected_by_work_order(db, work_order_nos)
+        
+        # Process results efficiently
+        for bol in bols:
+            total_collected = payment_data.get(bol.work_order_no, 0.0) if bol.work_order_no else 0.0
+            total_amount = bol.total_amount or 0.0
+            due_amount = max(0.0, total_amount - total_collected)
+            
+            # Add payment info to the BOL object
+            bol.total_collected = total_collected
+            bol.due_amount = due_amount
+
+def _bol_projected_response(projection, data):
+    model = projected_model(BillOfLadingSchema, projection, BOL_DATE_FIELDS & projection)
+    return projected_response(model, data)
+
+def _bol_list_response(bols, projection, response: Response):
+    """
+    Encode a decorated page of BOLs straight from their attributes; the
+    values already have the schema's types, so no Pydantic round-trip
+    """
+    fields = [name for name in BOL_RESPONSE_FIELDS if projection is None or name in projection]
+    rows = object_dicts(bols, fields)
+    if projection is None or "vehicles" in projection:
+        for row, bol in zip(rows, bols):
+            row["vehicles"] = object_dicts(bol.vehicles, BOL_VEHICLE_RESPONSE_FIELDS)
+    return json_response(rows, response)
 
 @router.post("/", status_code=201)
 def create_bill_of_lading(bol: BillOfLadingCreate, db: Session = Depends(get_db)):
@@ -101,21 +192,21 @@ def create_bill_of_lading(bol: BillOfLadingCreate, db: Session = Depends(get_db)
         condition_codes=bol.condition_codes,
         remarks=bol.remarks,
         pickup_agent_name=bol.pickup_agent_name,
-        pickup_signature=bol.pickup_signature,
         pickup_date=parse_date_string(bol.pickup_date),
         delivery_agent_name=bol.delivery_agent_name,
-        delivery_signature=bol.delivery_signature,
         delivery_date=parse_date_string(bol.delivery_date),
         # New receiver agent fields
         receiver_agent_name=bol.receiver_agent_name,
-        receiver_signature=bol.receiver_signature,
         receiver_date=parse_date_string(bol.receiver_date),
         # Total amount calculated from vehicles
         total_amount=total_amount,
+        search_text=build_search_text(bol, bol.vehicles),
     )
+    # Signatures go to the content-addressed store; the BOL keeps their hashes
+    assign_signatures(db, db_bol, bol)
     db.add(db_bol)
-    db.commit()
-    db.refresh(db_bol)
+    # Flush for the id only: the BOL, its vehicles, ledger row and rollups commit together
+    db.flush()
     
     # Add vehicles
     for v in bol.vehicles:
@@ -129,11 +220,53 @@ def create_bill_of_lading(bol: BillOfLadingCreate, db: Session = Depends(get_db)
             price=v.price,
         )
         db.add(db_vehicle)
+    sync_bol_payment(db, db_bol)
+    record_bol(db, bol_facts(db, db_bol, len(bol.vehicles)))
     db.commit()
+    invalidation_bus.publish(BOLS, db_bol.id)
     return {"id": db_bol.id, "total_amount": total_amount}
 
+@router.post("/import")
+def import_bill_of_lading(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, enum=IMPORT_FORMATS, description="Defaults to the file extension"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Bulk-create BOLs from a CSV, XLSX or NDJSON file (Admin only).
+
+    CSV/XLSX files have one vehicle per row: the BOL columns use the create
+    payload's field names and the vehicle columns are prefixed with
+    `vehicle_` (vehicle_year, vehicle_vin, ...). Consecutive rows with the
+    same work_order_no make up one BOL. NDJSON lines are full create payloads.
+    Valid rows are imported even when others fail; the response lists the
+    failures by source row.
+    """
+    import_format = format or (file.filename or "").rsplit(".", 1)[-1].lower()
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported import format; expected one of {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    start_time = time.time()
+    try:
+        result = import_bols(db, read_bol_payloads(file.file, import_format), chunk_size=chunk_size)
+    except (ValueError, KeyError, zipfile.BadZipFile) as e:
+        # Unreadable file (bad encoding, not a workbook, ...); earlier chunks stay committed
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read {import_format} file: {e}"
+        )
+    result["seconds"] = round(time.time() - start_time, 3)
+    return result
+
 @router.get("/", response_model=List[BillOfLadingSchema])
+@async_db_endpoint
 def list_bill_of_lading(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=1000),  # Default 20, max 1000 for exports
@@ -142,127 +275,337 @@ def list_bill_of_lading(
     work_order_no: Optional[str] = Query(None),
     payment_status: Optional[str] = Query(None, enum=["all", "paid", "pending"]),
     sort_by: str = Query("date", enum=["date", "work_order_no", "driver_name"]),
-    sort_order: str = Query("asc", enum=["asc", "desc"])
+    sort_order: str = Query("asc", enum=["asc", "desc"]),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to leave out")
 ):
-    start_time = time.time()
-    
-    # For payment status filtering, we need to use a subquery approach
-    if payment_status and payment_status != "all":
-        # Create a subquery to get work orders with their payment status
-        payment_subquery = db.query(
-            Transaction.work_order_no,
-            func.sum(Transaction.collected_amount).label('total_collected')
-        ).group_by(Transaction.work_order_no).subquery()
-        
-        # Join with BOLs to get payment information
-        query = db.query(BillOfLading).outerjoin(
-            payment_subquery, 
-            BillOfLading.work_order_no == payment_subquery.c.work_order_no
-        )
-        
-        # Apply payment status filter
-        if payment_status == "paid":
-            # Fully paid: total_collected >= total_amount
-            query = query.filter(
-                func.coalesce(payment_subquery.c.total_collected, 0) >= BillOfLading.total_amount
-            )
-        elif payment_status == "pending":
-            # Pending/partial: total_collected < total_amount
-            query = query.filter(
-                func.coalesce(payment_subquery.c.total_collected, 0) < BillOfLading.total_amount
-            )
-    else:
-        # No payment status filter, use simple query
-        query = db.query(BillOfLading)
-    
-    # Apply other filters
-    if from_date:
-        query = query.filter(BillOfLading.date >= from_date)
-    if to_date:
-        query = query.filter(BillOfLading.date <= to_date)
-    if work_order_no:
-        query = query.filter(BillOfLading.work_order_no.ilike(f"%{work_order_no}%"))
+    """
+    List BOLs with filtering and sorting. Passing `cursor` switches from
+    skip/limit to keyset pagination: the next/previous page cursors are
+    returned in the X-Next-Cursor / X-Prev-Cursor headers. `fields` /
+    `exclude` restrict both the columns loaded and the response shape.
+    """
+    projection = parse_projection(BillOfLadingSchema, fields, exclude)
+    query = _bol_page_query(db, projection, extra_columns=[sort_by])
+    query = apply_bol_filters(query, from_date, to_date, work_order_no, payment_status)
     
-    # Apply sorting
     sort_column = getattr(BillOfLading, sort_by, BillOfLading.date)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
-    
-    # Apply pagination
-    bols = query.offset(skip).limit(limit).all()
+    # Keyset pagination seeks past the cursor position instead of skipping rows
+    bols = paginate(
+        query, response, sort_column, BillOfLading.id,
+        sort_key=f"{sort_by}:{sort_order}", descending=sort_order == "desc",
+        cursor=cursor, skip=skip, limit=limit,
+    )
     
     if not bols:
         return []
     
-    # Batch fetch payment data for all work orders at once (with caching)
-    work_order_nos = [bol.work_order_no for bol in bols if bol.work_order_no]
-    payment_data = get_cached_payment_data(work_order_nos, db)
+    _decorate_bols(db, bols, projection)
     
-    # Process results efficiently
-    for bol in bols:
-        total_collected = payment_data.get(bol.work_order_no, 0.0) if bol.work_order_no else 0.0
-        total_amount = bol.total_amount or 0.0
-        due_amount = max(0.0, total_amount - total_collected)
-        
-        # Add payment info to the BOL object
-        bol.total_collected = total_collected
-        bol.due_amount = due_amount
+    return _bol_list_response(bols, projection, response)
+
+@router.get("/search", response_model=List[BillOfLadingSchema])
+@async_db_endpoint
+def search_bill_of_lading(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Broker, driver, city, VIN, remarks, ..."),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to leave out"),
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over BOLs and their vehicles, best matches first.
+    Every word must match, as a whole word or a prefix.
+    """
+    projection = parse_projection(BillOfLadingSchema, fields, exclude)
+    ids = search_bol_ids(db, q, skip, limit)
+    if not ids:
+        return []
     
-    # Log performance metrics
-    end_time = time.time()
-    query_time = end_time - start_time
-    print(f"BOL Query Performance: {query_time:.3f}s for {len(bols)} records (skip={skip}, limit={limit})")
+    by_id = {bol.id: bol for bol in _bol_page_query(db, projection).filter(BillOfLading.id.in_(ids))}
+    bols = [by_id[bol_id] for bol_id in ids if bol_id in by_id]
+    _decorate_bols(db, bols, projection)
     
-    return bols
+    return _bol_list_response(bols, projection, response)
 
-@router.get("/pending-payments")
-def get_bols_with_pending_payments(db: Session = Depends(get_db)):
+BOL_EXPORT_COLUMNS = [
+    "Driver", "Date", "Work Order No",
+    "Broker Name", "Broker Address", "Broker Phone",
+    "Pickup Name", "Pickup Address", "Pickup City", "Pickup State", "Pickup Zip",
+    "Delivery Name", "Delivery Address", "Delivery City", "Delivery State", "Delivery Zip",
+    "Total Amount", "Amount Paid", "Due Amount", "Status",
+    "Vehicle Count", "Vehicles", "Condition Codes", "Remarks",
+]
+
+def _bol_export_rows(db: Session, batch):
+    """Attach vehicle summaries to a batch of exported BOL rows with one query"""
+    vehicles: Dict[int, List[str]] = {}
+    vehicle_rows = db.execute(
+        select(
+            BOLVehicle.bill_of_lading_id,
+            BOLVehicle.year,
+            BOLVehicle.make,
+            BOLVehicle.model,
+            BOLVehicle.vin,
+        ).where(
+            BOLVehicle.bill_of_lading_id.in_([row.id for row in batch])
+        ).order_by(BOLVehicle.id)
+    )
+    for v in vehicle_rows:
+        vehicles.setdefault(v.bill_of_lading_id, []).append(f"{v.year} {v.make} {v.model} ({v.vin})")
+    
+    for row in batch:
+        total_amount = row.total_amount or 0.0
+        collected = row.total_collected or 0.0
+        due_amount = max(0.0, total_amount - collected)
+        if due_amount <= 0:
+            payment_label = "Paid"
+        elif collected > 0:
+            payment_label = "Partial"
+        else:
+            payment_label = "Pending"
+        bol_vehicles = vehicles.get(row.id, [])
+        yield (
+            row.driver_name, row.date, row.work_order_no or "N/A",
+            row.broker_name, row.broker_address, row.broker_phone,
+            row.pickup_name, row.pickup_address, row.pickup_city, row.pickup_state, row.pickup_zip,
+            row.delivery_name, row.delivery_address, row.delivery_city, row.delivery_state, row.delivery_zip,
+            total_amount, collected, due_amount, payment_label,
+            len(bol_vehicles), "; ".join(bol_vehicles), row.condition_codes, row.remarks,
+        )
+
+@router.get("/export")
+def export_bill_of_lading(
+    format: str = Query("csv", enum=EXPORT_FORMATS),
+    gzip: bool = Query(False),
+    from_date: Optional[str] = Query(None),
+    to_date: Optional[str] = Query(None),
+    work_order_no: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None, enum=["all", "paid", "pending"]),
+    sort_by: str = Query("date", enum=["date", "work_order_no", "driver_name"]),
+    sort_order: str = Query("asc", enum=["asc", "desc"])
+):
     """
-    Get BOLs that have pending payments (total_amount > collected_amount)
+    Stream every BOL matching the list filters as CSV, NDJSON or XLSX.
+    Rows are read through a server-side cursor and signatures are never
+    loaded, so memory use does not depend on the number of rows.
     """
-    # Subquery to get total collected amount for each work order
-    collected_amounts = db.query(
-        Transaction.work_order_no,
-        func.sum(Transaction.collected_amount).label('total_collected')
-    ).group_by(Transaction.work_order_no).subquery()
-    
-    # Query BOLs with pending payments
-    pending_bols = db.query(
+    statement = select(
         BillOfLading.id,
-        BillOfLading.work_order_no,
         BillOfLading.driver_name,
         BillOfLading.date,
+        BillOfLading.work_order_no,
+        BillOfLading.broker_name,
+        BillOfLading.broker_address,
+        BillOfLading.broker_phone,
+        BillOfLading.pickup_name,
+        BillOfLading.pickup_address,
+        BillOfLading.pickup_city,
+        BillOfLading.pickup_state,
+        BillOfLading.pickup_zip,
+        BillOfLading.delivery_name,
+        BillOfLading.delivery_address,
+        BillOfLading.delivery_city,
+        BillOfLading.delivery_state,
+        BillOfLading.delivery_zip,
+        BillOfLading.condition_codes,
+        BillOfLading.remarks,
         BillOfLading.total_amount,
-        func.coalesce(collected_amounts.c.total_collected, 0).label('total_collected'),
-        (BillOfLading.total_amount - func.coalesce(collected_amounts.c.total_collected, 0)).label('due_amount')
+        WorkOrderPayment.total_collected,
     ).outerjoin(
-        collected_amounts, 
-        BillOfLading.work_order_no == collected_amounts.c.work_order_no
-    ).filter(
-        BillOfLading.total_amount > func.coalesce(collected_amounts.c.total_collected, 0)
-    ).all()
-    
-    return [
-        {
-            "id": bol.id,
-            "work_order_no": bol.work_order_no,
-            "driver_name": bol.driver_name,
-            "date": bol.date,
-            "total_amount": bol.total_amount,
-            "total_collected": float(bol.total_collected),
-            "due_amount": float(bol.due_amount)
+        WorkOrderPayment, WorkOrderPayment.bol_id == BillOfLading.id
+    )
+    statement = apply_bol_filters(
+        statement, from_date, to_date, work_order_no, payment_status, ledger_joined=True
+    )
+    
+    sort_column = getattr(BillOfLading, sort_by, BillOfLading.date)
+    if sort_order == "desc":
+        statement = statement.order_by(sort_column.desc(), BillOfLading.id.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), BillOfLading.id.asc())
+    
+    return export_response(
+        stream_rows(statement, transform=_bol_export_rows),
+        BOL_EXPORT_COLUMNS,
+        filename="BOL_Report",
+        export_format=format,
+        gzip=gzip,
+        sheet_name="Bill of Lading",
+    )
+
+@router.get("/payment-cache/stats")
+def get_payment_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Hit rate and size of the per-work-order payment cache
+    """
+    return payment_cache.stats()
+
+@router.get("/pending-payments")
+@async_db_endpoint
+def get_bols_with_pending_payments(db: Session = Depends(get_db)):
+    """
+    Get BOLs that have pending payments (total_amount > collected_amount)
+    """
+    return list_pending_payments(db)
+
+# Upper bound on the number of BOLs in one bulk PDF download
+MAX_BULK_PDF = 500
+
+def _rendered_pdfs(db: Session, bol_ids: List[int]) -> Dict[int, bytes]:
+    """
+    Return PDFs for the given BOLs, rendering only those whose cached copy is
+    missing or older than the BOL's last update.
+    """
+    versions = db.query(
+        BillOfLading.id, BillOfLading.updated_at, BillOfLading.created_at
+    ).filter(BillOfLading.id.in_(bol_ids)).all()
+    
+    pdfs: Dict[int, bytes] = {}
+    misses: List[int] = []
+    for row in versions:
+        cached = pdf_cache.get(row.id, document_version(row.updated_at, row.created_at))
+        if cached is None:
+            misses.append(row.id)
+        else:
+            pdfs[row.id] = cached
+    
+    if misses:
+        bols = db.query(BillOfLading).options(
+            selectinload(BillOfLading.vehicles)
+        ).filter(BillOfLading.id.in_(misses)).all()
+        attach_signatures(db, bols)
+        pdfs.update(render_documents([bol_document(bol) for bol in bols]))
+    return pdfs
+
+@router.get("/pdf")
+def download_bill_of_lading_pdfs(
+    ids: str = Query(..., description="Comma-separated BOL ids"),
+    db: Session = Depends(get_db)
+):
+    """
+    Download several BOL PDFs as one ZIP archive
+    """
+    try:
+        bol_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not bol_ids or len(bol_ids) > MAX_BULK_PDF:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {MAX_BULK_PDF} BOL ids"
+        )
+    
+    pdfs = _rendered_pdfs(db, bol_ids)
+    missing = [bol_id for bol_id in bol_ids if bol_id not in pdfs]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"BOL(s) not found: {', '.join(map(str, missing))}"
+        )
+    
+    archive = io.BytesIO()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zf:
+        for bol_id in bol_ids:
+            zf.writestr(f"BillOfLading_{bol_id}.pdf", pdfs[bol_id])
+    return Response(
+        content=archive.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="BillOfLading.zip"'}
+    )
+
+@router.get("/{bol_id}/pdf")
+def download_bill_of_lading_pdf(bol_id: int, db: Session = Depends(get_db)):
+    """
+    Download a rendered PDF for a specific BOL
+    """
+    pdfs = _rendered_pdfs(db, [bol_id])
+    if bol_id not in pdfs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"BOL with ID {bol_id} not found"
+        )
+    return Response(
+        content=pdfs[bol_id],
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="BillOfLading_{bol_id}.pdf"'}
+    )
+
+def _signature_response(blob: SignatureBlob) -> Response:
+    # Blobs are addressed by content hash, so they never change
+    return Response(
+        content=blob.data,
+        media_type=blob.content_type or "text/plain",
+        headers={
+            "ETag": f'"{blob.sha256}"',
+            "Cache-Control": "private, max-age=31536000, immutable",
         }
-        for bol in pending_bols
-    ]
+    )
+
+@router.get("/signatures/{sha256}")
+def get_signature_blob(sha256: str, db: Session = Depends(get_db)):
+    """
+    Fetch a stored signature image by its SHA-256 reference
+    """
+    blob = db.get(SignatureBlob, sha256.lower())
+    if not blob:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Signature not found"
+        )
+    return _signature_response(blob)
+
+@router.get("/{bol_id}/signatures/{kind}")
+def get_bill_of_lading_signature(
+    bol_id: int,
+    kind: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Fetch one signature of a BOL (kind is pickup, delivery or receiver)
+    """
+    field = f"{kind}_signature"
+    if field not in SIGNATURE_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown signature kind '{kind}'"
+        )
+    sha = db.query(getattr(BillOfLading, signature_ref(field))).filter(
+        BillOfLading.id == bol_id
+    ).scalar()
+    blob = load_blobs(db, [sha]).get(sha)
+    if not blob:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"BOL {bol_id} has no {kind} signature"
+        )
+    return _signature_response(blob)
 
 @router.get("/{bol_id}", response_model=BillOfLadingSchema)
-def get_bill_of_lading(bol_id: int, db: Session = Depends(get_db)):
+@async_db_endpoint
+def get_bill_of_lading(
+    bol_id: int,
+    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to leave out")
+):
     """
     Get a specific BOL by ID with payment information
     """
-    bol = db.query(BillOfLading).filter(BillOfLading.id == bol_id).first()
+    projection = parse_projection(BillOfLadingSchema, fields, exclude)
+    query = db.query(BillOfLading)
+    if projection is not None:
+        query = query.options(*_bol_projection_options(projection))
+    else:
+        query = query.options(selectinload(BillOfLading.vehicles))
+    bol = query.filter(BillOfLading.id == bol_id).first()
     
     if not bol:
         raise HTTPException(
@@ -270,21 +613,20 @@ def get_bill_of_lading(bol_id: int, db: Session = Depends(get_db)):
             detail=f"BOL with ID {bol_id} not found"
         )
     
-    # Get payment information
-    if bol.work_order_no:
-        total_collected = db.query(func.sum(Transaction.collected_amount)).filter(
-            Transaction.work_order_no == bol.work_order_no
-        ).scalar() or 0.0
-    else:
-        total_collected = 0.0
-    
-    total_amount = bol.total_amount or 0.0
-    due_amount = max(0.0, total_amount - total_collected)
-    
-    # Add payment info to the BOL object
-    bol.total_collected = total_collected
-    bol.due_amount = due_amount
+    if projection is None or projection & BOL_PAYMENT_FIELDS:
+        # Get payment information from the ledger
+        total_collected = bol.payment.total_collected if bol.payment else 0.0
+        
+        total_amount = bol.total_amount or 0.0
+        due_amount = max(0.0, total_amount - total_collected)
+        
+        # Add payment info to the BOL object
+        bol.total_collected = total_collected
+        bol.due_amount = due_amount
+    attach_signatures(db, [bol], fields=SIGNATURE_FIELDS if projection is None else projection)
     
+    if projection is not None:
+        return _bol_projected_response(projection, bol)
     return bol
 
 @router.put("/{bol_id}", response_model=BillOfLadingSchema)
@@ -296,8 +638,9 @@ def update_bill_of_lading(
     """
     Update an existing BOL
     """
-    print(f"DEBUG: Received BOL update for ID {bol_id}")
-    print(f"DEBUG: BOL data: {bol_update.dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        # The signatures are base64 images; leave them out of the log
+        logger.debug(f"BOL update for ID {bol_id}: {bol_update.dict(exclude=set(SIGNATURE_FIELDS))}")
     # Check if BOL exists
     existing_bol = db.query(BillOfLading).filter(BillOfLading.id == bol_id).first()
     if not existing_bol:
@@ -305,6 +648,7 @@ def update_bill_of_lading(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"BOL with ID {bol_id} not found"
         )
+    old_facts = bol_facts(db, existing_bol)
     
     # Check if work order number is being changed and if new one already exists
     if (bol_update.work_order_no and 
@@ -330,7 +674,7 @@ def update_bill_of_lading(
     
     # Update BOL fields with proper date conversion
     for field, value in bol_update.dict().items():
-        if field != 'vehicles' and hasattr(existing_bol, field):
+        if field != 'vehicles' and field not in SIGNATURE_FIELDS and hasattr(existing_bol, field):
             # Handle date fields specially
             if field in ['date', 'pickup_date', 'delivery_date', 'receiver_date']:
                 setattr(existing_bol, field, parse_date_string(value))
@@ -338,6 +682,13 @@ def update_bill_of_lading(
                 setattr(existing_bol, field, value)
     
     existing_bol.total_amount = total_amount
+    existing_bol.search_text = build_search_text(existing_bol, bol_update.vehicles)
+    old_signatures = signature_refs(existing_bol)
+    assign_signatures(db, existing_bol, bol_update)
+    release_signatures(db, old_signatures - signature_refs(existing_bol))
+    # Always bump updated_at so vehicle-only edits also invalidate rendered PDFs
+    existing_bol.updated_at = datetime.now(timezone.utc)
+    sync_bol_payment(db, existing_bol)
     
     # Delete existing vehicles and add new ones
     db.query(BOLVehicle).filter(BOLVehicle.bill_of_lading_id == bol_id).delete()
@@ -354,20 +705,25 @@ def update_bill_of_lading(
         )
         db.add(db_vehicle)
     
+    # Move the BOL's contribution (and its payments, if driver or broker changed) in the rollups
+    new_facts = bol_facts(db, existing_bol, len(bol_update.vehicles))
+    rollups = RollupChanges()
+    rollups.add_bol(old_facts, sign=-1)
+    rollups.add_bol(new_facts)
+    rollups.move_payments(db, bol_id, old_facts, new_facts)
+    rollups.apply(db)
+    
     db.commit()
     db.refresh(existing_bol)
+    invalidation_bus.publish(BOLS, bol_id)
     
     # Add payment information
-    if existing_bol.work_order_no:
-        total_collected = db.query(func.sum(Transaction.collected_amount)).filter(
-            Transaction.work_order_no == existing_bol.work_order_no
-        ).scalar() or 0.0
-    else:
-        total_collected = 0.0
+    total_collected = existing_bol.payment.total_collected if existing_bol.payment else 0.0
     
     due_amount = max(0.0, total_amount - total_collected)
     existing_bol.total_collected = total_collected
     existing_bol.due_amount = due_amount
+    attach_signatures(db, [existing_bol])
     
     return existing_bol
 
@@ -396,24 +752,28 @@ def delete_bill_of_lading(bol_id: int, db: Session = Depends(get_db)):
                 detail=f"Cannot delete BOL with work order '{bol.work_order_no}' because it has {transaction_count} associated transaction(s). Please delete transactions first."
             )
     
+    record_bol(db, bol_facts(db, bol), sign=-1)
+    
     # Delete associated vehicles first
     db.query(BOLVehicle).filter(BOLVehicle.bill_of_lading_id == bol_id).delete()
     
-    # Delete the BOL
+    # Delete the BOL, then the signatures only it referenced
+    signatures = signature_refs(bol)
     db.delete(bol)
+    release_signatures(db, signatures)
     db.commit()
+    pdf_cache.invalidate(bol_id)
+    invalidation_bus.publish(BOLS, bol_id)
     
     return {"message": f"BOL {bol_id} deleted successfully"}
 
 @router.get("/work-order/{work_order_no}/payment-status")
+@async_db_endpoint
 def get_payment_status(work_order_no: str, db: Session = Depends(get_db)):
     """
     Get payment status for a specific work order
     """
-    # Get BOL details
-    bol = db.query(BillOfLading).filter(
-        BillOfLading.work_order_no == work_order_no
-    ).first()
+    bol, ledger = get_ledger_for_work_order(db, work_order_no)
     
     if not bol:
         raise HTTPException(
@@ -421,18 +781,4 @@ def get_payment_status(work_order_no: str, db: Session = Depends(get_db)):
             detail=f"Work order '{work_order_no}' not found"
         )
     
-    # Get total collected amount
-    total_collected = db.query(func.sum(Transaction.collected_amount)).filter(
-        Transaction.work_order_no == work_order_no
-    ).scalar() or 0.0
-    
-    due_amount = bol.total_amount - total_collected if bol.total_amount else 0.0
-    
-    return {
-        "work_order_no": work_order_no,
-        "total_amount": bol.total_amount,
-        "total_collected": float(total_collected),
-        "due_amount": float(due_amount),
-        "is_fully_paid": due_amount <= 0,
-        "payment_percentage": (total_collected / bol.total_amount * 100) if bol.total_amount else 0
-    } 
\ No newline at end of file
+    return work_order_payment_summary(bol, ledger) 
\ No newline at end of file
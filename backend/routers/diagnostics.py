@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from typing import List
+
+from schemas.diagnostics import SlowQuery
+from dependencies import get_current_admin_user
+from models.user import User
+from utils.slow_queries import slow_query_log
+
+router = APIRouter()
+
+@router.get("/slow-queries", response_model=List[SlowQuery])
+def get_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    """
+    The most recent statements over SLOW_QUERY_MS in this worker, newest
+    first, with their captured plans
+    """
+    return list(reversed(slow_query_log.entries()))
+
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    slow_query_log.clear()
@@ -1,24 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from datetime import datetime
+from sqlalchemy import func, select
+from typing import List, Optional
+from datetime import date
 
 from models.transaction import Transaction
 from models.daily_expense import DailyExpense
 from models.user import User
 from models.bill_of_lading import BillOfLading
 from schemas.transaction import TransactionCreate, Transaction as TransactionSchema
-from schemas.daily_expense import DailyExpenseCreate, DailyExpense as DailyExpenseSchema
-from database import get_db
+from schemas.daily_expense import DailyExpenseCreate, DailyExpense as DailyExpenseSchema, DailyExpenseSummary
+from database import get_db, async_db_endpoint
 from dependencies import get_current_user
 from utils.logger import setup_logger
+from utils.payment_ledger import (
+    apply_payment,
+    collected_for_work_order,
+    get_ledger_for_work_order,
+    work_order_payment_summary,
+    list_pending_payments,
+)
+from utils.export import EXPORT_FORMATS, stream_rows, export_response
+from utils.pagination import paginate
+from utils.serialization import json_response, row_dicts
+from utils.invalidation import PAYMENTS, invalidation_bus
+from utils.analytics import RollupChanges, record_payment
+from utils.expense_summary import SUMMARY_GROUPS, summarize_daily_expenses
 
 # Setup logger
 logger = setup_logger(__name__, "transaction.log")
 
 router = APIRouter()
 
+# Columns the list endpoints read for their response schemas
+DAILY_EXPENSE_COLUMNS = [
+    getattr(DailyExpense, name)
+    for name in DailyExpenseSchema.model_fields if name != "driver_name"
+]
+TRANSACTION_COLUMNS = [
+    getattr(Transaction, name)
+    for name in TransactionSchema.model_fields if not name.startswith("broker_")
+]
+
 # Daily Expense Endpoints
 @router.post("/daily-expenses", response_model=DailyExpenseSchema)
 def create_daily_expense(
@@ -57,63 +80,116 @@ def create_daily_expense(
         )
 
 @router.get("/daily-expenses", response_model=List[DailyExpenseSchema])
+@async_db_endpoint
 def get_daily_expenses(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    sort_order: str = Query("asc", enum=["asc", "desc"]),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    try:
-        logger.info(f"Fetching daily expenses for user: {current_user.email}")
-        logger.info(f"User ID: {current_user.id}")
-        
-        # Log the query before execution - join with User table to get driver_name
-        query = db.query(DailyExpense).join(User).filter(DailyExpense.user_id == current_user.id)
-        logger.info(f"SQL Query: {query}")
-        
-        expenses = query.all()
-        logger.info(f"Found {len(expenses)} daily expenses")
-        
-        # Convert each expense to a dictionary and validate
-        result = []
-        for expense in expenses:
-            try:
-                # Convert to dict first
-                expense_dict = {
-                    "id": expense.id,
-                    "date": expense.date,
-                    "diesel_amount": float(expense.diesel_amount),
-                    "diesel_location": expense.diesel_location,
-                    "def_amount": float(expense.def_amount),
-                    "def_location": expense.def_location,
-                    "other_expense_description": expense.other_expense_description,
-                    "other_expense_amount": float(expense.other_expense_amount) if expense.other_expense_amount is not None else None,
-                    "other_expense_location": expense.other_expense_location,
-                    "total": float(expense.total),
-                    "user_id": expense.user_id,
-                    "driver_name": expense.user.full_name if expense.user else "Unknown"
-                }
-                
-                # Validate using schema
-                validated_expense = DailyExpenseSchema(**expense_dict)
-                result.append(validated_expense)
-                logger.info(f"Validated expense data: {validated_expense.dict()}")
-            except Exception as e:
-                logger.error(f"Validation error for expense {expense.id}: {str(e)}")
-                if hasattr(e, 'errors'):
-                    logger.error(f"Validation error details: {e.errors()}")
-                raise HTTPException(
-                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    detail=f"Validation error for expense {expense.id}: {str(e)}"
-                )
-        
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error in get_daily_expenses: {str(e)}")
+    """
+    The current user's daily expenses ordered by (date, id). The total
+    number of matches is returned in X-Total-Count; passing `cursor` switches
+    from skip/limit to keyset pagination (see the BOL list).
+    """
+    logger.info(f"Fetching daily expenses for user: {current_user.email}")
+    
+    conditions = [DailyExpense.user_id == current_user.id]
+    if from_date:
+        conditions.append(DailyExpense.date >= from_date)
+    if to_date:
+        conditions.append(DailyExpense.date <= to_date)
+    response.headers["X-Total-Count"] = str(
+        db.query(func.count(DailyExpense.id)).filter(*conditions).scalar()
+    )
+    
+    # Read the response fields as plain columns and encode them directly
+    query = db.query(
+        *DAILY_EXPENSE_COLUMNS,
+        func.coalesce(User.full_name, "Unknown").label("driver_name"),
+    ).join(User, User.id == DailyExpense.user_id).filter(*conditions)
+    rows = paginate(
+        query, response, DailyExpense.date, DailyExpense.id,
+        sort_key=f"date:{sort_order}", descending=sort_order == "desc",
+        cursor=cursor, skip=skip, limit=limit,
+    )
+    return json_response(row_dicts(rows), response)
+
+@router.get("/daily-expenses/summary", response_model=List[DailyExpenseSummary])
+@async_db_endpoint
+def get_daily_expense_summary(
+    group_by: str = Query("day", pattern="^(" + "|".join(SUMMARY_GROUPS) + ")$"),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    all_drivers: bool = Query(False, description="Admins only: every driver's expenses"),
+    user_id: Optional[int] = Query(None, description="Admins only: another driver's expenses"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Diesel, DEF, other and total spend grouped by day, week, month, location
+    or driver, aggregated in the database
+    """
+    if (all_drivers or user_id is not None) and not current_user.is_superuser:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions. Admin access required."
         )
+    if not all_drivers and user_id is None:
+        user_id = current_user.id
+    elif all_drivers:
+        user_id = None
+    return summarize_daily_expenses(db, group_by, from_date, to_date, user_id)
+
+DAILY_EXPENSE_EXPORT_COLUMNS = [
+    "ID", "Date", "Driver", "Diesel Amount", "Diesel Location", "DEF Amount", "DEF Location",
+    "Other Expense Description", "Other Expense Amount", "Other Expense Location", "Total",
+]
+
+@router.get("/daily-expenses/export")
+def export_daily_expenses(
+    format: str = Query("csv", enum=EXPORT_FORMATS),
+    gzip: bool = Query(False),
+    from_date: Optional[str] = Query(None),
+    to_date: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the current user's daily expenses as CSV, NDJSON or XLSX"""
+    logger.info(f"Exporting daily expenses for user: {current_user.email}")
+    statement = select(
+        DailyExpense.id,
+        DailyExpense.date,
+        User.full_name,
+        DailyExpense.diesel_amount,
+        DailyExpense.diesel_location,
+        DailyExpense.def_amount,
+        DailyExpense.def_location,
+        DailyExpense.other_expense_description,
+        DailyExpense.other_expense_amount,
+        DailyExpense.other_expense_location,
+        DailyExpense.total,
+    ).join(
+        User, DailyExpense.user_id == User.id
+    ).where(DailyExpense.user_id == current_user.id)
+    if from_date:
+        statement = statement.where(DailyExpense.date >= from_date)
+    if to_date:
+        statement = statement.where(DailyExpense.date <= to_date)
+    statement = statement.order_by(DailyExpense.date, DailyExpense.id)
+    
+    return export_response(
+        stream_rows(statement),
+        DAILY_EXPENSE_EXPORT_COLUMNS,
+        filename="Daily_Expenses",
+        export_format=format,
+        gzip=gzip,
+        sheet_name="Daily Expenses",
+    )
 
 @router.get("/daily-expenses/{expense_id}", response_model=DailyExpenseSchema)
 def get_daily_expense(
@@ -142,9 +218,7 @@ def create_transaction(
         logger.debug(f"Transaction data: {transaction.dict()}")
         
         # Validate work order exists
-        bol = db.query(BillOfLading).filter(
-            BillOfLading.work_order_no == transaction.work_order_no
-        ).first()
+        bol, ledger = get_ledger_for_work_order(db, transaction.work_order_no)
         
         if not bol:
             raise HTTPException(
@@ -152,10 +226,11 @@ def create_transaction(
                 detail=f"Work order '{transaction.work_order_no}' not found"
             )
         
-        # Calculate total collected amount for this work order
-        total_collected = db.query(func.sum(Transaction.collected_amount)).filter(
-            Transaction.work_order_no == transaction.work_order_no
-        ).scalar() or 0.0
+        # Total collected so far comes from the payment ledger
+        if ledger:
+            total_collected = ledger.total_collected
+        else:
+            total_collected = collected_for_work_order(db, transaction.work_order_no)
         
         # Calculate due amount
         due_amount = bol.total_amount - total_collected - transaction.collected_amount
@@ -182,7 +257,10 @@ def create_transaction(
         
         logger.info("Adding transaction to database")
         db.add(db_transaction)
+        apply_payment(db, transaction.work_order_no, transaction.collected_amount)
+        record_payment(db, transaction.date, bol, transaction.collected_amount)
         db.commit()
+        invalidation_bus.publish(PAYMENTS, transaction.work_order_no)
         db.refresh(db_transaction)
         
         logger.info(f"Transaction created successfully with ID: {db_transaction.id}")
@@ -198,47 +276,106 @@ def create_transaction(
         )
 
 @router.get("/", response_model=List[TransactionSchema])
+@async_db_endpoint
 def get_transactions(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    payment_type: Optional[str] = Query(None),
+    work_order_no: Optional[str] = Query(None),
+    sort_order: str = Query("asc", enum=["asc", "desc"]),
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value for the first page"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    The current user's transactions ordered by (date, id), with the broker
+    of their BOL. The total number of matches is returned in X-Total-Count;
+    passing `cursor` switches from skip/limit to keyset pagination.
+    """
     logger.info(f"Fetching transactions for user: {current_user.email}")
     
-    # Join with BOL to get broker information
-    transactions_with_broker = db.query(
-        Transaction,
+    conditions = [Transaction.user_id == current_user.id]
+    if from_date:
+        conditions.append(Transaction.date >= from_date)
+    if to_date:
+        conditions.append(Transaction.date <= to_date)
+    if payment_type:
+        conditions.append(Transaction.payment_type == payment_type)
+    if work_order_no:
+        conditions.append(Transaction.work_order_no == work_order_no)
+    response.headers["X-Total-Count"] = str(
+        db.query(func.count(Transaction.id)).filter(*conditions).scalar()
+    )
+    
+    # Join with BOL to get broker information, as plain columns encoded directly
+    query = db.query(
+        *TRANSACTION_COLUMNS,
         BillOfLading.broker_name,
         BillOfLading.broker_address,
-        BillOfLading.broker_phone
+        BillOfLading.broker_phone,
+    ).outerjoin(BillOfLading, Transaction.bol_id == BillOfLading.id).filter(*conditions)
+    rows = paginate(
+        query, response, Transaction.date, Transaction.id,
+        sort_key=f"date:{sort_order}", descending=sort_order == "desc",
+        cursor=cursor, skip=skip, limit=limit,
+    )
+    
+    logger.info(f"Found {len(rows)} transactions with broker information")
+    return json_response(row_dicts(rows), response)
+
+TRANSACTION_EXPORT_COLUMNS = [
+    "ID", "Date", "Work Order No", "Collected Amount", "Due Amount", "BOL ID",
+    "Pickup Location", "Dropoff Location", "Payment Type", "Comments",
+    "Broker Name", "Broker Address", "Broker Phone",
+]
+
+@router.get("/export")
+def export_transactions(
+    format: str = Query("csv", enum=EXPORT_FORMATS),
+    gzip: bool = Query(False),
+    from_date: Optional[str] = Query(None),
+    to_date: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the current user's transactions, with broker details, as CSV, NDJSON or XLSX"""
+    logger.info(f"Exporting transactions for user: {current_user.email}")
+    statement = select(
+        Transaction.id,
+        Transaction.date,
+        Transaction.work_order_no,
+        Transaction.collected_amount,
+        Transaction.due_amount,
+        Transaction.bol_id,
+        Transaction.pickup_location,
+        Transaction.dropoff_location,
+        Transaction.payment_type,
+        Transaction.comments,
+        BillOfLading.broker_name,
+        BillOfLading.broker_address,
+        BillOfLading.broker_phone,
     ).outerjoin(
         BillOfLading, Transaction.bol_id == BillOfLading.id
-    ).filter(Transaction.user_id == current_user.id).all()
+    ).where(Transaction.user_id == current_user.id)
+    if from_date:
+        statement = statement.where(Transaction.date >= from_date)
+    if to_date:
+        statement = statement.where(Transaction.date <= to_date)
+    statement = statement.order_by(Transaction.date, Transaction.id)
     
-    # Convert to response format
-    result = []
-    for transaction, broker_name, broker_address, broker_phone in transactions_with_broker:
-        transaction_dict = {
-            "id": transaction.id,
-            "date": transaction.date,
-            "work_order_no": transaction.work_order_no,
-            "collected_amount": transaction.collected_amount,
-            "due_amount": transaction.due_amount,
-            "bol_id": transaction.bol_id,
-            "pickup_location": transaction.pickup_location,
-            "dropoff_location": transaction.dropoff_location,
-            "payment_type": transaction.payment_type,
-            "comments": transaction.comments,
-            "user_id": transaction.user_id,
-            "broker_name": broker_name,
-            "broker_address": broker_address,
-            "broker_phone": broker_phone
-        }
-        result.append(transaction_dict)
-    
-    logger.info(f"Found {len(result)} transactions with broker information")
-    return result
+    return export_response(
+        stream_rows(statement),
+        TRANSACTION_EXPORT_COLUMNS,
+        filename="Transactions",
+        export_format=format,
+        gzip=gzip,
+        sheet_name="Transactions",
+    )
 
 @router.get("/{transaction_id}", response_model=TransactionSchema)
+@async_db_endpoint
 def get_transaction(
     transaction_id: int,
     db: Session = Depends(get_db),
@@ -266,10 +403,24 @@ def update_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    old_work_order_no = db_transaction.work_order_no
+    old_amount = db_transaction.collected_amount
+    rollups = RollupChanges()
+    rollups.add_payment(db_transaction.date, db.get(BillOfLading, db_transaction.bol_id), -old_amount)
+    
     for key, value in transaction.dict().items():
         setattr(db_transaction, key, value)
     
+    # Move the old amount off the ledger and apply the new one
+    apply_payment(db, old_work_order_no, -old_amount)
+    apply_payment(db, db_transaction.work_order_no, db_transaction.collected_amount)
+    bol = db.get(BillOfLading, db_transaction.bol_id)
+    if bol is None:
+        raise HTTPException(status_code=404, detail=f"BOL {db_transaction.bol_id} not found")
+    rollups.add_payment(db_transaction.date, bol, db_transaction.collected_amount)
+    rollups.apply(db)
     db.commit()
+    invalidation_bus.publish(PAYMENTS, old_work_order_no, db_transaction.work_order_no)
     db.refresh(db_transaction)
     return db_transaction
 
@@ -286,60 +437,30 @@ def delete_transaction(
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    work_order_no = transaction.work_order_no
+    record_payment(db, transaction.date, db.get(BillOfLading, transaction.bol_id), -transaction.collected_amount)
     db.delete(transaction)
+    apply_payment(db, work_order_no, -transaction.collected_amount)
     db.commit()
+    invalidation_bus.publish(PAYMENTS, work_order_no)
     return {"message": "Transaction deleted successfully"}
 
 # New Work Order Endpoints
 @router.get("/work-orders/pending")
+@async_db_endpoint
 def get_pending_work_orders(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """
     Get BOLs with pending payments for dropdown selection
     """
-    # Subquery to get total collected amount for each work order
-    collected_amounts = db.query(
-        Transaction.work_order_no,
-        func.sum(Transaction.collected_amount).label('total_collected')
-    ).group_by(Transaction.work_order_no).subquery()
-    
-    # Query BOLs with pending payments
-    pending_bols = db.query(
-        BillOfLading.id,
-        BillOfLading.work_order_no,
-        BillOfLading.driver_name,
-        BillOfLading.date,
-        BillOfLading.total_amount,
-        func.coalesce(collected_amounts.c.total_collected, 0).label('total_collected'),
-        (BillOfLading.total_amount - func.coalesce(collected_amounts.c.total_collected, 0)).label('due_amount')
-    ).outerjoin(
-        collected_amounts, 
-        BillOfLading.work_order_no == collected_amounts.c.work_order_no
-    ).filter(
-        BillOfLading.total_amount > func.coalesce(collected_amounts.c.total_collected, 0)
-    ).all()
-    
-    return [
-        {
-            "id": bol.id,
-            "work_order_no": bol.work_order_no,
-            "driver_name": bol.driver_name,
-            "date": bol.date,
-            "total_amount": bol.total_amount,
-            "total_collected": float(bol.total_collected),
-            "due_amount": float(bol.due_amount)
-        }
-        for bol in pending_bols
-    ]
+    return list_pending_payments(db)
 
 @router.get("/work-order/{work_order_no}/status")
+@async_db_endpoint
 def get_work_order_payment_status(work_order_no: str, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """
     Get payment status for a specific work order
     """
-    # Get BOL details
-    bol = db.query(BillOfLading).filter(
-        BillOfLading.work_order_no == work_order_no
-    ).first()
+    bol, ledger = get_ledger_for_work_order(db, work_order_no)
     
     if not bol:
         raise HTTPException(
@@ -347,23 +468,10 @@ def get_work_order_payment_status(work_order_no: str, db: Session = Depends(get_
             detail=f"Work order '{work_order_no}' not found"
         )
     
-    # Get total collected amount
-    total_collected = db.query(func.sum(Transaction.collected_amount)).filter(
-        Transaction.work_order_no == work_order_no
-    ).scalar() or 0.0
-    
-    due_amount = bol.total_amount - total_collected if bol.total_amount else 0.0
-    
-    return {
-        "work_order_no": work_order_no,
-        "total_amount": bol.total_amount,
-        "total_collected": float(total_collected),
-        "due_amount": float(due_amount),
-        "is_fully_paid": due_amount <= 0,
-        "payment_percentage": (total_collected / bol.total_amount * 100) if bol.total_amount else 0
-    }
+    return work_order_payment_summary(bol, ledger)
 
 @router.get("/work-order/{work_order_no}/transactions")
+@async_db_endpoint
 def get_transactions_by_work_order(work_order_no: str, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """
     Get all transactions for a specific work order
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from models.bill_of_lading import BillOfLading, BOLVehicle
+from models.work_order_payment import WorkOrderPayment
+from schemas.vehicle import VehicleHistory
+from database import get_db, async_db_endpoint
+from utils.vin import validate_vin, vin_prefix_filter
+
+router = APIRouter()
+
+# Shortest VIN fragment accepted for a prefix lookup
+MIN_VIN_PREFIX = 3
+
+@router.get("/{vin}/history", response_model=VehicleHistory)
+@async_db_endpoint
+def get_vehicle_history(
+    vin: str,
+    prefix: bool = Query(False, description="Match every VIN starting with the given value"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Every BOL a vehicle appeared on, newest first, with its price on that BOL
+    and the BOL's payment status
+    """
+    try:
+        vin = validate_vin(vin)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if prefix and len(vin) < MIN_VIN_PREFIX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A VIN prefix needs at least {MIN_VIN_PREFIX} characters"
+        )
+
+    if prefix:
+        condition = vin_prefix_filter(BOLVehicle.vin, vin, db.get_bind().dialect.name)
+    else:
+        condition = BOLVehicle.vin == vin
+
+    # One round trip: the vehicle rows, their BOLs and the ledger rows together
+    rows = db.execute(
+        select(
+            BillOfLading.id.label("bol_id"),
+            BillOfLading.work_order_no,
+            BillOfLading.date,
+            BillOfLading.driver_name,
+            BillOfLading.pickup_city,
+            BillOfLading.delivery_city,
+            BOLVehicle.vin,
+            BOLVehicle.year,
+            BOLVehicle.make,
+            BOLVehicle.model,
+            BOLVehicle.price,
+            BillOfLading.total_amount,
+            WorkOrderPayment.total_collected,
+            WorkOrderPayment.due_amount,
+            WorkOrderPayment.status.label("payment_status"),
+        )
+        .join(BillOfLading, BillOfLading.id == BOLVehicle.bill_of_lading_id)
+        .outerjoin(WorkOrderPayment, WorkOrderPayment.bol_id == BillOfLading.id)
+        .where(condition)
+        .order_by(BillOfLading.date.desc(), BillOfLading.id.desc())
+        .limit(limit)
+    ).mappings().all()
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No BOLs found for VIN '{vin}'"
+        )
+
+    return {"vin": vin, "count": len(rows), "history": rows}
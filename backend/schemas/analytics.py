@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from datetime import date
+
+class RevenuePoint(BaseModel):
+    period: date  # First day of the day, week (Monday) or month
+    billed_amount: float
+    collected_amount: float
+
+class DeliveryPoint(BaseModel):
+    period: date  # First day of the day, week (Monday) or month
+    bol_count: int
+    vehicle_count: int
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, validator
 from typing import List, Optional
 from datetime import date
+from utils.vin import validate_vin
 
 class BOLVehicleBase(BaseModel):
     year: str
@@ -10,6 +11,11 @@ class BOLVehicleBase(BaseModel):
     mileage: str
     price: str
 
+class BOLVehicleCreate(BOLVehicleBase):
+    @validator('vin', pre=True)
+    def normalize_vin(cls, v):
+        return validate_vin(v)  # Stored upper-cased without spaces or dashes
+
 class BOLVehicle(BOLVehicleBase):
     id: int
     class Config:
@@ -67,11 +73,15 @@ class BillOfLadingBase(BaseModel):
         return v
 
 class BillOfLadingCreate(BillOfLadingBase):
-    vehicles: List[BOLVehicleBase]
+    vehicles: List[BOLVehicleCreate]
 
 class BillOfLading(BillOfLadingBase):
     id: int
     vehicles: List[BOLVehicle]
+    # Content-addressed signature references (see /api/bol/signatures/{sha256})
+    pickup_signature_sha256: Optional[str] = None
+    delivery_signature_sha256: Optional[str] = None
+    receiver_signature_sha256: Optional[str] = None
     # Payment tracking fields (calculated from transactions)
     total_collected: Optional[float] = None
     due_amount: Optional[float] = None
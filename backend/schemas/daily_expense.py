@@ -32,4 +32,14 @@ class DailyExpense(DailyExpenseBase):
         json_encoders = {
             float: lambda v: float(v) if v is not None else None,
             int: lambda v: int(v) if v is not None else None
-        } 
\ No newline at end of file
+        }
+
+class DailyExpenseSummary(BaseModel):
+    # ISO date of the day, week (Monday) or month, a location or a driver name
+    group: str
+    user_id: Optional[int] = Field(None, description="Driver user ID when grouped by driver")
+    expense_count: int
+    diesel_amount: float
+    def_amount: float
+    other_amount: float
+    total_amount: float
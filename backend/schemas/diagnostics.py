@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Any, List, Optional
+
+class SlowQuery(BaseModel):
+    at: str
+    duration_ms: float
+    # "METHOD /route/template" of the request that ran it, if any
+    route: Optional[str] = None
+    statement: str
+    # Parameter names and types, never their values
+    parameters: Any = None
+    plan: Optional[List[str]] = None
+    plan_error: Optional[str] = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+
+class VehicleHistoryEntry(BaseModel):
+    bol_id: int
+    work_order_no: Optional[str]
+    date: date
+    driver_name: str
+    pickup_city: Optional[str]
+    delivery_city: Optional[str]
+    vin: Optional[str]
+    year: Optional[str]
+    make: Optional[str]
+    model: Optional[str]
+    price: Optional[str]
+    # Payment tracking for the whole BOL (from the work order ledger)
+    total_amount: Optional[float]
+    total_collected: Optional[float]
+    due_amount: Optional[float]
+    payment_status: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class VehicleHistory(BaseModel):
+    vin: str
+    count: int
+    history: List[VehicleHistoryEntry]
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+
+from sqlalchemy.orm import Session
+from database import engine
+from utils.analytics import rebuild_rollups
+
+def main():
+    # Recompute the analytics rollups from the BOL and transaction tables
+    db = Session(engine)
+    try:
+        count = rebuild_rollups(db)
+        print(f"Analytics rollups rebuilt: {count} rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_path = str(Path(__file__).parent.parent)
+sys.path.append(backend_path)
+
+from sqlalchemy.orm import Session
+from database import engine
+from utils.payment_ledger import rebuild_payment_ledger
+
+def main():
+    # Recompute the work order payment ledger from the transactions table
+    db = Session(engine)
+    try:
+        count = rebuild_payment_ledger(db)
+        print(f"Payment ledger rebuilt: {count} work order rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,95 @@ import os
 import sys
 
 # Add the parent directory to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))) 
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Publish cache invalidations in-process rather than through Postgres
+os.environ.setdefault("CACHE_INVALIDATION", "loopback")
+# Signs the bearer tokens that tests create
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..main import app
+from database import get_db
+from dependencies import get_current_user
+from models.base import Base
+from models.user import User
+from utils.bol_search import search_index
+from utils.payment_cache import payment_cache
+from utils.principal_cache import principal_cache
+
+# One in-memory database shared by every session of a test
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db():
+    """Fresh tables for the test and a session to seed and check them with"""
+    # The in-process caches would otherwise hold rows of an earlier test's tables
+    for cache in (search_index, payment_cache, principal_cache):
+        cache.clear()
+    Base.metadata.create_all(engine)
+    session = TestingSession()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def statements():
+    """The SQL statements executed on the test database, in order"""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield recorded
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def client(db):
+    """A TestClient whose requests use the test database"""
+    def override_get_db():
+        session = TestingSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.fixture
+def sign_in(client):
+    """Authenticate the client's requests as the user with the given id"""
+    def sign_in(user_id):
+        # Loaded once, so requests run no extra statements; closing the
+        # session detaches the user with its attributes loaded
+        with TestingSession() as session:
+            user = session.get(User, user_id)
+        app.dependency_overrides[get_current_user] = lambda: user
+        return user
+    return sign_in
+
+@pytest.fixture
+def admin(db, sign_in):
+    """A superuser that the client's requests are authenticated as"""
+    user = User(id=1, email="driver1@example.com", hashed_password="x", full_name="Driver One", is_superuser=True)
+    db.add(user)
+    db.commit()
+    return sign_in(user.id)
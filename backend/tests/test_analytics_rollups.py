@@ -0,0 +1,89 @@
+import json
+from datetime import date
+
+import pytest
+
+from models.analytics_rollup import AnalyticsRollup
+from schemas.bill_of_lading import BillOfLadingCreate
+from utils.analytics import METRICS, rebuild_rollups
+
+def bol_payload(work_order_no, day, driver, broker, prices):
+    return {
+        **dict.fromkeys(BillOfLadingCreate.model_fields),
+        "driver_name": driver, "date": day, "work_order_no": work_order_no, "broker_name": broker,
+        "vehicles": [
+            {"year": "2020", "make": "Ford", "model": "F150", "vin": f"{work_order_no}V{n}", "mileage": "1", "price": price}
+            for n, price in enumerate(prices)
+        ],
+    }
+
+def payment(work_order_no, bol_id, day, amount):
+    return {
+        "date": day, "work_order_no": work_order_no, "collected_amount": amount, "due_amount": 0, "bol_id": bol_id,
+        "pickup_location": "A", "dropoff_location": "B", "payment_type": "Cash",
+    }
+
+def rollup_table(db):
+    """Non-zero rollup rows, keyed by (granularity, period, driver, broker)"""
+    table = {}
+    for row in db.query(AnalyticsRollup):
+        metrics = tuple(round(getattr(row, name) or 0, 2) for name in METRICS)
+        if any(metrics):
+            table[(row.granularity, row.period_start, row.driver_name, row.broker_name)] = metrics
+    return table
+
+def test_write_paths_keep_rollups_equal_to_a_rebuild(db, client, admin):
+    first = client.post("/api/bol/", json=bol_payload("WO-1", "2025-01-30", "Ann", "Acme", ["100", "150"])).json()["id"]
+    second = client.post("/api/bol/", json=bol_payload("WO-2", "2025-02-03", "Bob", None, ["300"])).json()["id"]
+    doomed = client.post("/api/bol/", json=bol_payload("WO-3", "2025-02-04", "Bob", "Acme", ["80"])).json()["id"]
+    rows = "\n".join(json.dumps(bol_payload(f"WO-I{n}", "2025-02-10", "Cy", "Zeta", ["90"])) for n in range(3))
+    response = client.post("/api/bol/import", files={"file": ("bols.ndjson", rows.encode())})
+    assert response.status_code == 200, response.text
+
+    paid = client.post("/api/transactions/", json=payment("WO-1", first, "2025-02-01", 120)).json()["id"]
+    client.post("/api/transactions/", json=payment("WO-1", first, "2025-02-05", 30))
+    moved = client.post("/api/transactions/", json=payment("WO-2", second, "2025-02-06", 50)).json()["id"]
+    gone = client.post("/api/transactions/", json=payment("WO-2", second, "2025-02-07", 25)).json()["id"]
+
+    # Backdate and change a payment, then move another onto a different work order
+    assert client.put(f"/api/transactions/{paid}", json=payment("WO-1", first, "2025-01-31", 100)).status_code == 200
+    assert client.put(f"/api/transactions/{moved}", json=payment("WO-1", first, "2025-02-06", 20)).status_code == 200
+    assert client.delete(f"/api/transactions/{gone}").status_code == 200
+    # New date, driver, broker and vehicles on a BOL with payments
+    update = bol_payload("WO-1", "2025-03-02", "Bob", "Zeta", ["90", "90", "90"])
+    assert client.put(f"/api/bol/{first}", json=update).status_code == 200
+    assert client.delete(f"/api/bol/{doomed}").status_code == 200
+
+    maintained = rollup_table(db)
+    rebuild_rollups(db)
+
+    assert maintained == rollup_table(db)
+    assert maintained[("month", date(2025, 2, 1), "Bob", "Zeta")] == (0, 0, 0, 50.0)
+    assert maintained[("day", date(2025, 1, 31), "Bob", "Zeta")] == (0, 0, 0, 100.0)
+
+@pytest.mark.parametrize("granularity, start, ok", [
+    ("month", "2025-01-01", True), ("month", "2025-01-16", False),
+    ("week", "2025-01-06", True), ("week", "2025-01-08", False),
+    ("day", "2025-01-16", True),
+])
+def test_start_must_begin_a_period(client, admin, granularity, start, ok):
+    response = client.get("/api/analytics/revenue", params={"granularity": granularity, "start": start})
+
+    assert response.status_code == (200 if ok else 400)
+
+@pytest.mark.parametrize("granularity, end, periods", [
+    # 2025-01-08 is a Wednesday: its whole week counts, through Sunday the 12th
+    ("week", "2025-01-08", [("2025-01-06", 2, 300.0)]),
+    ("month", "2025-01-08", [("2025-01-01", 2, 300.0)]),
+    ("day", "2025-01-08", [("2025-01-06", 1, 100.0)]),
+])
+def test_the_period_containing_end_counts_in_full(client, admin, granularity, end, periods):
+    for n, (day, price) in enumerate([("2025-01-06", "100"), ("2025-01-10", "200"), ("2025-02-03", "50")]):
+        client.post("/api/bol/", json=bol_payload(f"WO-{n}", day, "Ann", "Acme", [price]))
+
+    params = {"granularity": granularity, "start": "2025-01-06" if granularity != "month" else "2025-01-01", "end": end}
+    deliveries = client.get("/api/analytics/deliveries", params=params).json()
+    revenue = client.get("/api/analytics/revenue", params=params).json()
+
+    assert [(point["period"], point["bol_count"]) for point in deliveries] == [period[:2] for period in periods]
+    assert [point["billed_amount"] for point in revenue] == [period[2] for period in periods]
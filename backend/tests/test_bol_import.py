@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+
+from models.analytics_rollup import AnalyticsRollup
+from models.bill_of_lading import BillOfLading
+from models.work_order_payment import WorkOrderPayment
+from utils.analytics import METRICS, rebuild_rollups
+from utils.bol_import import BOL_FIELDS, IMPORT_CHUNK_SIZE, VEHICLE_COLUMNS
+
+HEADER = BOL_FIELDS + list(VEHICLE_COLUMNS)
+
+def flat_row(work_order_no, vin, price, driver="Ann", day="2025-03-04", **fields):
+    """One CSV/XLSX row: a BOL's columns plus one vehicle"""
+    return {
+        "driver_name": driver, "date": day, "work_order_no": work_order_no, "broker_name": "Acme",
+        "pickup_city": "Houston", "vehicle_year": "2020", "vehicle_make": "Ford", "vehicle_model": "F150",
+        "vehicle_vin": vin, "vehicle_mileage": "10", "vehicle_price": price, **fields,
+    }
+
+def to_csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=HEADER)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+def to_xlsx(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append([row.get(column) for column in HEADER])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+def to_ndjson(rows):
+    """Fold flat rows into one create payload per work order, as the flat formats do"""
+    bols = {}
+    for row in rows:
+        bol = bols.setdefault(row["work_order_no"], {**{field: row.get(field) for field in BOL_FIELDS}, "vehicles": []})
+        bol["vehicles"].append({field: row[column] for column, field in VEHICLE_COLUMNS.items()})
+    return "\n".join(json.dumps(bol) for bol in bols.values()).encode()
+
+ENCODERS = {"csv": to_csv, "xlsx": to_xlsx, "ndjson": to_ndjson}
+
+def upload(client, import_format, rows, **params):
+    files = {"file": (f"bols.{import_format}", ENCODERS[import_format](rows))}
+    response = client.post("/api/bol/import", files=files, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("import_format", ["csv", "xlsx", "ndjson"])
+def test_every_format_imports_bols_with_their_vehicles(db, client, admin, import_format):
+    rows = [
+        flat_row("WO-1", "1HGCM82633A004352", "100"),
+        flat_row("WO-1", "2HGCM82633A004352", "150"),
+        flat_row("WO-2", "ABC12", "300", driver="Bob"),
+    ]
+
+    result = upload(client, import_format, rows)
+
+    assert (result["imported"], result["failed"]) == (2, 0)
+    bols = {bol["work_order_no"]: bol for bol in client.get("/api/bol/").json()}
+    assert [vehicle["vin"] for vehicle in bols["WO-1"]["vehicles"]] == ["1HGCM82633A004352", "2HGCM82633A004352"]
+    assert (bols["WO-1"]["total_amount"], bols["WO-2"]["total_amount"]) == (250.0, 300.0)
+    assert bols["WO-2"]["driver_name"] == "Bob"
+
+def test_invalid_rows_are_reported_by_row_number(db, client, admin):
+    db.add(BillOfLading(driver_name="Old", date=date(2025, 1, 1), work_order_no="WO-OLD"))
+    db.commit()
+    rows = [
+        flat_row("WO-1", "VIN1", "100"),                        # row 2
+        flat_row("WO-2", "VIN2", "100", day="03/04/2025"),      # row 3: date format
+        flat_row("WO-3", "1HGCM82633A0O4352", "100"),           # row 4: O in a 17-character VIN
+        flat_row("WO-1", "VIN4", "100", driver="Cy", day="2025-03-05"),
+        flat_row("WO-OLD", "VIN5", "100"),                      # row 6: already exists
+        flat_row("WO-6", "VIN6", "100"),                        # row 7
+    ]
+    # Row 5 repeats WO-1 after another work order, so it is a second BOL
+    result = upload(client, "csv", rows)
+
+    assert (result["imported"], result["failed"]) == (2, 4)
+    assert [(error["row"], error["work_order_no"]) for error in result["errors"]] == [
+        (3, "WO-2"), (4, "WO-3"), (5, "WO-1"), (6, "WO-OLD"),
+    ]
+    assert result["errors"][0]["errors"] == ["date: expected YYYY-MM-DD"]
+    assert result["errors"][1]["errors"][0].startswith("vehicles.0.vin:")
+    assert "more than once" in result["errors"][2]["errors"][0]
+    assert "already exists" in result["errors"][3]["errors"][0]
+
+def chunks(statements):
+    """Chunks inserted: each one writes its ledger rows with a single multi-row INSERT"""
+    return sum(sql.startswith("INSERT INTO work_order_payments ") for sql in statements)
+
+def test_import_inserts_one_chunk_at_a_time(db, client, admin, statements):
+    rows = [flat_row(f"WO-{n}", f"VIN{n}", "10") for n in range(IMPORT_CHUNK_SIZE + 1)]
+
+    assert upload(client, "ndjson", rows)["imported"] == IMPORT_CHUNK_SIZE + 1
+    assert chunks(statements) == 2
+
+    statements.clear()
+    assert upload(client, "csv", [flat_row(f"WO-C{n}", f"VINC{n}", "10") for n in range(5)], chunk_size=2)["imported"] == 5
+    assert chunks(statements) == 3
+    assert db.query(BillOfLading).count() == IMPORT_CHUNK_SIZE + 6
+
+def test_imported_bols_get_ledger_rollup_and_search_rows(db, client, admin):
+    rows = [
+        flat_row("WO-1", "1HGCM82633A004352", "100"),
+        flat_row("WO-2", "ABC12", "300", driver="Bob", day="2025-04-01", remarks="Fragile mirror"),
+    ]
+    upload(client, "xlsx", rows)
+
+    ledger = {row.work_order_no: (row.total_amount, row.total_collected, row.status) for row in db.query(WorkOrderPayment)}
+    assert ledger == {"WO-1": (100.0, 0.0, "pending"), "WO-2": (300.0, 0.0, "pending")}
+
+    def rollups():
+        return {
+            (row.granularity, row.period_start, row.driver_name): tuple(getattr(row, name) for name in METRICS)
+            for row in db.query(AnalyticsRollup)
+        }
+    imported = rollups()
+    rebuild_rollups(db)
+    assert imported and imported == rollups()
+
+    assert "fragile mirror" in db.query(BillOfLading.search_text).filter_by(work_order_no="WO-2").scalar()
+    assert [bol["work_order_no"] for bol in client.get("/api/bol/search", params={"q": "fragile 1hgcm"}).json()] == []
+    assert [bol["work_order_no"] for bol in client.get("/api/bol/search", params={"q": "fragile"}).json()] == ["WO-2"]
+    assert [bol["work_order_no"] for bol in client.get("/api/bol/search", params={"q": "1hgcm"}).json()] == ["WO-1"]
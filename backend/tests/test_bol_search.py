@@ -0,0 +1,61 @@
+import pytest
+
+from schemas.bill_of_lading import BillOfLadingCreate
+from utils.bol_search import build_search_text
+
+def bol_payload(work_order_no, vin, **fields):
+    return {
+        **dict.fromkeys(BillOfLadingCreate.model_fields),
+        "driver_name": "Ann", "date": "2025-03-04", "work_order_no": work_order_no, **fields,
+        "vehicles": [{"year": "2020", "make": "Ford", "model": "F150", "vin": vin, "mileage": "1", "price": "100"}],
+    }
+
+@pytest.fixture
+def bols(client, admin):
+    """Work order number -> id of three BOLs, created oldest first"""
+    payloads = [
+        bol_payload("WO-1", "1HGCM82633A004352", pickup_city="Houston", remarks="Call before delivery"),
+        bol_payload("WO-2", "2T1BURHE0JC034461", pickup_city="Houstonia", broker_name="Montway"),
+        bol_payload("WO-3", "5YJ3E1EA7KF317000", pickup_city="Dallas", remarks="Houston office pays"),
+    ]
+    return {payload["work_order_no"]: client.post("/api/bol/", json=payload).json()["id"] for payload in payloads}
+
+def search(client, q, **params):
+    response = client.get("/api/bol/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return [bol["work_order_no"] for bol in response.json()]
+
+def test_search_text_covers_the_bol_and_its_vehicles():
+    text = build_search_text(bol_payload("WO-9", "1HGCM82633A004352", broker_name="Montway  Auto"), [
+        {"vin": "1HGCM82633A004352", "make": "Honda", "model": "Accord"},
+    ])
+    assert text == "wo-9 ann montway  auto 1hgcm82633a004352 honda accord"
+
+def test_exact_words_rank_above_prefixes_then_newest_first(client, bols):
+    # "houston" is a whole word of WO-1 and WO-3 and only a prefix of "houstonia"
+    assert search(client, "houston") == ["WO-3", "WO-1", "WO-2"]
+    assert search(client, "hous") == ["WO-3", "WO-2", "WO-1"]
+    assert search(client, "houston", skip=1, limit=1) == ["WO-1"]
+
+def test_every_word_must_match(client, bols):
+    assert search(client, "houston delivery") == ["WO-1"]
+    assert search(client, "MONTWAY hou") == ["WO-2"]
+    assert search(client, "montway dallas") == []
+
+def test_vin_and_prefix_matches(client, bols):
+    assert search(client, "2t1burhe0jc034461") == ["WO-2"]
+    assert search(client, "5yj3") == ["WO-3"]
+    assert search(client, "wo-1") == ["WO-1"]
+
+def test_search_document_follows_update_and_delete(client, bols):
+    assert search(client, "dallas") == ["WO-3"]
+
+    update = bol_payload("WO-3", "5YJ3E1EA7KF317000", pickup_city="Austin", remarks=None)
+    assert client.put(f"/api/bol/{bols['WO-3']}", json=update).status_code == 200
+    assert search(client, "dallas") == []
+    assert search(client, "austin") == ["WO-3"]
+    assert search(client, "houston") == ["WO-1", "WO-2"]
+
+    assert client.delete(f"/api/bol/{bols['WO-1']}").status_code == 200
+    assert search(client, "houston") == ["WO-2"]
+    assert search(client, "1hgcm") == []
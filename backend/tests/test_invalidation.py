@@ -0,0 +1,76 @@
+import json
+import logging
+
+from schemas.bill_of_lading import BillOfLadingCreate
+from utils.invalidation import (
+    InvalidationBus, LoopbackTransport, PostgresTransport, Transport, MAX_PAYLOAD, PAYMENTS, invalidation_bus,
+)
+from utils.payment_cache import PaymentCache
+
+class BrokenTransport(Transport):
+    def send(self, origin, entity, keys):
+        raise ConnectionError("database is down")
+
+def worker(transport):
+    """A bus and payment cache standing in for one uvicorn worker"""
+    bus = InvalidationBus(transport)
+    cache = PaymentCache()
+    bus.subscribe(PAYMENTS, cache.invalidate, cache.clear)
+    bus.start()
+    cache.get_many(["WO-1", "WO-2"], lambda missing: {wo: 10.0 for wo in missing})
+    return bus, cache
+
+def test_publish_evicts_on_every_worker():
+    transport = LoopbackTransport()
+    (bus_a, cache_a), (bus_b, cache_b) = worker(transport), worker(transport)
+
+    bus_a.publish(PAYMENTS, "WO-1")
+
+    for cache in (cache_a, cache_b):
+        assert cache.get_many(["WO-1", "WO-2"], lambda missing: {wo: 25.0 for wo in missing}) == {
+            "WO-1": 25.0, "WO-2": 10.0,
+        }
+    # The publisher evicts directly and ignores its own message
+    assert (bus_a.received, bus_b.received) == (0, 1)
+
+def test_clear_all_empties_subscribed_caches():
+    bus, cache = worker(LoopbackTransport())
+    bus.clear_all()
+    assert cache.stats()["size"] == 0
+
+def test_notify_payloads_stay_under_the_postgres_limit():
+    keys = [f"WO-{i:07d}" for i in range(2000)]
+    payloads = list(PostgresTransport._payloads("origin", PAYMENTS, keys))
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= MAX_PAYLOAD for payload in payloads)
+    assert [key for payload in payloads for key in json.loads(payload)["k"]] == keys
+
+def test_failed_publish_does_not_fail_the_write(client, admin, monkeypatch):
+    monkeypatch.setattr(invalidation_bus, "transport", BrokenTransport())
+    bol = {
+        **dict.fromkeys(BillOfLadingCreate.model_fields), "driver_name": "Ann", "date": "2025-01-30", "work_order_no": "WO-1",
+        "vehicles": [{"year": "2020", "make": "Ford", "model": "F150", "vin": "", "mileage": "1", "price": "100"}],
+    }
+    bol_id = client.post("/api/bol/", json=bol).json()["id"]
+
+    response = client.post("/api/transactions/", json={
+        "date": "2025-02-01", "work_order_no": "WO-1", "collected_amount": 50, "due_amount": 0, "bol_id": bol_id,
+        "pickup_location": "A", "dropoff_location": "B", "payment_type": "Cash",
+    })
+
+    assert response.status_code == 200
+    assert client.get("/api/transactions/work-order/WO-1/status").json()["total_collected"] == 50
+
+def test_postgres_publish_queues_instead_of_connecting(caplog):
+    # Nothing listens on port 1, so every connection attempt fails
+    transport = PostgresTransport("postgresql://postgres@127.0.0.1:1/none")
+    bus = InvalidationBus(transport)
+
+    with caplog.at_level(logging.ERROR, logger="utils.invalidation"):
+        bus.publish(PAYMENTS, "WO-1")
+        bus.publish(PAYMENTS, "WO-2")
+        transport.stop()
+
+    assert bus.published == 2
+    assert [record.getMessage() for record in caplog.records] == ["Could not publish payments invalidation"] * 2
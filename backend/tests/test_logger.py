@@ -0,0 +1,30 @@
+import json
+import logging
+
+from utils.logger import JsonFormatter, RateLimitFilter
+
+def make_record(lineno=10, level=logging.INFO, created=1000.0, **extra):
+    record = logging.LogRecord("routers.test", level, __file__, lineno, "hello %s", ("world",), None)
+    record.created = created
+    record.__dict__.update(extra)
+    return record
+
+def test_rate_limit_per_call_site_reports_suppressed_records():
+    limit = RateLimitFilter(per_second=2)
+
+    assert [limit.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    # Other call sites and warnings are not affected
+    assert limit.filter(make_record(lineno=11))
+    assert limit.filter(make_record(level=logging.WARNING))
+
+    record = make_record(created=1001.0)
+    assert limit.filter(record)
+    assert record.suppressed == 2
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(make_record(work_order_no="WO-1"))
+    entry = json.loads(line)
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "routers.test"
+    assert entry["level"] == "INFO"
+    assert entry["work_order_no"] == "WO-1"
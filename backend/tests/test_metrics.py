@@ -0,0 +1,29 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from utils.metrics import POOL_EXHAUSTED, POOL_TIMEOUTS, TimedQueuePool, _route_template
+
+def scope(route_path, path, **path_params):
+    return {"route": SimpleNamespace(path_format=route_path), "path": path, "path_params": path_params}
+
+def test_route_template_includes_router_prefix():
+    assert _route_template(scope("/{bol_id}", "/api/bol/42", bol_id=42)) == "/api/bol/{bol_id}"
+    assert _route_template(scope("/api/bol/{bol_id}", "/api/bol/42", bol_id=42)) == "/api/bol/{bol_id}"
+    assert _route_template(scope("/", "/api/bol/")) == "/api/bol/"
+
+def test_unmatched_requests_share_one_label():
+    assert _route_template({"path": "/wp-login.php"}) == "unmatched"
+
+def test_pool_exhaustion_and_timeouts_are_counted():
+    pool = TimedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.01)
+    exhausted, timeouts = POOL_EXHAUSTED._value.get(), POOL_TIMEOUTS._value.get()
+    held = pool.connect()
+    with pytest.raises(PoolTimeoutError):
+        pool.connect()
+    held.close()
+    pool.connect().close()
+    assert POOL_EXHAUSTED._value.get() == exhausted + 1
+    assert POOL_TIMEOUTS._value.get() == timeouts + 1
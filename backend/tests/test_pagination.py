@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from models.base import Base
+import models  # noqa: F401  # register every table on Base.metadata
+from models.bill_of_lading import BillOfLading
+from utils.pagination import keyset_paginate
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Every third BOL has no work order, so the NULL run spans pages
+        session.add_all(
+            BillOfLading(driver_name="Driver", date=date(2025, 1, 1 + i % 5), total_amount=1.0,
+                         work_order_no=None if i % 3 == 0 else f"WO-{i * 7 % 20:02d}")
+            for i in range(20)
+        )
+        session.commit()
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        session.info["statements"] = statements
+        yield session
+
+def walk(db, sort_column, descending, limit=4):
+    """Page forward to the end and back to the start; (forward ids, backward ids)"""
+    query = db.query(BillOfLading)
+    pages, cursor = [], ""
+    while cursor is not None:
+        rows, cursor, prev_cursor = keyset_paginate(query, sort_column, BillOfLading.id, "key", descending, cursor, limit)
+        pages.append([row.id for row in rows])
+    backward, cursor = [], prev_cursor
+    while cursor is not None:
+        rows, _, cursor = keyset_paginate(query, sort_column, BillOfLading.id, "key", descending, cursor, limit)
+        backward.insert(0, [row.id for row in rows])
+    return pages, backward
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_nullable_column_pages_through_the_null_run(db, descending):
+    bols = db.query(BillOfLading).all()
+    present = sorted((bol for bol in bols if bol.work_order_no), key=lambda bol: (bol.work_order_no, bol.id), reverse=descending)
+    missing = sorted((bol for bol in bols if not bol.work_order_no), key=lambda bol: bol.id, reverse=descending)
+    expected = [bol.id for bol in present + missing]
+
+    pages, backward = walk(db, BillOfLading.work_order_no, descending)
+
+    assert [row_id for page in pages for row_id in page] == expected
+    assert backward == pages[:-1]
+    # Each query seeks the index: the NULL run is a separate query, never an OR
+    assert not any(" OR bill_of_lading.work_order_no IS NULL" in sql for sql in db.info["statements"])
+
+def test_non_nullable_column_has_no_null_branch(db):
+    pages, _ = walk(db, BillOfLading.date, descending=False)
+
+    assert len(pages) == 5
+    assert not any("IS NULL" in sql or "IS NOT NULL" in sql for sql in db.info["statements"])
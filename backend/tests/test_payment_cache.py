@@ -0,0 +1,63 @@
+import pytest
+
+from utils.payment_cache import PaymentCache
+
+class Loader:
+    def __init__(self, amounts):
+        self.amounts = amounts
+        self.calls = []
+
+    def __call__(self, work_order_nos):
+        self.calls.append(sorted(work_order_nos))
+        return {wo: self.amounts[wo] for wo in work_order_nos if wo in self.amounts}
+
+def test_overlapping_pages_only_load_the_misses():
+    cache = PaymentCache()
+    load = Loader({"WO-1": 10.0, "WO-2": 20.0, "WO-3": 30.0})
+
+    assert cache.get_many(["WO-1", "WO-2"], load) == {"WO-1": 10.0, "WO-2": 20.0}
+    assert cache.get_many(["WO-2", "WO-3", "WO-4"], load) == {"WO-2": 20.0, "WO-3": 30.0, "WO-4": 0.0}
+    assert cache.get_many(["WO-4", "WO-1"], load) == {"WO-4": 0.0, "WO-1": 10.0}
+
+    assert load.calls == [["WO-1", "WO-2"], ["WO-3", "WO-4"]]
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["hit_rate"] == pytest.approx(3 / 7)
+
+def test_invalidate_reloads_the_work_order():
+    cache = PaymentCache()
+    load = Loader({"WO-1": 10.0})
+    cache.get_many(["WO-1"], load)
+
+    load.amounts["WO-1"] = 25.0
+    cache.invalidate("WO-1")
+
+    assert cache.get_many(["WO-1"], load) == {"WO-1": 25.0}
+    assert cache.stats()["invalidations"] == 1
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = PaymentCache()
+
+    def stale_load(work_order_nos):
+        cache.invalidate("WO-1")  # a payment commits while the page is loading
+        return {"WO-1": 10.0}
+
+    assert cache.get_many(["WO-1"], stale_load) == {"WO-1": 10.0}
+    assert cache.stats()["size"] == 0
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PaymentCache(maxsize=2)
+    load = Loader({})
+    cache.get_many(["WO-1"], load)
+    cache.get_many(["WO-2"], load)
+    cache.get_many(["WO-1"], load)
+    cache.get_many(["WO-3"], load)
+
+    cache.get_many(["WO-1", "WO-2"], load)
+    assert load.calls[-1] == ["WO-2"]
+
+def test_entries_expire_after_the_ttl():
+    cache = PaymentCache(ttl=0)
+    load = Loader({"WO-1": 10.0})
+    cache.get_many(["WO-1"], load)
+    cache.get_many(["WO-1"], load)
+    assert len(load.calls) == 2
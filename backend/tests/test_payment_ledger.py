@@ -0,0 +1,66 @@
+import pytest
+
+from models.analytics_rollup import AnalyticsRollup
+from models.bill_of_lading import BillOfLading, BOLVehicle
+from models.work_order_payment import WorkOrderPayment
+from schemas.bill_of_lading import BillOfLadingCreate
+from utils.payment_ledger import rebuild_payment_ledger
+
+def bol_payload(work_order_no, price):
+    return {
+        **dict.fromkeys(BillOfLadingCreate.model_fields),
+        "driver_name": "Ann", "date": "2025-01-30", "work_order_no": work_order_no,
+        "vehicles": [{"year": "2020", "make": "Ford", "model": "F150", "vin": f"{work_order_no}V", "mileage": "1", "price": price}],
+    }
+
+def payment(work_order_no, bol_id, day, amount):
+    return {
+        "date": day, "work_order_no": work_order_no, "collected_amount": amount, "due_amount": 0, "bol_id": bol_id,
+        "pickup_location": "A", "dropoff_location": "B", "payment_type": "Cash",
+    }
+
+def ledger(db):
+    return {
+        row.work_order_no: (row.total_collected, row.due_amount, row.status, row.last_payment_at)
+        for row in db.query(WorkOrderPayment)
+    }
+
+def test_payments_keep_the_ledger_equal_to_a_rebuild(db, client, admin):
+    first = client.post("/api/bol/", json=bol_payload("WO-1", "200")).json()["id"]
+    second = client.post("/api/bol/", json=bol_payload("WO-2", "100")).json()["id"]
+
+    client.post("/api/transactions/", json=payment("WO-1", first, "2025-02-01", 50))
+    latest = client.post("/api/transactions/", json=payment("WO-1", first, "2025-02-09", 30)).json()["id"]
+    moved = client.post("/api/transactions/", json=payment("WO-2", second, "2025-02-05", 100)).json()["id"]
+    # Deleting the latest payment and moving a later one away both roll last_payment_at back
+    assert client.delete(f"/api/transactions/{latest}").status_code == 200
+    assert client.put(f"/api/transactions/{moved}", json=payment("WO-1", first, "2025-01-31", 100)).status_code == 200
+
+    maintained = ledger(db)
+    rebuild_payment_ledger(db)
+
+    assert maintained == ledger(db)
+    assert maintained["WO-1"][:3] == (150.0, 50.0, "pending")
+    assert maintained["WO-1"][3].date().isoformat() == "2025-02-01"
+    assert maintained["WO-2"][3] is None
+
+def test_bol_pages_read_collected_amounts_from_the_ledger(db, client, admin):
+    bol_id = client.post("/api/bol/", json=bol_payload("WO-1", "200")).json()["id"]
+    client.post("/api/transactions/", json=payment("WO-1", bol_id, "2025-02-01", 50))
+    # Drift the ledger away from the transactions: the BOL pages follow the ledger
+    db.query(WorkOrderPayment).update({WorkOrderPayment.total_collected: 80.0})
+    db.commit()
+    client.post("/api/transactions/", json=payment("WO-1", bol_id, "2025-02-02", 10))
+
+    assert client.get(f"/api/bol/{bol_id}").json()["total_collected"] == 90.0
+    assert client.get("/api/bol/").json()[0]["due_amount"] == 110.0
+
+def test_bol_create_commits_nothing_when_a_later_step_fails(db, client, admin, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("rollup write failed")
+    monkeypatch.setattr("routers.bill_of_lading.record_bol", fail)
+
+    with pytest.raises(RuntimeError):
+        client.post("/api/bol/", json=bol_payload("WO-1", "200"))
+
+    assert [db.query(model).count() for model in (BillOfLading, BOLVehicle, WorkOrderPayment, AnalyticsRollup)] == [0, 0, 0, 0]
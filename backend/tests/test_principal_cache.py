@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+import pytest
+
+import utils.principal_cache
+from models.user import User
+from utils.auth import create_access_token
+from utils.principal_cache import principal_cache
+
+@pytest.fixture
+def users(db, client):
+    """Two admins, each with a bearer token that the principal cache has resolved once"""
+    principal_cache.clear()
+    db.add_all([
+        User(id=1, email="admin@example.com", hashed_password="x", is_superuser=True, is_active=True),
+        User(id=2, email="other@example.com", hashed_password="x", is_superuser=True, is_active=True),
+    ])
+    db.commit()
+    headers = {}
+    for user_id, email in ((1, "admin@example.com"), (2, "other@example.com")):
+        token = create_access_token({"sub": email}, expires_delta=timedelta(hours=1))
+        headers[user_id] = {"Authorization": f"Bearer {token}"}
+        assert client.get("/api/auth/users", headers=headers[user_id]).status_code == 200
+    yield headers
+    principal_cache.clear()
+
+def update(client, headers, **changes):
+    user = {"email": "other@example.com", "password": "secret1", "is_superuser": True, "is_active": True, **changes}
+    return client.put("/api/auth/users/2", json=user, headers=headers[1])
+
+def test_cached_token_is_reused(client, users):
+    hits = principal_cache.stats()["hits"]
+    assert client.get("/api/auth/users", headers=users[2]).status_code == 200
+    assert principal_cache.stats()["hits"] == hits + 1
+
+@pytest.mark.parametrize("changes", [{"is_superuser": False}, {"is_active": False}])
+def test_role_change_or_deactivation_stops_the_cached_token(client, users, changes):
+    assert update(client, users, **changes).status_code == 200
+
+    assert client.get("/api/auth/users", headers=users[2]).status_code == 403
+
+def test_delete_stops_the_cached_token(client, users):
+    assert client.delete("/api/auth/users/2", headers=users[1]).status_code == 200
+
+    assert client.get("/api/auth/users", headers=users[2]).status_code == 401
+
+def test_cached_token_expires_after_the_ttl(db, client, users, monkeypatch):
+    # A change the cache is not told about is only seen once the entry expires
+    db.get(User, 2).is_superuser = False
+    db.commit()
+    assert client.get("/api/auth/users", headers=users[2]).status_code == 200
+
+    now = utils.principal_cache.time.time()
+    monkeypatch.setattr(utils.principal_cache.time, "time", lambda: now + principal_cache.ttl + 1)
+    assert client.get("/api/auth/users", headers=users[2]).status_code == 403
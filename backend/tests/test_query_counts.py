@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+from models.bill_of_lading import BillOfLading, BOLVehicle
+from utils.payment_cache import payment_cache
+from utils.payment_ledger import sync_bol_payment
+from utils.signature_store import assign_signatures
+
+def seed(db, count):
+    """Insert `count` BOLs with two vehicles, a signature and a ledger row each"""
+    for i in range(count):
+        bol = BillOfLading(
+            driver_name="Driver",
+            date=date(2025, 1, 1 + i % 28),
+            work_order_no=f"WO-{i}",
+            total_amount=200.0,
+        )
+        bol.vehicles = [
+            BOLVehicle(year="2020", make="Ford", model="F150", vin=f"VIN{i}A", mileage="1", price="100"),
+            BOLVehicle(year="2021", make="Ford", model="F250", vin=f"VIN{i}B", mileage="1", price="100"),
+        ]
+        assign_signatures(db, bol, {"pickup_signature": f"signature-{i}"})
+        db.add(bol)
+        sync_bol_payment(db, bol)
+    db.commit()
+
+@pytest.fixture
+def count_statements(client, admin, statements):
+    """Issue a GET and return the number of SQL statements it executed"""
+    def count_statements(url):
+        payment_cache.clear()
+        statements.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        return len(statements)
+    return count_statements
+
+@pytest.mark.parametrize("page_size", [5, 50])
+def test_list_statement_count_is_independent_of_page_size(db, count_statements, page_size):
+    """BOLs, vehicles, signatures and payments: one query each, however big the page"""
+    seed(db, 50)
+    assert count_statements(f"/api/bol/?limit={page_size}") == 4
+    assert count_statements(f"/api/bol/?limit={page_size}&cursor=") == 4
+
+def test_list_serializes_all_vehicles(db, client, admin):
+    seed(db, 3)
+    response = client.get("/api/bol/")
+    assert [len(bol["vehicles"]) for bol in response.json()] == [2, 2, 2]
+
+def test_detail_statement_count(db, count_statements):
+    seed(db, 1)
+    assert count_statements("/api/bol/1") == 4
+
+def test_projected_detail_skips_payment_lookups(db, count_statements):
+    seed(db, 1)
+    assert count_statements("/api/bol/1?fields=id,date") == 1
+    assert count_statements("/api/bol/?fields=id,date") == 1
+
+@pytest.mark.parametrize("url", ["/api/bol/pending-payments", "/api/transactions/work-orders/pending"])
+def test_pending_payments_statement_count(db, count_statements, url):
+    seed(db, 20)
+    assert count_statements(url) == 1
@@ -0,0 +1,37 @@
+from models.signature_blob import SignatureBlob
+from schemas.bill_of_lading import BillOfLadingCreate
+from utils.signature_store import encode_signature
+
+SHARED = "data:image/png;base64,c2hhcmVk"
+
+def bol_payload(work_order_no, **signatures):
+    return {
+        **dict.fromkeys(BillOfLadingCreate.model_fields),
+        "driver_name": "Ann", "date": "2025-03-04", "work_order_no": work_order_no, **signatures,
+        "vehicles": [{"year": "2020", "make": "Ford", "model": "F150", "vin": f"{work_order_no}V", "mileage": "1", "price": "100"}],
+    }
+
+def stored(db):
+    """Raw bytes of every blob in the store"""
+    db.expire_all()
+    return {blob.data for blob in db.query(SignatureBlob)}
+
+def raw(value):
+    return encode_signature(value)[1]
+
+def test_blobs_no_bol_references_are_removed(db, client, admin):
+    first = client.post("/api/bol/", json=bol_payload("WO-1", pickup_signature=SHARED, delivery_signature="old")).json()["id"]
+    second = client.post("/api/bol/", json=bol_payload("WO-2", receiver_signature=SHARED)).json()["id"]
+    assert stored(db) == {raw(SHARED), raw("old")}
+
+    update = bol_payload("WO-1", pickup_signature=SHARED, delivery_signature="new")
+    assert client.put(f"/api/bol/{first}", json=update).status_code == 200
+    assert stored(db) == {raw(SHARED), raw("new")}
+
+    # The shared blob stays while the other BOL still points at it
+    assert client.delete(f"/api/bol/{first}").status_code == 200
+    assert stored(db) == {raw(SHARED)}
+    assert client.get(f"/api/bol/{second}").json()["receiver_signature"] == SHARED
+
+    assert client.delete(f"/api/bol/{second}").status_code == 200
+    assert stored(db) == set()
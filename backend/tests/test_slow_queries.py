@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine, text
+
+from utils.slow_queries import _explainable, instrument_slow_queries, parameter_shape, slow_query_log
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"email": "a@b.com", "limit": 10}) == {"email": "str", "limit": "int"}
+    assert parameter_shape(("WO-1", 2.5)) == ["str", "float"]
+    assert parameter_shape([("a",), ("b",)], executemany=True) == {"rows": 2, "each": ["str"]}
+
+def test_only_plain_selects_are_explained():
+    assert _explainable("  SELECT * FROM bill_of_lading")
+    assert not _explainable("SELECT * FROM bill_of_lading FOR UPDATE")
+    assert not _explainable("UPDATE bill_of_lading SET remarks = ''")
+
+def test_statements_over_the_threshold_are_recorded(monkeypatch):
+    monkeypatch.setenv("SLOW_QUERY_MS", "0.000001")
+    engine = create_engine("sqlite://")
+    instrument_slow_queries(engine)
+    slow_query_log.clear()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT :value"), {"value": 1})
+
+    [entry] = slow_query_log.entries()
+    assert entry["statement"] == "SELECT ?"
+    assert entry["parameters"] == ["int"]
+    assert entry["route"] is None
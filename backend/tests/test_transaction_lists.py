@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from models.daily_expense import DailyExpense
+from models.transaction import Transaction
+from models.user import User
+
+PAYMENT_TYPES = ["Cash", "Check", "Zelle"]
+
+def seed(db, count):
+    """`count` transactions and daily expenses for user 1 over ten days, one of each for user 2"""
+    db.add_all([
+        User(id=1, email="driver1@example.com", hashed_password="x", full_name="Driver One"),
+        User(id=2, email="driver2@example.com", hashed_password="x", full_name="Driver Two"),
+    ])
+    for i in range(count + 1):
+        user_id = 2 if i == count else 1
+        day = date(2025, 3, 1 + i % 10)
+        db.add(Transaction(
+            date=day, work_order_no=f"WO-{i}", collected_amount=10.0, due_amount=0.0, bol_id=i + 1,
+            pickup_location="A", dropoff_location="B", payment_type=PAYMENT_TYPES[i % 3], user_id=user_id,
+        ))
+        db.add(DailyExpense(
+            date=day, diesel_amount=100.0, diesel_location="X", def_amount=5.0, def_location="X",
+            total=105.0, user_id=user_id,
+        ))
+    db.commit()
+
+@pytest.fixture(autouse=True)
+def driver(db, sign_in):
+    seed(db, 25)
+    return sign_in(1)
+
+def ordered(rows, descending=False):
+    return sorted(((row["date"], row["id"]) for row in rows), reverse=descending)
+
+@pytest.mark.parametrize("url", ["/api/transactions/", "/api/transactions/daily-expenses"])
+def test_skip_limit_pages_in_date_order(client, url):
+    everything = client.get(url).json()
+    page = client.get(url, params={"skip": 10, "limit": 5})
+
+    assert len(everything) == 25
+    assert [(row["date"], row["id"]) for row in everything] == ordered(everything)
+    assert [row["id"] for row in page.json()] == [row["id"] for row in everything[10:15]]
+    assert page.headers["X-Total-Count"] == "25"
+
+@pytest.mark.parametrize("url", ["/api/transactions/", "/api/transactions/daily-expenses"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_pages_match_the_full_list(client, url, sort_order):
+    everything = client.get(url, params={"sort_order": sort_order}).json()
+    pages, cursor = [], ""
+    while cursor is not None:
+        response = client.get(url, params={"cursor": cursor, "limit": 7, "sort_order": sort_order})
+        pages.append([row["id"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    assert [row_id for page in pages for row_id in page] == [row["id"] for row in everything]
+
+    back = client.get(url, params={"cursor": response.headers["X-Prev-Cursor"], "limit": 7, "sort_order": sort_order})
+    assert [row["id"] for row in back.json()] == pages[-2]
+
+@pytest.mark.parametrize("url", ["/api/transactions/", "/api/transactions/daily-expenses"])
+def test_cursor_query_seeks_by_date(client, statements, url):
+    first = client.get(url, params={"cursor": "", "limit": 5})
+    statements.clear()
+    client.get(url, params={"cursor": first.headers["X-Next-Cursor"], "limit": 5})
+
+    page_query = statements[-1]
+    assert ".date >= ?" in page_query
+    assert "IS NULL" not in page_query
+
+@pytest.mark.parametrize("value", ["not-a-date", 20250301, ["2025-03-01"]])
+def test_tampered_cursor_value_is_a_bad_request(client, value):
+    cursor = client.get("/api/transactions/", params={"cursor": "", "limit": 5}).headers["X-Next-Cursor"]
+    payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    tampered = base64.urlsafe_b64encode(json.dumps({**payload, "v": value}).encode()).decode()
+
+    response = client.get("/api/transactions/", params={"cursor": tampered, "limit": 5})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+def test_transactions_filter_by_date_and_payment_type(client):
+    response = client.get("/api/transactions/", params={
+        "from_date": "2025-03-03", "to_date": "2025-03-06", "payment_type": "Zelle",
+    })
+    rows = response.json()
+
+    assert rows
+    assert all("2025-03-03" <= row["date"] <= "2025-03-06" and row["payment_type"] == "Zelle" for row in rows)
+    assert response.headers["X-Total-Count"] == str(len(rows))
+
+def test_daily_expenses_filter_by_date(client):
+    response = client.get("/api/transactions/daily-expenses", params={"from_date": "2025-03-09"})
+
+    assert {row["date"] for row in response.json()} == {"2025-03-09", "2025-03-10"}
+    assert response.headers["X-Total-Count"] == "4"
+
+def test_transactions_filter_by_work_order(client):
+    response = client.get("/api/transactions/", params={"work_order_no": "WO-4"})
+
+    assert [row["work_order_no"] for row in response.json()] == ["WO-4"]
+    assert response.headers["X-Total-Count"] == "1"
@@ -0,0 +1,207 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from models.analytics_rollup import AnalyticsRollup, ROLLUP_DAY, ROLLUP_MONTH
+from models.bill_of_lading import BillOfLading, BOLVehicle
+from models.transaction import Transaction
+
+GRANULARITIES = ["day", "week", "month"]
+METRICS = ["bol_count", "vehicle_count", "billed_amount", "collected_amount"]
+
+# Rows per multi-row upsert
+UPSERT_BATCH = 500
+
+def period_start(day: date, granularity: str) -> date:
+    """First day of the day, week (Monday) or month containing `day`"""
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def period_end(day: date, granularity: str) -> date:
+    """Last day of the day, week (Sunday) or month containing `day`"""
+    if granularity == "month":
+        next_month = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+        return next_month - timedelta(days=1)
+    if granularity == "week":
+        return period_start(day, granularity) + timedelta(days=6)
+    return day
+
+class BOLFacts(NamedTuple):
+    """What a BOL contributes to the rollups, captured before it is edited"""
+    date: Optional[date]
+    driver_name: Optional[str]
+    broker_name: Optional[str]
+    total_amount: Optional[float]
+    vehicle_count: int
+
+def bol_facts(db: Session, bol: BillOfLading, vehicle_count: Optional[int] = None) -> BOLFacts:
+    if vehicle_count is None:
+        vehicle_count = db.query(func.count(BOLVehicle.id)).filter(
+            BOLVehicle.bill_of_lading_id == bol.id
+        ).scalar()
+    return BOLFacts(bol.date, bol.driver_name, bol.broker_name, bol.total_amount, vehicle_count)
+
+def _upsert(db: Session, rows: List[dict]) -> None:
+    """Add the metrics of each row to the stored ones, inserting rows that are missing"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    for offset in range(0, len(rows), UPSERT_BATCH):
+        statement = insert(AnalyticsRollup).values(rows[offset:offset + UPSERT_BATCH])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["granularity", "period_start", "driver_name", "broker_name"],
+            set_={name: getattr(AnalyticsRollup, name) + statement.excluded[name] for name in METRICS},
+        ))
+
+class RollupChanges:
+    """
+    Metric deltas per (day, driver, broker), written to the day and month
+    rollups with one upsert. Adding in SQL, like the payment ledger, keeps
+    concurrent writers from overwriting each other's totals.
+    """
+
+    def __init__(self):
+        self._deltas: Dict[Tuple[date, str, str], Dict[str, float]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    def add(self, day: Optional[date], driver_name: Optional[str], broker_name: Optional[str], **metrics) -> None:
+        if day is None:
+            return
+        deltas = self._deltas[(day, driver_name or "", broker_name or "")]
+        for name, value in metrics.items():
+            deltas[name] += value or 0
+
+    def add_bol(self, facts: BOLFacts, sign: int = 1) -> None:
+        self.add(
+            facts.date, facts.driver_name, facts.broker_name,
+            bol_count=sign,
+            vehicle_count=sign * facts.vehicle_count,
+            billed_amount=sign * (facts.total_amount or 0.0),
+        )
+
+    def add_payment(self, day: date, bol: BillOfLading, amount: float) -> None:
+        self.add(day, bol.driver_name, bol.broker_name, collected_amount=amount)
+
+    def move_payments(self, db: Session, bol_id: int, old: BOLFacts, new: BOLFacts) -> None:
+        """Re-attribute a BOL's payments after its driver or broker changed"""
+        if (old.driver_name, old.broker_name or "") == (new.driver_name, new.broker_name or ""):
+            return
+        for day, amount in db.query(Transaction.date, func.sum(Transaction.collected_amount)).filter(
+            Transaction.bol_id == bol_id
+        ).group_by(Transaction.date):
+            self.add(day, old.driver_name, old.broker_name, collected_amount=-amount)
+            self.add(day, new.driver_name, new.broker_name, collected_amount=amount)
+
+    def apply(self, db: Session) -> int:
+        """Write the deltas in the caller's transaction; returns the rollup rows touched"""
+        rows: Dict[tuple, dict] = {}
+        for (day, driver_name, broker_name), deltas in self._deltas.items():
+            for granularity, period_start in ((ROLLUP_DAY, day), (ROLLUP_MONTH, day.replace(day=1))):
+                key = (granularity, period_start, driver_name, broker_name)
+                row = rows.get(key)
+                if row is None:
+                    row = rows[key] = dict(
+                        granularity=granularity, period_start=period_start,
+                        driver_name=driver_name, broker_name=broker_name,
+                        **dict.fromkeys(METRICS, 0),
+                    )
+                for name, value in deltas.items():
+                    row[name] += value
+        self._deltas.clear()
+        changed = [row for row in rows.values() if any(row[name] for name in METRICS)]
+        if changed:
+            _upsert(db, changed)
+        return len(changed)
+
+def record_bol(db: Session, facts: BOLFacts, sign: int = 1) -> None:
+    changes = RollupChanges()
+    changes.add_bol(facts, sign)
+    changes.apply(db)
+
+def record_payment(db: Session, day: date, bol: BillOfLading, amount: float) -> None:
+    changes = RollupChanges()
+    changes.add_payment(day, bol, amount)
+    changes.apply(db)
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every rollup row from the BOL, vehicle and transaction tables"""
+    changes = RollupChanges()
+    vehicle_counts = select(
+        BOLVehicle.bill_of_lading_id, func.count(BOLVehicle.id).label("vehicles")
+    ).group_by(BOLVehicle.bill_of_lading_id).subquery()
+    bol_rows = db.query(
+        BillOfLading.date,
+        BillOfLading.driver_name,
+        BillOfLading.broker_name,
+        func.count(BillOfLading.id),
+        func.sum(func.coalesce(vehicle_counts.c.vehicles, 0)),
+        func.sum(func.coalesce(BillOfLading.total_amount, 0.0)),
+    ).outerjoin(
+        vehicle_counts, vehicle_counts.c.bill_of_lading_id == BillOfLading.id
+    ).group_by(BillOfLading.date, BillOfLading.driver_name, BillOfLading.broker_name)
+    for day, driver_name, broker_name, bols, vehicles, billed in bol_rows:
+        changes.add(day, driver_name, broker_name, bol_count=bols, vehicle_count=vehicles, billed_amount=billed)
+
+    payment_rows = db.query(
+        Transaction.date,
+        BillOfLading.driver_name,
+        BillOfLading.broker_name,
+        func.sum(Transaction.collected_amount),
+    ).join(
+        BillOfLading, BillOfLading.id == Transaction.bol_id
+    ).group_by(Transaction.date, BillOfLading.driver_name, BillOfLading.broker_name)
+    for day, driver_name, broker_name, collected in payment_rows:
+        changes.add(day, driver_name, broker_name, collected_amount=collected)
+
+    db.execute(delete(AnalyticsRollup))
+    count = changes.apply(db)
+    db.commit()
+    return count
+
+def rollup_series(
+    db: Session,
+    granularity: str,
+    metrics: List[str],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    driver_name: Optional[str] = None,
+    broker_name: Optional[str] = None,
+) -> List[dict]:
+    """
+    Metric totals per period, oldest first. Months are read from the monthly
+    rollup; days and weeks (starting Monday) from the daily one. The rollups
+    only hold whole periods, so `start` must be the first day of one (see
+    period_start); the period containing `end` is the last one, in full.
+    """
+    if start and period_start(start, granularity) != start:
+        raise ValueError(f"start must be the first day of a {granularity}")
+    if end:
+        end = period_end(end, granularity)
+    source = ROLLUP_MONTH if granularity == "month" else ROLLUP_DAY
+    query = db.query(
+        AnalyticsRollup.period_start,
+        *(func.sum(getattr(AnalyticsRollup, name)).label(name) for name in metrics),
+    ).filter(AnalyticsRollup.granularity == source)
+    if start:
+        query = query.filter(AnalyticsRollup.period_start >= start)
+    if end:
+        query = query.filter(AnalyticsRollup.period_start <= end)
+    if driver_name:
+        query = query.filter(AnalyticsRollup.driver_name == driver_name)
+    if broker_name:
+        query = query.filter(AnalyticsRollup.broker_name == broker_name)
+    rows = query.group_by(AnalyticsRollup.period_start).order_by(AnalyticsRollup.period_start).all()
+
+    series: Dict[date, dict] = {}
+    for row in rows:
+        period = period_start(row.period_start, granularity)
+        point = series.setdefault(period, dict({"period": period}, **dict.fromkeys(metrics, 0)))
+        for name in metrics:
+            point[name] += getattr(row, name) or 0
+    return list(series.values())
@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models.bill_of_lading import BillOfLading, BOLVehicle
+from schemas.bill_of_lading import BillOfLadingCreate, BOLVehicleBase
+from utils.analytics import BOLFacts, RollupChanges
+from utils.bol_search import build_search_text
+from utils.invalidation import BOLS, invalidation_bus
+from utils.payment_ledger import insert_ledger_rows
+from utils.signature_store import SIGNATURE_FIELDS, signature_ref, store_signatures
+
+IMPORT_FORMATS = ["csv", "xlsx", "ndjson"]
+
+# BOLs validated, de-duplicated and inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Flat (CSV/XLSX) files carry one vehicle per row in these columns; the BOL
+# columns use the BillOfLadingCreate field names
+VEHICLE_COLUMNS = {f"vehicle_{field}": field for field in BOLVehicleBase.model_fields}
+BOL_FIELDS = [field for field in BillOfLadingCreate.model_fields if field != "vehicles"]
+DATE_FIELDS = ["date", "pickup_date", "delivery_date", "receiver_date"]
+
+def _parse_date(value: Optional[str]):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+def _cell(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+def _csv_rows(file: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    for index, row in enumerate(reader, start=2):
+        yield index, row
+
+def _xlsx_rows(file: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_cell(name) for name in next(rows, ())]
+        for index, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield index, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+def _ndjson_records(file: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    for index, line in enumerate(io.TextIOWrapper(file, encoding="utf-8-sig"), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as e:
+            yield index, e
+
+def _group_flat_rows(rows: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[Tuple[int, Any]]:
+    """
+    Fold one-vehicle-per-row records into BOL payloads. Consecutive rows that
+    share a work order number belong to the same BOL; a row without one is a
+    BOL of its own.
+    """
+    current, current_row, current_wo = None, None, None
+    for index, row in rows:
+        row = {key: _cell(value) for key, value in row.items() if key}
+        work_order_no = row.get("work_order_no")
+        vehicle = {field: row.get(column) or "" for column, field in VEHICLE_COLUMNS.items()}
+        if current is not None and work_order_no and work_order_no == current_wo:
+            current["vehicles"].append(vehicle)
+            continue
+        if current is not None:
+            yield current_row, current
+        current = {field: row.get(field) for field in BOL_FIELDS}
+        current["vehicles"] = [vehicle] if any(vehicle.values()) else []
+        current_row, current_wo = index, work_order_no
+    if current is not None:
+        yield current_row, current
+
+def read_bol_payloads(file: BinaryIO, import_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (source row, BOL payload) pairs; NDJSON lines are already one BOL each"""
+    if import_format == "ndjson":
+        return _ndjson_records(file)
+    rows = _xlsx_rows(file) if import_format == "xlsx" else _csv_rows(file)
+    return _group_flat_rows(rows)
+
+def _validate(payload: Any) -> Tuple[Optional[BillOfLadingCreate], List[str]]:
+    if isinstance(payload, Exception):
+        return None, [f"Invalid JSON: {payload}"]
+    if not isinstance(payload, dict):
+        return None, ["Expected a JSON object"]
+    try:
+        bol = BillOfLadingCreate.model_validate({field: payload.get(field) for field in BOL_FIELDS} | {
+            "vehicles": payload.get("vehicles") or []
+        })
+    except ValidationError as e:
+        return None, [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ]
+    errors = []
+    for field in DATE_FIELDS:
+        try:
+            _parse_date(getattr(bol, field))
+        except ValueError:
+            errors.append(f"{field}: expected YYYY-MM-DD")
+    return bol, errors
+
+def _total_amount(bol: BillOfLadingCreate) -> float:
+    """Sum of the vehicle prices, ignoring ones that are not numbers (as in create)"""
+    total = 0.0
+    for vehicle in bol.vehicles:
+        try:
+            total += float(vehicle.price) if vehicle.price else 0.0
+        except (ValueError, TypeError):
+            pass
+    return total
+
+def _insert_chunk(db: Session, chunk: List[Tuple[int, BillOfLadingCreate]]) -> List[int]:
+    """
+    Insert BOLs, their vehicles, signatures, ledger rows and analytics
+    rollups with multi-row statements. Returns the ids of the new BOLs.
+    """
+    signatures = {
+        field: store_signatures(db, (getattr(bol, field) for _, bol in chunk))
+        for field in SIGNATURE_FIELDS
+    }
+    bol_rows = []
+    for position, (_, bol) in enumerate(chunk):
+        row = {field: getattr(bol, field) for field in BOL_FIELDS if field not in SIGNATURE_FIELDS}
+        for field in DATE_FIELDS:
+            row[field] = _parse_date(row[field])
+        for field in SIGNATURE_FIELDS:
+            row[signature_ref(field)] = signatures[field][position]
+        row["total_amount"] = _total_amount(bol)
+        row["search_text"] = build_search_text(row, bol.vehicles)
+        bol_rows.append(row)
+
+    ids = db.execute(
+        insert(BillOfLading).returning(BillOfLading.id, sort_by_parameter_order=True),
+        bol_rows,
+    ).scalars().all()
+
+    vehicle_rows = [
+        dict(vehicle.model_dump(), bill_of_lading_id=bol_id)
+        for bol_id, (_, bol) in zip(ids, chunk)
+        for vehicle in bol.vehicles
+    ]
+    if vehicle_rows:
+        db.execute(insert(BOLVehicle), vehicle_rows)
+    insert_ledger_rows(db, (
+        (bol_id, row["work_order_no"], row["total_amount"]) for bol_id, row in zip(ids, bol_rows)
+    ))
+    rollups = RollupChanges()
+    for row, (_, bol) in zip(bol_rows, chunk):
+        rollups.add_bol(BOLFacts(row["date"], row["driver_name"], row["broker_name"], row["total_amount"], len(bol.vehicles)))
+    rollups.apply(db)
+    return ids
+
+def import_bols(db: Session, payloads: Iterable[Tuple[int, Any]], chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Validate and insert BOL payloads in chunks, one transaction per chunk.
+    Work orders that already exist (one query per chunk) or repeat within the
+    file are rejected. Returns counts and a per-row error report.
+    """
+    imported = 0
+    errors: List[dict] = []
+    seen_work_orders = set()
+
+    def fail(row: int, work_order_no: Optional[str], messages: List[str]) -> None:
+        errors.append({"row": row, "work_order_no": work_order_no, "errors": messages})
+
+    def flush(pending: List[Tuple[int, BillOfLadingCreate]]) -> None:
+        nonlocal imported
+        work_order_nos = {bol.work_order_no for _, bol in pending if bol.work_order_no}
+        existing = set()
+        if work_order_nos:
+            existing = {
+                work_order_no for (work_order_no,) in db.query(BillOfLading.work_order_no).filter(
+                    BillOfLading.work_order_no.in_(work_order_nos)
+                )
+            }
+        chunk = []
+        for row, bol in pending:
+            if bol.work_order_no in existing:
+                fail(row, bol.work_order_no, [f"Work order number '{bol.work_order_no}' already exists"])
+            else:
+                chunk.append((row, bol))
+        if not chunk:
+            return
+        try:
+            ids = _insert_chunk(db, chunk)
+            db.commit()
+            imported += len(chunk)
+            invalidation_bus.publish(BOLS, *ids)
+        except SQLAlchemyError as e:
+            db.rollback()
+            message = f"Database error: {e.__class__.__name__}: {getattr(e, 'orig', e)}"
+            for row, bol in chunk:
+                fail(row, bol.work_order_no, [message])
+
+    pending: List[Tuple[int, BillOfLadingCreate]] = []
+    for row, payload in payloads:
+        bol, messages = _validate(payload)
+        work_order_no = bol.work_order_no if bol else (payload.get("work_order_no") if isinstance(payload, dict) else None)
+        if not messages and work_order_no:
+            if work_order_no in seen_work_orders:
+                messages = [f"Work order number '{work_order_no}' appears more than once in the file"]
+            seen_work_orders.add(work_order_no)
+        if messages:
+            fail(row, work_order_no, messages)
+            continue
+        pending.append((row, bol))
+        if len(pending) >= chunk_size:
+            flush(pending)
+            pending = []
+    if pending:
+        flush(pending)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"imported": imported, "failed": len(errors), "errors": errors}
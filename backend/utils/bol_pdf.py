@@ -0,0 +1,331 @@
+import base64
+import binascii
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from reportlab.lib.colors import Color
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfgen import canvas
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__, "app.log")
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", "cache/pdf"))
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 2)))
+BOL_PDF_LOGO = os.getenv("BOL_PDF_LOGO")
+
+COMPANY_NAME = "Ideal Transportation Solutions LLC"
+COMPANY_ADDRESS = "16 Palmero Way, Manvel, Texas 77578"
+COMPANY_USDOT = "USDOT NO: 4193929"
+
+BLUE = Color(59 / 255, 130 / 255, 246 / 255)
+LIGHT_BLUE = Color(239 / 255, 246 / 255, 1)
+LIGHT_GRAY = Color(248 / 255, 250 / 255, 252 / 255)
+DIVIDER = Color(200 / 255, 200 / 255, 200 / 255)
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+def _fmt(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%m/%d/%Y")
+    return str(value)
+
+def document_version(updated_at: Optional[datetime], created_at: Optional[datetime]) -> str:
+    """Cache version of a BOL: changes whenever the row is updated"""
+    stamp = updated_at or created_at
+    return stamp.strftime("%Y%m%d%H%M%S%f") if stamp else "0"
+
+def bol_document(bol) -> dict:
+    """Copy the fields the renderer needs into a plain, picklable dict"""
+    fields = [
+        "id", "driver_name", "date", "work_order_no",
+        "broker_name", "broker_address", "broker_phone",
+        "pickup_name", "pickup_address", "pickup_city", "pickup_state", "pickup_zip", "pickup_phone",
+        "delivery_name", "delivery_address", "delivery_city", "delivery_state", "delivery_zip", "delivery_phone",
+        "condition_codes", "remarks",
+        "pickup_agent_name", "pickup_signature", "pickup_date",
+        "delivery_agent_name", "delivery_signature", "delivery_date",
+        "receiver_agent_name", "receiver_signature", "receiver_date",
+    ]
+    doc = {field: getattr(bol, field) for field in fields}
+    doc["vehicles"] = [
+        [v.year, v.make, v.model, v.vin, v.mileage, v.price] for v in bol.vehicles
+    ]
+    doc["updated_at"] = bol.updated_at or bol.created_at
+    doc["version"] = document_version(bol.updated_at, bol.created_at)
+    return doc
+
+def _signature_image(value: Optional[str]) -> Optional[ImageReader]:
+    if not value:
+        return None
+    data = value.split(",", 1)[1] if "," in value else value
+    try:
+        return ImageReader(io.BytesIO(base64.b64decode(data)))
+    except (binascii.Error, ValueError, OSError):
+        return None
+
+class _Page:
+    """Top-down layout helper in millimetres, mirroring the jsPDF report"""
+
+    def __init__(self, pdf: canvas.Canvas):
+        self.pdf = pdf
+        self.page_number = 1
+
+    def _y(self, y: float) -> float:
+        return PAGE_HEIGHT - y * mm
+
+    def text(self, value: str, x: float, y: float, size: int = 12, bold: bool = False, align: str = "left"):
+        self.pdf.setFont("Helvetica-Bold" if bold else "Helvetica", size)
+        self.pdf.setFillColorRGB(0, 0, 0)
+        if align == "center":
+            self.pdf.drawCentredString(x * mm, self._y(y), value)
+        else:
+            self.pdf.drawString(x * mm, self._y(y), value)
+
+    def box(self, y: float, height: float, fill: Color):
+        self.pdf.setStrokeColor(BLUE)
+        self.pdf.setFillColor(fill)
+        self.pdf.roundRect(14 * mm, self._y(y + height), 182 * mm, height * mm, 3 * mm, stroke=1, fill=1)
+
+    def line(self, y: float):
+        self.pdf.setStrokeColor(DIVIDER)
+        self.pdf.line(14 * mm, self._y(y), 196 * mm, self._y(y))
+
+    def image(self, image: ImageReader, x: float, y: float, width: float, height: float):
+        self.pdf.drawImage(image, x * mm, self._y(y + height), width * mm, height * mm, mask="auto")
+
+    def footer_page_number(self):
+        self.text(f"Page {self.page_number}", 105, 280, size=8, align="center")
+
+    def new_page(self) -> float:
+        self.footer_page_number()
+        self.pdf.showPage()
+        self.page_number += 1
+        return 20
+
+    def ensure(self, y: float, limit: float = 250) -> float:
+        return self.new_page() if y > limit else y
+
+def render_bol_pdf(doc: dict) -> bytes:
+    """Render one BOL document (see bol_document) to PDF bytes"""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(f"Bill of Lading {doc['id']}")
+    page = _Page(pdf)
+    y = 10.0
+
+    # Header
+    if BOL_PDF_LOGO and os.path.exists(BOL_PDF_LOGO):
+        page.image(ImageReader(BOL_PDF_LOGO), 5, y, 80, 40)
+        page.text(COMPANY_NAME, 85, y + 12, size=16, bold=True)
+        page.text(COMPANY_ADDRESS, 85, y + 20, size=10)
+        page.text(COMPANY_USDOT, 85, y + 28, size=10)
+        y += 45
+    else:
+        y += 10
+        page.text(COMPANY_NAME, 105, y, size=16, bold=True, align="center")
+        y += 6
+        page.text(COMPANY_ADDRESS, 105, y, size=10, align="center")
+        y += 6
+        page.text(COMPANY_USDOT, 105, y, size=10, align="center")
+        y += 8
+    page.line(y)
+    y += 10
+    page.text("Bill of Lading", 105, y, size=18, bold=True, align="center")
+    y += 15
+
+    # Report details
+    has_broker = doc["broker_name"] or doc["broker_address"] or doc["broker_phone"]
+    page.box(y, 25 + (12 if has_broker else 0), LIGHT_BLUE)
+    y += 8
+    page.text("Driver: " + _fmt(doc["driver_name"]), 20, y, bold=True)
+    page.text("Date: " + _fmt(doc["date"]), 120, y, bold=True)
+    y += 8
+    page.text("Work Order No: " + _fmt(doc["work_order_no"]), 20, y, bold=True)
+    # Rendered PDFs are cached per version, so only what the version covers is printed
+    page.text("Last Updated: " + _fmt(doc["updated_at"]), 120, y, bold=True)
+    y += 8
+    if has_broker:
+        page.text("Broker: " + _fmt(doc["broker_name"]), 20, y, bold=True)
+        page.text("Phone: " + _fmt(doc["broker_phone"]), 120, y, bold=True)
+        y += 6
+        if doc["broker_address"]:
+            page.text("Address: " + _fmt(doc["broker_address"]), 20, y, bold=True)
+            y += 6
+    y += 15
+
+    # Pickup and delivery
+    for title, prefix, fill in (("Pick Up", "pickup", LIGHT_BLUE), ("Delivery", "delivery", LIGHT_GRAY)):
+        y = page.ensure(y)
+        page.box(y, 45, fill)
+        y += 8
+        page.text(title, 20, y, bold=True)
+        y += 8
+        page.text("Name: " + _fmt(doc[f"{prefix}_name"]), 25, y)
+        page.text("Phone: " + _fmt(doc[f"{prefix}_phone"]), 100, y)
+        y += 6
+        page.text("Address: " + _fmt(doc[f"{prefix}_address"]), 25, y)
+        y += 6
+        page.text(
+            "City: " + _fmt(doc[f"{prefix}_city"])
+            + "  State: " + _fmt(doc[f"{prefix}_state"])
+            + "  Zip: " + _fmt(doc[f"{prefix}_zip"]),
+            25, y,
+        )
+        y += 20
+
+    # Vehicles table
+    y = page.ensure(y)
+    rows = [["Year", "Make", "Model", "VIN", "Mileage", "Price"]] + doc["vehicles"]
+    widths = [18, 28, 30, 50, 24, 20]
+    row_height = 8
+    if y + 10 + len(rows) * row_height > 270:
+        y = page.new_page()
+    page.box(y, max(30, len(rows) * row_height) + 10, LIGHT_BLUE)
+    y += 8
+    page.text("Vehicles", 20, y, bold=True)
+    y += 2
+    for index, row in enumerate(rows):
+        if y + row_height > 270:
+            y = page.new_page()
+        x = 20
+        for width, value in zip(widths, row):
+            if index == 0:
+                pdf.setFillColor(BLUE)
+                pdf.rect(x * mm, page._y(y + row_height), width * mm, row_height * mm, stroke=0, fill=1)
+                pdf.setFillColorRGB(1, 1, 1)
+                pdf.setFont("Helvetica-Bold", 9)
+            else:
+                pdf.setFillColorRGB(0, 0, 0)
+                pdf.setFont("Helvetica", 9)
+            pdf.setStrokeColor(DIVIDER)
+            pdf.rect(x * mm, page._y(y + row_height), width * mm, row_height * mm, stroke=1, fill=0)
+            pdf.drawString((x + 1.5) * mm, page._y(y + 5.5), _fmt(value))
+            x += width
+        y += row_height
+    y += 15
+
+    # Condition codes and remarks
+    if doc["condition_codes"]:
+        y = page.ensure(y)
+        page.box(y, 25, LIGHT_GRAY)
+        y += 8
+        page.text("Condition Codes", 20, y, bold=True)
+        y += 8
+        page.text(_fmt(doc["condition_codes"]), 25, y)
+        y += 15
+    if doc["remarks"]:
+        y = page.ensure(y)
+        lines = simpleSplit(_fmt(doc["remarks"]), "Helvetica", 12, 160 * mm)
+        page.box(y, 22 + 5 * len(lines), LIGHT_BLUE)
+        y += 8
+        page.text("Remarks", 20, y, bold=True)
+        y += 8
+        for line in lines:
+            page.text(line, 25, y)
+            y += 5
+        y += 10
+
+    # Signatures
+    y = page.ensure(y)
+    agents = [("Pickup Agent", "pickup"), ("Delivery Agent", "delivery")]
+    if doc["receiver_agent_name"] or doc["receiver_signature"] or doc["receiver_date"]:
+        agents.append(("Receiver Agent", "receiver"))
+    page.box(y, 20 + 25 * len(agents), LIGHT_GRAY)
+    y += 8
+    page.text("Signatures", 20, y, bold=True)
+    y += 8
+    for label, prefix in agents:
+        page.text(f"{label}: " + _fmt(doc[f"{prefix}_agent_name"]), 25, y)
+        page.text("Date: " + _fmt(doc[f"{prefix}_date"]), 100, y)
+        signature = _signature_image(doc[f"{prefix}_signature"])
+        if signature is not None:
+            page.image(signature, 25, y + 4, 40, 16)
+        y += 25
+
+    # Footer
+    page.line(y)
+    y += 8
+    page.text(f"This report was generated by {COMPANY_NAME}", 105, y, size=8, align="center")
+    page.footer_page_number()
+
+    pdf.save()
+    return buffer.getvalue()
+
+class RenderedDocumentCache:
+    """
+    Rendered PDFs on disk, keyed by BOL id and version. Writing a new
+    version removes the older files of the same BOL.
+    """
+
+    def __init__(self, directory: Path = PDF_CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, bol_id: int, version: str) -> Path:
+        return self.directory / f"bol-{bol_id}-{version}.pdf"
+
+    def get(self, bol_id: int, version: str) -> Optional[bytes]:
+        try:
+            return self._path(bol_id, version).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, bol_id: int, version: str, content: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self._path(bol_id, version)
+        # Write to a temp file and rename so readers never see a partial PDF
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(content)
+        os.replace(tmp_name, target)
+        for stale in self.directory.glob(f"bol-{bol_id}-*.pdf"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+
+    def invalidate(self, bol_id: int) -> None:
+        for stale in self.directory.glob(f"bol-{bol_id}-*.pdf"):
+            stale.unlink(missing_ok=True)
+
+pdf_cache = RenderedDocumentCache()
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Process pool for bulk rendering, created on first use"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+def render_documents(docs: List[dict]) -> Dict[int, bytes]:
+    """Render several documents, spreading them across the process pool and caching the results"""
+    if len(docs) == 1:
+        rendered = [render_bol_pdf(docs[0])]
+    else:
+        rendered = list(get_render_pool().map(render_bol_pdf, docs, chunksize=4))
+    results = {}
+    for doc, content in zip(docs, rendered):
+        pdf_cache.put(doc["id"], doc["version"], content)
+        results[doc["id"]] = content
+    logger.info(f"Rendered {len(docs)} BOL PDF(s)")
+    return results
@@ -0,0 +1,177 @@
+import bisect
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.orm import Session
+
+from models.bill_of_lading import BillOfLading
+from utils.invalidation import BOLS, invalidation_bus
+
+# BOL columns that make up the search document, followed by the vehicles'
+SEARCH_FIELDS = [
+    "work_order_no", "driver_name",
+    "broker_name", "broker_address", "broker_phone",
+    "pickup_name", "pickup_address", "pickup_city", "pickup_state", "pickup_zip",
+    "delivery_name", "delivery_address", "delivery_city", "delivery_state", "delivery_zip",
+    "pickup_agent_name", "delivery_agent_name", "receiver_agent_name",
+    "condition_codes", "remarks",
+]
+VEHICLE_SEARCH_FIELDS = ["vin", "make", "model"]
+
+# Shortest query that the trigram index can serve
+MIN_TRIGRAM_QUERY = 3
+
+# Newest matches that Postgres ranks for one search; ranking reads the whole
+# document of each candidate, so a broad term must not rank every BOL
+SEARCH_CANDIDATES = 1000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+def build_search_text(source, vehicles: Iterable = ()) -> str:
+    """
+    Flatten a BOL (ORM object, schema or dict) and its vehicles into the
+    lower-cased document stored in bill_of_lading.search_text
+    """
+    def value(item, field):
+        return item.get(field) if isinstance(item, dict) else getattr(item, field, None)
+
+    parts = [value(source, field) for field in SEARCH_FIELDS]
+    for vehicle in vehicles:
+        parts.extend(value(vehicle, field) for field in VEHICLE_SEARCH_FIELDS)
+    return " ".join(str(part) for part in parts if part).lower()
+
+class InvertedIndex:
+    """
+    In-process token -> BOL id index used where the database has no full-text
+    search (SQLite). Built from search_text on first use; BOLs invalidated by
+    the write endpoints are re-read before the next search. Every query token
+    must match, either exactly or as a prefix of an indexed token; exact
+    matches rank higher.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._tokens_by_id: Dict[int, Set[str]] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+        self._loaded = False
+        self._stale: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def _add(self, bol_id: int, text: Optional[str]) -> None:
+        tokens = set(tokenize(text))
+        self._tokens_by_id[bol_id] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(bol_id)
+        self._sorted_tokens = None
+
+    def _remove(self, bol_id: int) -> None:
+        for token in self._tokens_by_id.pop(bol_id, ()):
+            ids = self._postings.get(token)
+            if ids is not None:
+                ids.discard(bol_id)
+                if not ids:
+                    del self._postings[token]
+        self._sorted_tokens = None
+
+    def ensure_loaded(self, db: Session) -> None:
+        with self._lock:
+            if not self._loaded:
+                for bol_id, text in db.query(BillOfLading.id, BillOfLading.search_text).yield_per(5000):
+                    self._add(bol_id, text)
+                self._loaded = True
+                self._stale.clear()
+            elif self._stale:
+                stale, self._stale = list(self._stale), set()
+                for bol_id in stale:
+                    self._remove(bol_id)
+                for bol_id, text in db.query(BillOfLading.id, BillOfLading.search_text).filter(
+                    BillOfLading.id.in_(stale)
+                ):
+                    self._add(bol_id, text)
+
+    def invalidate(self, *bol_ids: int) -> None:
+        """Mark BOLs as changed or deleted; they are re-read on the next search"""
+        with self._lock:
+            if self._loaded:
+                self._stale.update(bol_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._tokens_by_id.clear()
+            self._sorted_tokens = None
+            self._stale.clear()
+            self._loaded = False
+
+    def _matches(self, term: str) -> Dict[int, int]:
+        """BOL ids matching one query token, scored 2 for an exact token and 1 for a prefix"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        scores: Dict[int, int] = {}
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(term):
+                break
+            weight = 2 if token == term else 1
+            for bol_id in self._postings[token]:
+                if scores.get(bol_id, 0) < weight:
+                    scores[bol_id] = weight
+        return scores
+
+    def search(self, terms: List[str]) -> List[Tuple[int, int]]:
+        """(id, score) pairs matching every term, best first and newest first within a score"""
+        with self._lock:
+            ranked: Optional[Dict[int, int]] = None
+            for term in terms:
+                matches = self._matches(term)
+                if ranked is None:
+                    ranked = matches
+                else:
+                    ranked = {bol_id: score + matches[bol_id] for bol_id, score in ranked.items() if bol_id in matches}
+                if not ranked:
+                    return []
+        return sorted((ranked or {}).items(), key=lambda item: (-item[1], -item[0]))
+
+search_index = InvertedIndex()
+invalidation_bus.subscribe(BOLS, search_index.invalidate, search_index.clear)
+
+def search_bol_ids(db: Session, q: str, skip: int, limit: int) -> List[int]:
+    """
+    Ranked ids of the BOLs matching `q`. On Postgres every token is matched as
+    a prefix against the search_vector tsvector (GIN), and queries long enough
+    for pg_trgm also match anywhere inside search_text (trigram GIN), which
+    covers partial VINs and phone numbers. Only the newest SEARCH_CANDIDATES
+    matches (at least skip + limit) are ranked. Elsewhere the in-process
+    inverted index is used.
+    """
+    terms = tokenize(q)
+    if not terms:
+        return []
+
+    if db.get_bind().dialect.name != "postgresql":
+        search_index.ensure_loaded(db)
+        return [bol_id for bol_id, _ in search_index.search(terms)[skip:skip + limit]]
+
+    search_vector = literal_column("bill_of_lading.search_vector")
+    ts_query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+    phrase = q.strip().lower()
+    conditions = [search_vector.op("@@")(ts_query)]
+    if len(phrase) >= MIN_TRIGRAM_QUERY:
+        conditions.append(BillOfLading.search_text.contains(phrase, autoescape=True))
+
+    candidates = db.query(BillOfLading.id).filter(or_(*conditions)).order_by(
+        BillOfLading.id.desc()
+    ).limit(max(SEARCH_CANDIDATES, skip + limit)).subquery()
+
+    rank = func.ts_rank(search_vector, ts_query)
+    if len(phrase) >= MIN_TRIGRAM_QUERY:
+        rank = rank + func.similarity(BillOfLading.search_text, phrase)
+    rows = db.query(BillOfLading.id).join(candidates, candidates.c.id == BillOfLading.id).order_by(
+        rank.desc(), BillOfLading.id.desc()
+    ).offset(skip).limit(limit).all()
+    return [row.id for row in rows]
@@ -0,0 +1,96 @@
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import Date, cast, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from models.daily_expense import DailyExpense
+from models.user import User
+
+SUMMARY_GROUPS = ["day", "week", "month", "location", "driver"]
+
+def _period(dialect_name: str, column, group_by: str):
+    """First day of the column's week (Monday) or month, computed in SQL"""
+    if group_by == "day":
+        return column
+    if dialect_name == "postgresql":
+        return cast(func.date_trunc(group_by, column), Date)
+    if group_by == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(column, "start of month")
+
+def _filtered(statement, start: Optional[date], end: Optional[date], user_id: Optional[int]):
+    if start:
+        statement = statement.where(DailyExpense.date >= start)
+    if end:
+        statement = statement.where(DailyExpense.date <= end)
+    if user_id is not None:
+        statement = statement.where(DailyExpense.user_id == user_id)
+    return statement
+
+def summarize_daily_expenses(
+    db: Session,
+    group_by: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: Optional[int] = None,
+) -> List[dict]:
+    """
+    Diesel, DEF, other and total spend per group in one GROUP BY; user_id
+    None covers every driver. Grouping by location splits each expense over
+    the places its diesel, DEF and other spend happened, so the total there
+    is the sum of those parts rather than the stored total.
+    """
+    other_amount = func.coalesce(DailyExpense.other_expense_amount, 0.0)
+
+    if group_by == "location":
+        parts = [
+            (DailyExpense.diesel_location, DailyExpense.diesel_amount, literal(0.0), literal(0.0)),
+            (DailyExpense.def_location, literal(0.0), DailyExpense.def_amount, literal(0.0)),
+            (DailyExpense.other_expense_location, literal(0.0), literal(0.0), other_amount),
+        ]
+        spend = union_all(*(
+            _filtered(select(
+                DailyExpense.id.label("expense_id"),
+                location.label("location"),
+                diesel.label("diesel"),
+                def_.label("def_"),
+                other.label("other"),
+            ), start, end, user_id)
+            for location, diesel, def_, other in parts
+        )).subquery()
+        spend_total = spend.c.diesel + spend.c.def_ + spend.c.other
+        rows = db.execute(
+            select(
+                spend.c.location.label("group"),
+                func.count(func.distinct(spend.c.expense_id)).label("expense_count"),
+                func.sum(spend.c.diesel).label("diesel_amount"),
+                func.sum(spend.c.def_).label("def_amount"),
+                func.sum(spend.c.other).label("other_amount"),
+                func.sum(spend_total).label("total_amount"),
+            )
+            .where(spend.c.location.is_not(None), spend.c.location != "", spend_total != 0)
+            .group_by(spend.c.location)
+            .order_by(func.sum(spend_total).desc())
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
+    totals = [
+        func.count(DailyExpense.id).label("expense_count"),
+        func.sum(DailyExpense.diesel_amount).label("diesel_amount"),
+        func.sum(DailyExpense.def_amount).label("def_amount"),
+        func.sum(other_amount).label("other_amount"),
+        func.sum(DailyExpense.total).label("total_amount"),
+    ]
+    if group_by == "driver":
+        statement = select(
+            DailyExpense.user_id, func.coalesce(User.full_name, User.email).label("group"), *totals
+        ).outerjoin(User, User.id == DailyExpense.user_id).group_by(
+            DailyExpense.user_id, User.full_name, User.email
+        ).order_by(func.sum(DailyExpense.total).desc())
+    else:
+        period = _period(db.get_bind().dialect.name, DailyExpense.date, group_by).label("group")
+        statement = select(period, *totals).group_by(period).order_by(period)
+
+    rows = db.execute(_filtered(statement, start, end, user_id)).mappings().all()
+    return [dict(row, group=str(row["group"])) for row in rows]
@@ -0,0 +1,232 @@
+import csv
+import io
+import json
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+EXPORT_FORMATS = ["csv", "ndjson", "xlsx"]
+
+# Rows fetched per server-side cursor round trip
+EXPORT_BATCH_SIZE = 1000
+# Output is buffered up to roughly this many bytes before being sent
+CHUNK_SIZE = 64 * 1024
+
+_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def stream_rows(
+    statement,
+    transform: Optional[Callable[[Session, Sequence[Any]], Iterable[Sequence[Any]]]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Iterator[Sequence[Any]]:
+    """
+    Execute a Core select with a server-side cursor and yield its rows, one
+    batch of `batch_size` in memory at a time. `transform` can enrich each
+    batch (e.g. with one extra query per batch). The session is owned by the
+    generator so it stays open for the lifetime of the streamed response.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield from (transform(db, batch) if transform else batch)
+    finally:
+        db.close()
+
+def _buffered(pieces: Iterable[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    for piece in pieces:
+        buffer.write(piece)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def csv_chunks(columns: List[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    def lines():
+        line = io.StringIO()
+        writer = csv.writer(line)
+        writer.writerow(columns)
+        yield line.getvalue()
+        for row in rows:
+            line.seek(0)
+            line.truncate()
+            writer.writerow(["" if v is None else _plain(v) for v in row])
+            yield line.getvalue()
+    return _buffered(lines())
+
+def ndjson_chunks(columns: List[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    def lines():
+        for row in rows:
+            yield json.dumps(dict(zip(columns, map(_plain, row))), default=str) + "\n"
+    return _buffered(lines())
+
+# Characters that are not allowed in XML 1.0 documents
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _xml_escape(value: str) -> str:
+    value = _ILLEGAL_XML.sub("", value)
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    text = _xml_escape(str(_plain(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _xlsx_row(values: Iterable[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file object that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def xlsx_chunks(columns: List[str], rows: Iterable[Sequence[Any]], sheet_name: str = "Export") -> Iterator[bytes]:
+    """
+    Write a single-sheet XLSX workbook without holding it in memory. The
+    sheet XML is deflated straight into a zip stream that uses data
+    descriptors, so every chunk can be sent as soon as it is produced.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{_xml_escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            def pieces():
+                yield (
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                yield _xlsx_row(columns)
+                for row in rows:
+                    yield _xlsx_row(row)
+                yield "</sheetData></worksheet>"
+
+            for chunk in _buffered(pieces()):
+                sheet.write(chunk)
+                data = sink.drain()
+                if data:
+                    yield data
+    yield sink.drain()
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(
+    rows: Iterable[Sequence[Any]],
+    columns: List[str],
+    filename: str,
+    export_format: str,
+    gzip: bool = False,
+    sheet_name: str = "Export",
+) -> StreamingResponse:
+    """Wrap an iterable of row tuples in a streamed CSV/NDJSON/XLSX download"""
+    if export_format == "xlsx":
+        chunks = xlsx_chunks(columns, rows, sheet_name)
+    elif export_format == "ndjson":
+        chunks = ndjson_chunks(columns, rows)
+    else:
+        chunks = csv_chunks(columns, rows)
+
+    filename = f"{filename}.{export_format}"
+    media_type = _MEDIA_TYPES[export_format]
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from database import SQLALCHEMY_DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Entities whose cached copies writers invalidate, with the keys they publish
+PAYMENTS = "payments"      # work order numbers (utils.payment_cache)
+PRINCIPALS = "principals"  # user ids (utils.principal_cache)
+BOLS = "bols"              # BOL ids (utils.bol_search)
+
+CHANNEL = "cache_invalidation"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD = 7000
+
+class InvalidationBus:
+    """
+    Fans cache invalidations out to every worker process. publish() evicts
+    locally right away and hands the message to the transport, which delivers
+    it to the other workers' buses; subscribers register an `invalidate(*keys)`
+    handler per entity and optionally a `clear()` used when messages may have
+    been missed (e.g. the listener reconnected).
+    """
+
+    def __init__(self, transport: "Transport"):
+        self.transport = transport
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Tuple[Callable, Optional[Callable]]]] = {}
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, entity: str, invalidate: Callable, clear: Optional[Callable] = None) -> None:
+        self._handlers.setdefault(entity, []).append((invalidate, clear))
+
+    def publish(self, entity: str, *keys) -> None:
+        """Invalidate keys of an entity here and on every other worker; call after the commit"""
+        if not keys:
+            return
+        self.dispatch(entity, keys)
+        self.published += 1
+        try:
+            self.transport.send(self.origin, entity, list(keys))
+        except Exception:
+            # The local eviction has happened; other workers fall back on their TTLs
+            logger.exception("Could not publish %s invalidation", entity)
+
+    def dispatch(self, entity: str, keys) -> None:
+        for invalidate, _ in self._handlers.get(entity, ()):
+            invalidate(*keys)
+
+    def receive(self, origin: str, entity: str, keys) -> None:
+        if origin != self.origin:
+            self.received += 1
+            self.dispatch(entity, keys)
+
+    def clear_all(self) -> None:
+        for handlers in self._handlers.values():
+            for _, clear in handlers:
+                if clear is not None:
+                    clear()
+
+    def start(self) -> None:
+        self.transport.start(self)
+
+    def stop(self) -> None:
+        self.transport.stop()
+
+class Transport(ABC):
+    def start(self, bus: InvalidationBus) -> None:
+        pass
+
+    @abstractmethod
+    def send(self, origin: str, entity: str, keys: list) -> None:
+        ...
+
+    def stop(self) -> None:
+        pass
+
+class LoopbackTransport(Transport):
+    """
+    In-memory delivery between the buses started on it. With a single bus
+    (one process, or SQLite) publishing only evicts locally; tests start
+    several buses on one transport to stand in for several workers.
+    """
+
+    def __init__(self):
+        self._buses: List[InvalidationBus] = []
+
+    def start(self, bus: InvalidationBus) -> None:
+        if bus not in self._buses:
+            self._buses.append(bus)
+
+    def send(self, origin: str, entity: str, keys: list) -> None:
+        for bus in list(self._buses):
+            bus.receive(origin, entity, keys)
+
+    def stop(self) -> None:
+        self._buses.clear()
+
+class PostgresTransport(Transport):
+    """
+    NOTIFY on publish, and a daemon thread per worker that LISTENs on its own
+    connection. After losing that connection the subscribers' caches are
+    cleared, since notifications sent in the meantime are gone.
+
+    Publishing only queues the message, so writers (and the event loop under
+    DB_ASYNC) never wait on Postgres; a publisher thread sends the queue over
+    one long-lived connection, reconnecting after an error.
+    """
+
+    def __init__(self, database_url: str, channel: str = CHANNEL, poll_interval: float = 5.0):
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._engine = create_engine(database_url, poolclass=NullPool)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._outbox: "queue.Queue[Optional[Tuple[str, str, list]]]" = queue.Queue()
+        self._publisher: Optional[threading.Thread] = None
+        self._publisher_lock = threading.Lock()
+
+    def send(self, origin: str, entity: str, keys: list) -> None:
+        with self._publisher_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish, name="cache-invalidation-publisher", daemon=True)
+                self._publisher.start()
+        self._outbox.put((origin, entity, keys))
+
+    def _publish(self) -> None:
+        raw = None
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                break
+            origin, entity, keys = message
+            try:
+                if raw is None:
+                    raw = self._engine.raw_connection()
+                    raw.driver_connection.autocommit = True
+                cursor = raw.driver_connection.cursor()
+                for payload in self._payloads(origin, entity, keys):
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                cursor.close()
+            except Exception:
+                # Other workers fall back on their TTLs for this message
+                logger.exception("Could not publish %s invalidation", entity)
+                raw = self._close(raw)
+        self._close(raw)
+
+    @staticmethod
+    def _close(raw) -> None:
+        if raw is not None:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _payloads(origin: str, entity: str, keys: list):
+        """Split the keys over as many notifications as the size limit needs"""
+        empty = len(json.dumps({"o": origin, "e": entity, "k": []}))
+        batch: list = []
+        size = empty
+        for key in keys:
+            key_size = len(json.dumps(key)) + 2
+            if batch and size + key_size > MAX_PAYLOAD:
+                yield json.dumps({"o": origin, "e": entity, "k": batch})
+                batch, size = [], empty
+            batch.append(key)
+            size += key_size
+        if batch:
+            yield json.dumps({"o": origin, "e": entity, "k": batch})
+
+    def start(self, bus: InvalidationBus) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, args=(bus,), name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+        with self._publisher_lock:
+            if self._publisher is not None:
+                # Send what is already queued, then end the publisher
+                self._outbox.put(None)
+                self._publisher.join(timeout=self.poll_interval + 1)
+                self._publisher = None
+
+    def _listen(self, bus: InvalidationBus) -> None:
+        connected_before = False
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = self._engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN "{self.channel}"')
+                if connected_before:
+                    bus.clear_all()
+                connected_before = True
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._deliver(bus, conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Cache invalidation listener lost its connection; reconnecting")
+                self._stop.wait(self.poll_interval)
+            finally:
+                self._close(raw)
+
+    @staticmethod
+    def _deliver(bus: InvalidationBus, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            bus.receive(message["o"], message["e"], message["k"])
+        except Exception:
+            logger.exception("Bad cache invalidation message: %r", payload)
+
+def _default_transport() -> Transport:
+    """CACHE_INVALIDATION=postgres|loopback; defaults to postgres on a Postgres database"""
+    kind = os.getenv("CACHE_INVALIDATION", "").lower()
+    if not kind:
+        kind = "postgres" if SQLALCHEMY_DATABASE_URL.startswith("postgresql") else "loopback"
+    if kind == "postgres":
+        return PostgresTransport(SQLALCHEMY_DATABASE_URL)
+    return LoopbackTransport()
+
+invalidation_bus = InvalidationBus(_default_transport())
@@ -1,30 +1,192 @@
+"""
+Process-wide logging: records are put on a queue by the calling thread and
+formatted and written by a single background listener, so request handlers
+never wait on disk or console I/O.
+
+Environment:
+    LOG_DIR         directory for the log files (default "logs")
+    LOG_LEVEL       root level (default INFO)
+    LOG_LEVELS      per-logger levels, e.g. "routers.auth=WARNING,utils.bol_pdf=DEBUG"
+    LOG_FORMAT      "json" (default) for one JSON object per line, or "text"
+    LOG_RATE_LIMIT  records per second let through per call site below
+                    WARNING (default 20, 0 disables); the rest are counted
+                    and reported on the next record let through
+"""
+import atexit
 import logging
-from pathlib import Path
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most `per_second` records a second through from each call site
+    (logger and line), so a busy endpoint cannot flood the logs. Warnings
+    and errors always pass. The first record after a suppressed run carries
+    the number dropped as `suppressed`.
+    """
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        second = int(record.created)
+        with self._lock:
+            # [second, let through, suppressed]
+            window = self._windows.setdefault((record.name, record.lineno), [second, 0, 0])
+            if window[0] != second:
+                window[0], window[1] = second, 0
+            if window[1] >= self.per_second:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed, window[2] = window[2], 0
+        return True
+
+class ModuleFileHandler(logging.Handler):
+    """Also write the records of selected loggers to their own files (see setup_logger)"""
+
+    def __init__(self, log_dir: Path, formatter: logging.Formatter):
+        super().__init__()
+        self.log_dir = log_dir
+        self.setFormatter(formatter)
+        self._files: Dict[str, logging.Handler] = {}
+
+    def route(self, name: str, log_file: str) -> None:
+        with self.lock:
+            if name not in self._files:
+                handler = logging.FileHandler(self.log_dir / log_file)
+                handler.setFormatter(self.formatter)
+                self._files[name] = handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        handler = self._files.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+    def close(self) -> None:
+        for handler in self._files.values():
+            handler.close()
+        super().close()
+
+class _Pipeline:
+    def __init__(self, queue_handler: logging.Handler, listener, module_files: ModuleFileHandler):
+        self.queue_handler = queue_handler
+        self.listener = listener
+        self.module_files = module_files
+
+_pipeline: Optional[_Pipeline] = None
+_configure_lock = threading.Lock()
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging() -> logging.Handler:
+    """
+    Install the queue handler on the root logger and start the listener.
+    Safe to call repeatedly; only the first call has an effect. Returns the
+    queue handler.
+    """
+    global _pipeline
+    with _configure_lock:
+        if _pipeline is not None:
+            return _pipeline.queue_handler
+
+        log_dir = Path(os.getenv("LOG_DIR", "logs"))
+        log_dir.mkdir(parents=True, exist_ok=True)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+        else:
+            formatter = JsonFormatter()
+
+        app_handler = logging.FileHandler(log_dir / "ideal-transportation.log")
+        error_handler = logging.FileHandler(log_dir / "ideal-transportation.error.log")
+        error_handler.setLevel(logging.ERROR)
+        console_handler = logging.StreamHandler(sys.stdout)
+        module_files = ModuleFileHandler(log_dir, formatter)
+        for handler in (app_handler, error_handler, console_handler):
+            handler.setFormatter(formatter)
+
+        queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(RateLimitFilter(int(os.getenv("LOG_RATE_LIMIT", "20"))))
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue,
+            app_handler, error_handler, console_handler, module_files,
+            respect_handler_level=True,
+        )
+
+        root = logging.getLogger()
+        # Replace whatever basicConfig or an earlier import attached
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        listener.start()
+        _pipeline = _Pipeline(queue_handler, listener, module_files)
+        atexit.register(shutdown_logging)
+        return queue_handler
+
+def shutdown_logging() -> None:
+    """Flush the queue and stop the listener; configure_logging() can start it again"""
+    global _pipeline
+    with _configure_lock:
+        if _pipeline is None:
+            return
+        pipeline, _pipeline = _pipeline, None
+    pipeline.listener.stop()
+    logging.getLogger().removeHandler(pipeline.queue_handler)
+    for handler in pipeline.listener.handlers:
+        handler.close()
 
 def setup_logger(name: str, log_file: str):
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels
-
-    # Create handlers
-    file_handler = logging.FileHandler(log_dir / log_file)
-    console_handler = logging.StreamHandler(sys.stdout)
-
-    # Create formatters
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-
-    return logger 
\ No newline at end of file
+    """
+    Logger `name`, logging through the shared pipeline and additionally to
+    `log_file` in LOG_DIR. Its level comes from LOG_LEVELS, else the root's.
+    """
+    configure_logging()
+    _pipeline.module_files.route(name, log_file)
+    return logging.getLogger(name)
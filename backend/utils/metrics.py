@@ -0,0 +1,229 @@
+"""
+Request and database metrics in Prometheus format.
+
+MetricsMiddleware times every request and records its response size, and
+the engine hooks installed by instrument_engine() count the statements and
+database time spent on its behalf. Served at /metrics by render_metrics().
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory shared by the workers (and cleared on deploy); each
+worker then writes its samples there and /metrics aggregates all of them.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to produce a response",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size",
+    ["method", "route"], buckets=SIZE_BUCKETS,
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per request",
+    ["method", "route"], buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+POOL_EXHAUSTED = Counter(
+    "db_pool_exhausted", "Checkouts that found every connection the pool may open in use",
+)
+POOL_TIMEOUTS = Counter("db_pool_timeouts", "Checkouts that gave up waiting for a connection")
+STATEMENTS = Counter("db_statements", "SQL statements executed, in or out of a request")
+
+# In-process caches, summed over the live workers
+CACHE_SIZE = Gauge("cache_entries", "Entries in an in-process cache", ["cache"], multiprocess_mode="livesum")
+CACHE_LOOKUPS = Counter("cache_lookups", "In-process cache lookups", ["cache", "result"])
+CACHE_INVALIDATIONS = Counter("cache_invalidations", "In-process cache invalidations", ["cache"])
+BUS_MESSAGES = Counter("cache_invalidation_messages", "Invalidation bus messages", ["direction"])
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+
+# Shared by reference with the threadpool thread running a sync endpoint
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        # Nothing idle and no overflow left: this checkout has to wait
+        if self._max_overflow > -1 and self.checkedin() == 0 and self.overflow() >= self._max_overflow:
+            POOL_EXHAUSTED.inc()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+def instrument_engine(engine) -> None:
+    """Count statements and their execution time against the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        STATEMENTS.inc()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+def _route_template(scope) -> str:
+    """
+    Full path template of the matched route, e.g. /api/bol/{bol_id}. Newer
+    FastAPI versions keep included routers nested, so the route's own path
+    lacks the router prefix; that is recovered from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    try:
+        concrete = template.format(**{name: str(value) for name, value in scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope.get("path", "")
+    if path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + template
+    return template
+
+def current_route() -> Optional[str]:
+    """'METHOD /route/template' of the request being handled, if any"""
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    return f"{stats.scope['method']} {_route_template(stats.scope)}"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size and SQL use per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+        size = 0
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            method, route = scope["method"], _route_template(scope)
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+            RESPONSE_SIZE.labels(method, route).observe(size)
+            REQUEST_STATEMENTS.labels(method, route).observe(stats.statements)
+            REQUEST_DB_TIME.labels(method, route).observe(stats.db_seconds)
+            _maybe_refresh_cache_metrics()
+
+# Cache counters already counted into the Prometheus counters, per source
+_reported: Dict[tuple, float] = {}
+_report_lock = threading.Lock()
+# Workers that are not scraped copy their cache statistics this often
+CACHE_REFRESH_SECONDS = 10.0
+_next_refresh = 0.0
+
+def _report(counter, key: tuple, total: float) -> None:
+    previous = _reported.get(key, 0)
+    if total > previous:
+        counter.labels(*key[1:]).inc(total - previous)
+    _reported[key] = total
+
+def refresh_cache_metrics() -> None:
+    """Copy this worker's cache and invalidation bus statistics into the metrics"""
+    from utils.invalidation import invalidation_bus
+    from utils.payment_cache import payment_cache
+    from utils.principal_cache import principal_cache
+
+    with _report_lock:
+        for name, cache in (("payment", payment_cache), ("principal", principal_cache)):
+            stats = cache.stats()
+            CACHE_SIZE.labels(name).set(stats["size"])
+            _report(CACHE_LOOKUPS, ("lookups", name, "hit"), stats["hits"])
+            _report(CACHE_LOOKUPS, ("lookups", name, "miss"), stats["misses"])
+            _report(CACHE_INVALIDATIONS, ("invalidations", name), stats["invalidations"])
+        _report(BUS_MESSAGES, ("bus", "published"), invalidation_bus.published)
+        _report(BUS_MESSAGES, ("bus", "received"), invalidation_bus.received)
+
+def _maybe_refresh_cache_metrics() -> None:
+    global _next_refresh
+    now = time.monotonic()
+    if now >= _next_refresh:
+        _next_refresh = now + CACHE_REFRESH_SECONDS
+        refresh_cache_metrics()
+
+def render_metrics():
+    """(body, content type) of the metrics, aggregated over workers in multiprocess mode"""
+    refresh_cache_metrics()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the aggregate on shutdown"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
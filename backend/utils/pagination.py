@@ -0,0 +1,177 @@
+import base64
+import json
+from datetime import date
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Date, and_, or_
+
+NEXT = "next"
+PREV = "prev"
+
+def encode_cursor(sort_key: str, value: Any, row_id: int, direction: str) -> str:
+    """Pack a keyset position into an opaque, URL-safe cursor"""
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = {"s": sort_key, "v": value, "id": row_id, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _sort_value(value: Any, sort_column) -> Any:
+    """The cursor's sort value as sort_column's Python type; ValueError if it is not one"""
+    if value is None:
+        return None
+    if isinstance(sort_column.type, Date):
+        if not isinstance(value, str):
+            raise ValueError("malformed cursor")
+        return date.fromisoformat(value)
+    expected = sort_column.type.python_type
+    if expected is float:
+        expected = (int, float)
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError("malformed cursor")
+    return value
+
+def decode_cursor(cursor: str, sort_key: str, sort_column) -> dict:
+    """Unpack a cursor produced by encode_cursor for the same sort key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["d"] not in (NEXT, PREV) or not isinstance(payload["id"], int) or not {"s", "v"} <= payload.keys():
+            raise ValueError("malformed cursor")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    if payload["s"] != sort_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pagination cursor does not match the requested sort order"
+        )
+    try:
+        payload["v"] = _sort_value(payload["v"], sort_column)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return payload
+
+def _after(sort_column, id_column, value, row_id: int, descending: bool):
+    """Non-NULL rows strictly after (value, row_id) in the given scan order"""
+    id_after = id_column < row_id if descending else id_column > row_id
+    col_after = sort_column < value if descending else sort_column > value
+    # The top-level range bound is what lets the (sort_column, id) index seek
+    # to the cursor; the OR only decides ties on sort_column == value
+    col_bound = sort_column <= value if descending else sort_column >= value
+    return and_(col_bound, or_(col_after, and_(sort_column == value, id_after)))
+
+def _phases(sort_column, nulls_last: bool) -> List[bool]:
+    """Scan phases in order, True for the run of NULL sort values"""
+    if not getattr(sort_column, "nullable", True):
+        return [False]
+    return [False, True] if nulls_last else [True, False]
+
+def keyset_paginate(
+    query,
+    sort_column,
+    id_column,
+    sort_key: str,
+    descending: bool,
+    cursor: Optional[str],
+    limit: int,
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """
+    Fetch one page of `query` ordered by (sort_column, id_column) starting at
+    `cursor`. The position is applied as a WHERE clause rather than an OFFSET,
+    so deep pages cost the same as the first one when (sort_column, id) is
+    indexed. NULL sort values always come last; for a nullable column they are
+    read as a separate phase, so each query stays a plain range seek.
+
+    Returns (rows, next_cursor, prev_cursor); cursors are None at either end.
+    """
+    state = decode_cursor(cursor, sort_key, sort_column) if cursor else None
+    backwards = bool(state and state["d"] == PREV)
+    # Paging backwards scans in reverse order and flips the page afterwards
+    scan_desc = descending != backwards
+    phases = _phases(sort_column, nulls_last=not backwards)
+
+    value = None
+    if state:
+        value = state["v"]
+        # A cursor inside the NULL run resumes there
+        in_nulls = value is None
+        phases = phases[phases.index(in_nulls):] if in_nulls in phases else []
+
+    sort_order = sort_column.desc() if scan_desc else sort_column.asc()
+    id_order = id_column.desc() if scan_desc else id_column.asc()
+
+    rows: List[Any] = []
+    for index, in_nulls in enumerate(phases):
+        positioned = state is not None and index == 0
+        if in_nulls:
+            phase = query.filter(sort_column.is_(None))
+            if positioned:
+                phase = phase.filter(id_column < state["id"] if scan_desc else id_column > state["id"])
+            phase = phase.order_by(id_order)
+        else:
+            if positioned:
+                phase = query.filter(_after(sort_column, id_column, value, state["id"], scan_desc))
+            elif len(phases) > 1:
+                phase = query.filter(sort_column.isnot(None))
+            else:
+                phase = query
+            phase = phase.order_by(sort_order, id_order)
+        rows.extend(phase.limit(limit + 1 - len(rows)).all())
+        if len(rows) > limit:
+            break
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    def position(row, direction):
+        return encode_cursor(sort_key, getattr(row, sort_column.key), row.id, direction)
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else state is not None
+    next_cursor = position(rows[-1], NEXT) if has_next else None
+    prev_cursor = position(rows[0], PREV) if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def paginate(
+    query,
+    response: Response,
+    sort_column,
+    id_column,
+    sort_key: str,
+    descending: bool,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+) -> List[Any]:
+    """
+    One page of `query` ordered by (sort_column, id_column): keyset paging
+    when `cursor` is given (an empty one means the first page), with the
+    neighbouring cursors in X-Next-Cursor / X-Prev-Cursor, otherwise
+    skip/limit.
+    """
+    if cursor is not None:
+        rows, next_cursor, prev_cursor = keyset_paginate(
+            query, sort_column, id_column, sort_key, descending, cursor, limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if prev_cursor:
+            response.headers["X-Prev-Cursor"] = prev_cursor
+        return rows
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    return query.offset(skip).limit(limit).all()
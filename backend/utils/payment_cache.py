@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.work_order_payment import WorkOrderPayment
+from utils.invalidation import PAYMENTS, invalidation_bus
+
+class PaymentCache:
+    """
+    Bounded LRU of the amount collected per work order, so BOL pages that
+    share work orders share entries. Entries live for at most `ttl` seconds
+    and are dropped as soon as a transaction on their work order is written.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_many(
+        self,
+        work_order_nos: Iterable[str],
+        load: Callable[[Iterable[str]], Dict[str, float]],
+    ) -> Dict[str, float]:
+        """Collected amount per work order, calling `load` once with only the misses"""
+        now = time.time()
+        found: Dict[str, float] = {}
+        missing = []
+        with self._lock:
+            for work_order_no in set(work_order_nos):
+                entry = self._entries.get(work_order_no)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(work_order_no)
+                    found[work_order_no] = entry[1]
+                else:
+                    missing.append(work_order_no)
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self._generation
+        if not missing:
+            return found
+
+        loaded = load(missing)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for work_order_no in missing:
+                # Work orders without a ledger row are cached as nothing collected
+                found[work_order_no] = loaded.get(work_order_no, 0.0)
+                if generation == self._generation:
+                    self._entries[work_order_no] = (expires_at, found[work_order_no])
+                    self._entries.move_to_end(work_order_no)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return found
+
+    def invalidate(self, *work_order_nos: str) -> None:
+        """Forget work orders whose transactions changed (see utils.invalidation)"""
+        with self._lock:
+            for work_order_no in work_order_nos:
+                self._entries.pop(work_order_no, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+payment_cache = PaymentCache(
+    maxsize=int(os.getenv("PAYMENT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PAYMENT_CACHE_TTL", "300")),
+)
+invalidation_bus.subscribe(PAYMENTS, payment_cache.invalidate, payment_cache.clear)
+
+def collected_by_work_order(db: Session, work_order_nos: Iterable[str]) -> Dict[str, float]:
+    """Collected amount per work order from the payment ledger, read through the payment cache"""
+    def load(missing: Iterable[str]) -> Dict[str, float]:
+        rows = db.query(
+            WorkOrderPayment.work_order_no,
+            WorkOrderPayment.total_collected,
+        ).filter(
+            WorkOrderPayment.work_order_no.in_(missing)
+        ).all()
+        return {row.work_order_no: float(row.total_collected or 0.0) for row in rows}
+
+    return payment_cache.get_many(work_order_nos, load)
@@ -0,0 +1,196 @@
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, literal
+from sqlalchemy.orm import Session
+
+from models.bill_of_lading import BillOfLading
+from models.transaction import Transaction
+from models.work_order_payment import (
+    WorkOrderPayment,
+    PAYMENT_STATUS_PAID,
+    PAYMENT_STATUS_PENDING,
+)
+
+def payment_status(total_amount: Optional[float], total_collected: float) -> Optional[str]:
+    """Paid once the collected amount covers the BOL total"""
+    if total_amount is None:
+        return None
+    return PAYMENT_STATUS_PAID if total_collected >= total_amount else PAYMENT_STATUS_PENDING
+
+def _status_expression(total_amount, total_collected):
+    return case(
+        (total_amount.is_(None), None),
+        (total_collected >= total_amount, PAYMENT_STATUS_PAID),
+        else_=PAYMENT_STATUS_PENDING,
+    )
+
+def collected_for_work_order(db: Session, work_order_no: Optional[str]) -> float:
+    """Sum the transactions posted against a work order"""
+    if not work_order_no:
+        return 0.0
+    total = db.query(func.sum(Transaction.collected_amount)).filter(
+        Transaction.work_order_no == work_order_no
+    ).scalar()
+    return float(total or 0.0)
+
+def sync_bol_payment(db: Session, bol: BillOfLading) -> WorkOrderPayment:
+    """
+    Create or refresh the ledger row for a BOL after it is created or its
+    work order / total amount changes. Must be called before the commit so
+    the ledger is written in the same transaction as the BOL.
+    """
+    db.flush()
+    total_collected = collected_for_work_order(db, bol.work_order_no)
+
+    ledger = db.get(WorkOrderPayment, bol.id)
+    if ledger is None:
+        ledger = WorkOrderPayment(bol_id=bol.id)
+        db.add(ledger)
+    ledger.work_order_no = bol.work_order_no
+    ledger.total_amount = bol.total_amount
+    ledger.total_collected = total_collected
+    ledger.due_amount = (bol.total_amount or 0.0) - total_collected
+    ledger.status = payment_status(bol.total_amount, total_collected)
+    return ledger
+
+def insert_ledger_rows(db: Session, bols: Iterable[Tuple[int, Optional[str], Optional[float]]]) -> None:
+    """
+    Bulk variant of sync_bol_payment for freshly inserted BOLs, given as
+    (id, work_order_no, total_amount) tuples: one grouped query for what has
+    already been collected and one multi-row insert.
+    """
+    bols = list(bols)
+    work_order_nos = {work_order_no for _, work_order_no, _ in bols if work_order_no}
+    collected = {}
+    if work_order_nos:
+        collected = dict(db.query(
+            Transaction.work_order_no,
+            func.sum(Transaction.collected_amount)
+        ).filter(
+            Transaction.work_order_no.in_(work_order_nos)
+        ).group_by(Transaction.work_order_no).all())
+
+    rows = []
+    for bol_id, work_order_no, total_amount in bols:
+        total_collected = float(collected.get(work_order_no) or 0.0)
+        rows.append({
+            "bol_id": bol_id,
+            "work_order_no": work_order_no,
+            "total_amount": total_amount,
+            "total_collected": total_collected,
+            "due_amount": (total_amount or 0.0) - total_collected,
+            "status": payment_status(total_amount, total_collected),
+        })
+    if rows:
+        db.execute(insert(WorkOrderPayment), rows)
+
+def apply_payment(db: Session, work_order_no: str, amount: float) -> None:
+    """
+    Add (or, with a negative amount, remove) a payment on the ledger rows of
+    a work order. The totals are adjusted in SQL so concurrent payments on
+    the same work order cannot overwrite each other. Call it once the
+    transaction change is in the session: it is flushed so that
+    last_payment_at is recomputed from the work order's transactions, as
+    rebuild_payment_ledger does, and follows deletes and backdated payments.
+    """
+    if not work_order_no:
+        return
+    db.flush()
+    new_collected = WorkOrderPayment.total_collected + amount
+    last_payment_at = select(func.max(Transaction.date)).where(
+        Transaction.work_order_no == work_order_no
+    ).scalar_subquery()
+    db.query(WorkOrderPayment).filter(
+        WorkOrderPayment.work_order_no == work_order_no
+    ).update({
+        WorkOrderPayment.total_collected: new_collected,
+        WorkOrderPayment.due_amount: func.coalesce(WorkOrderPayment.total_amount, 0.0) - new_collected,
+        WorkOrderPayment.status: _status_expression(WorkOrderPayment.total_amount, new_collected),
+        WorkOrderPayment.last_payment_at: last_payment_at,
+    }, synchronize_session=False)
+
+def rebuild_payment_ledger(db: Session) -> int:
+    """
+    Recompute every ledger row from the transactions table. Used to backfill
+    the ledger and to repair it if it ever drifts. Returns the row count.
+    """
+    collected = select(
+        Transaction.work_order_no.label("work_order_no"),
+        func.sum(Transaction.collected_amount).label("total_collected"),
+        func.max(Transaction.date).label("last_payment_at"),
+    ).group_by(Transaction.work_order_no).subquery()
+
+    total_collected = func.coalesce(collected.c.total_collected, literal(0.0))
+    rows = select(
+        BillOfLading.id,
+        BillOfLading.work_order_no,
+        BillOfLading.total_amount,
+        total_collected,
+        func.coalesce(BillOfLading.total_amount, 0.0) - total_collected,
+        _status_expression(BillOfLading.total_amount, total_collected),
+        collected.c.last_payment_at,
+    ).outerjoin(collected, BillOfLading.work_order_no == collected.c.work_order_no)
+
+    db.query(WorkOrderPayment).delete(synchronize_session=False)
+    db.execute(
+        WorkOrderPayment.__table__.insert().from_select(
+            ["bol_id", "work_order_no", "total_amount", "total_collected",
+             "due_amount", "status", "last_payment_at"],
+            rows,
+        )
+    )
+    db.commit()
+    return db.query(WorkOrderPayment).count()
+
+def get_ledger_for_work_order(db: Session, work_order_no: str):
+    """Return (BOL, ledger row) for a work order, or (None, None) if unknown"""
+    row = db.query(BillOfLading, WorkOrderPayment).outerjoin(
+        WorkOrderPayment, WorkOrderPayment.bol_id == BillOfLading.id
+    ).filter(
+        BillOfLading.work_order_no == work_order_no
+    ).first()
+    if row is None:
+        return None, None
+    return row
+
+def work_order_payment_summary(bol: BillOfLading, ledger: Optional[WorkOrderPayment]) -> dict:
+    """Build the payment-status payload shared by the BOL and transaction routers"""
+    total_collected = ledger.total_collected if ledger else 0.0
+    due_amount = bol.total_amount - total_collected if bol.total_amount else 0.0
+    return {
+        "work_order_no": bol.work_order_no,
+        "total_amount": bol.total_amount,
+        "total_collected": float(total_collected),
+        "due_amount": float(due_amount),
+        "is_fully_paid": due_amount <= 0,
+        "payment_percentage": (total_collected / bol.total_amount * 100) if bol.total_amount else 0
+    }
+
+def list_pending_payments(db: Session) -> list:
+    """BOLs whose collected amount is still below the total, read from the ledger"""
+    pending_bols = db.query(
+        BillOfLading.id,
+        BillOfLading.work_order_no,
+        BillOfLading.driver_name,
+        BillOfLading.date,
+        BillOfLading.total_amount,
+        WorkOrderPayment.total_collected,
+        WorkOrderPayment.due_amount,
+    ).join(
+        WorkOrderPayment, WorkOrderPayment.bol_id == BillOfLading.id
+    ).filter(
+        WorkOrderPayment.status == PAYMENT_STATUS_PENDING
+    ).all()
+
+    return [
+        {
+            "id": bol.id,
+            "work_order_no": bol.work_order_no,
+            "driver_name": bol.driver_name,
+            "date": bol.date,
+            "total_amount": bol.total_amount,
+            "total_collected": float(bol.total_collected),
+            "due_amount": float(bol.due_amount)
+        }
+        for bol in pending_bols
+    ]
@@ -0,0 +1,69 @@
+from datetime import date
+from functools import lru_cache
+from typing import Any, FrozenSet, Iterable, Optional, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, create_model
+
+def _split(value: Optional[str]) -> list:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+def parse_projection(
+    schema: Type[BaseModel],
+    fields: Optional[str],
+    exclude: Optional[str],
+    always: Iterable[str] = ("id",),
+) -> Optional[FrozenSet[str]]:
+    """
+    Resolve `fields=` / `exclude=` query parameters against a response schema.
+    Returns None when neither is given (full response), otherwise the set of
+    field names to return. Unknown names are rejected with a 400.
+    """
+    requested, excluded = _split(fields), _split(exclude)
+    if not requested and not excluded:
+        return None
+
+    known = set(schema.model_fields)
+    unknown = sorted((set(requested) | set(excluded)) - known)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(unknown)}"
+        )
+
+    selected = set(requested) if requested else set(known)
+    selected -= set(excluded)
+    selected |= set(always)
+    return frozenset(selected)
+
+@lru_cache(maxsize=256)
+def projected_model(
+    schema: Type[BaseModel],
+    field_names: FrozenSet[str],
+    date_fields: FrozenSet[str] = frozenset(),
+) -> Type[BaseModel]:
+    """
+    Build (and cache) a model with only the selected fields of `schema`.
+    Fields listed in `date_fields` are typed as dates so ORM date values
+    serialise to the same YYYY-MM-DD strings the full schema produces.
+    """
+    definitions = {}
+    for name in sorted(field_names):
+        annotation = schema.model_fields[name].annotation
+        if name in date_fields:
+            annotation = Optional[date]
+        definitions[name] = (annotation, None)
+    return create_model(
+        f"{schema.__name__}Projection",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+def projected_response(model: Type[BaseModel], data: Any) -> JSONResponse:
+    """Serialise an object, or a list of objects, through a projected model"""
+    if isinstance(data, list):
+        content = [model.model_validate(item).model_dump(mode="json") for item in data]
+    else:
+        content = model.model_validate(data).model_dump(mode="json")
+    return JSONResponse(content=content)
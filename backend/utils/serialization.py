@@ -0,0 +1,35 @@
+from typing import Any, Iterable, List, Optional, Sequence
+
+import orjson
+from fastapi import Response
+
+# Headers set on an endpoint's injected Response that a returned response keeps
+FORWARDED_HEADERS = ("X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count")
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Encode already-shaped data with orjson, bypassing the response_model.
+    Dates become YYYY-MM-DD strings, matching the Pydantic schemas. Use it
+    for large lists whose rows come straight from the database, and keep
+    the response_model on the route for the OpenAPI schema.
+    """
+    result = FastJSONResponse(content=content)
+    if response is not None:
+        for header in FORWARDED_HEADERS:
+            if header in response.headers:
+                result.headers[header] = response.headers[header]
+    return result
+
+def row_dicts(rows: Iterable[Any]) -> List[dict]:
+    """Plain dicts from SQL result rows, keyed by their column labels"""
+    return [dict(row._mapping) for row in rows]
+
+def object_dicts(objects: Iterable[Any], fields: Sequence[str]) -> List[dict]:
+    """Plain dicts of the given attributes of ORM objects"""
+    return [{name: getattr(obj, name) for name in fields} for obj in objects]
@@ -0,0 +1,117 @@
+import base64
+import binascii
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.bill_of_lading import BillOfLading
+from models.signature_blob import SignatureBlob
+
+SIGNATURE_FIELDS = ("pickup_signature", "delivery_signature", "receiver_signature")
+
+_DATA_URL = re.compile(r"^data:([\w.+-]+/[\w.+-]+);base64,(.*)$", re.DOTALL)
+
+def signature_ref(field: str) -> str:
+    """Name of the BillOfLading column holding the blob reference for a signature field"""
+    return f"{field}_sha256"
+
+def encode_signature(value: str) -> Tuple[Optional[str], bytes]:
+    """
+    Split a signature value into (content type, raw bytes). Data URLs are
+    decoded so the store holds the image itself; anything else is kept
+    verbatim so it round-trips unchanged.
+    """
+    match = _DATA_URL.match(value)
+    if match:
+        try:
+            return match.group(1), base64.b64decode(match.group(2), validate=True)
+        except (binascii.Error, ValueError):
+            pass
+    return None, value.encode("utf-8")
+
+def decode_signature(content_type: Optional[str], data: bytes) -> str:
+    """Rebuild the original signature value from a stored blob"""
+    if content_type is None:
+        return data.decode("utf-8")
+    return f"data:{content_type};base64,{base64.b64encode(data).decode()}"
+
+def store_signature(db: Session, value: Optional[str]) -> Optional[str]:
+    """
+    Store a signature and return its SHA-256 reference. Identical signatures
+    share one row; inserting an existing hash is a no-op.
+    """
+    return store_signatures(db, [value])[0]
+
+def _blob_row(value: str) -> dict:
+    content_type, data = encode_signature(value)
+    sha = hashlib.sha256(data).hexdigest()
+    return {"sha256": sha, "content_type": content_type, "data": data, "size": len(data)}
+
+def store_signatures(db: Session, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Store many signatures with one multi-row insert; returns their references in order"""
+    rows = [_blob_row(value) if value else None for value in values]
+    unique = list({row["sha256"]: row for row in rows if row}.values())
+    if unique:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            db.execute(postgresql.insert(SignatureBlob).on_conflict_do_nothing(), unique)
+        elif dialect == "sqlite":
+            db.execute(sqlite.insert(SignatureBlob).on_conflict_do_nothing(), unique)
+        else:
+            existing = load_blobs(db, (row["sha256"] for row in unique))
+            db.add_all(SignatureBlob(**row) for row in unique if row["sha256"] not in existing)
+            db.flush()
+    return [row["sha256"] if row else None for row in rows]
+
+def assign_signatures(db: Session, bol, source) -> None:
+    """Store each signature of `source` (a schema or dict) and point the BOL at it"""
+    for field in SIGNATURE_FIELDS:
+        value = source.get(field) if isinstance(source, dict) else getattr(source, field, None)
+        setattr(bol, signature_ref(field), store_signature(db, value))
+
+def signature_refs(bol) -> Set[str]:
+    """Blob references a BOL currently holds"""
+    return {sha for sha in (getattr(bol, signature_ref(field)) for field in SIGNATURE_FIELDS) if sha}
+
+def release_signatures(db: Session, shas: Iterable[Optional[str]]) -> int:
+    """
+    Delete the blobs among `shas` that no BOL references any more, so the
+    store shrinks when BOLs drop or replace a signature. Returns how many
+    blobs were removed.
+    """
+    candidates = {sha for sha in shas if sha}
+    if not candidates:
+        return 0
+    db.flush()
+    columns = [getattr(BillOfLading, signature_ref(field)) for field in SIGNATURE_FIELDS]
+    referenced = set(db.scalars(union(*(select(column).where(column.in_(candidates)) for column in columns))))
+    orphans = candidates - referenced
+    if orphans:
+        db.query(SignatureBlob).filter(SignatureBlob.sha256.in_(orphans)).delete(synchronize_session=False)
+    return len(orphans)
+
+def load_blobs(db: Session, shas: Iterable[str]) -> Dict[str, SignatureBlob]:
+    """Fetch several blobs in one query"""
+    wanted = {sha for sha in shas if sha}
+    if not wanted:
+        return {}
+    rows = db.query(SignatureBlob).filter(SignatureBlob.sha256.in_(wanted)).all()
+    return {row.sha256: row for row in rows}
+
+def attach_signatures(db: Session, bols, fields: Iterable[str] = SIGNATURE_FIELDS) -> None:
+    """Resolve the signature references of a page of BOLs with a single query"""
+    bols = list(bols)
+    fields = [field for field in SIGNATURE_FIELDS if field in fields]
+    if not fields:
+        return
+    blobs = load_blobs(
+        db, (getattr(bol, signature_ref(field)) for bol in bols for field in fields)
+    )
+    for bol in bols:
+        for field in fields:
+            blob = blobs.get(getattr(bol, signature_ref(field)))
+            setattr(bol, field, decode_signature(blob.content_type, blob.data) if blob else None)
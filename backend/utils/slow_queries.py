@@ -0,0 +1,157 @@
+"""
+Slow-query log. Statements slower than SLOW_QUERY_MS are logged to the
+"sql.slow" logger with their duration, calling route and the shape (not the
+values) of their parameters, and kept in a bounded ring buffer served by
+GET /api/diagnostics/slow-queries.
+
+A sampled fraction (SLOW_QUERY_EXPLAIN_RATE) of slow SELECTs also get their
+plan captured on a background thread: EXPLAIN (ANALYZE, BUFFERS) on
+Postgres, EXPLAIN QUERY PLAN on SQLite. ANALYZE runs the query again, so
+only plain SELECTs are explained, under a statement timeout.
+
+Environment:
+    DB_ECHO                  log every statement (SQLAlchemy echo); off by default
+    SLOW_QUERY_MS            threshold in milliseconds, 0 disables (default 500)
+    SLOW_QUERY_EXPLAIN_RATE  fraction of slow SELECTs to explain (default 0)
+    SLOW_QUERY_BUFFER        slow queries kept for the endpoint (default 100)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from sqlalchemy import event
+
+from utils.metrics import current_route
+
+logger = logging.getLogger("sql.slow")
+
+# Longest statement text kept in the log and the buffer
+MAX_STATEMENT_LENGTH = 4000
+EXPLAIN_TIMEOUT_MS = 30000
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Parameter names and types without their values, e.g. {'id_1': 'int'}"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        rows = len(parameters)
+        return {"rows": rows, "each": parameter_shape(parameters[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+def _explainable(statement: str) -> bool:
+    head = statement.lstrip().upper()
+    return head.startswith("SELECT") and " FOR UPDATE" not in head and " FOR SHARE" not in head
+
+class SlowQueryLog:
+    """Ring buffer of the most recent slow queries, newest last"""
+
+    def __init__(self, maxlen: int = 100):
+        self._entries: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+    def set_plan(self, entry: dict, plan: Optional[List[str]] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry["plan"] = plan
+            entry["plan_error"] = error
+
+    def entries(self) -> List[dict]:
+        with self._lock:
+            return [dict(entry) for entry in self._entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+slow_query_log = SlowQueryLog(maxlen=int(os.getenv("SLOW_QUERY_BUFFER", "100")))
+
+# One background thread runs the sampled EXPLAINs, off the request path
+_explain_pool: Optional[ThreadPoolExecutor] = None
+_explain_pool_lock = threading.Lock()
+
+def _submit_explain(engine, entry: dict, statement: str, parameters: Any) -> None:
+    global _explain_pool
+    with _explain_pool_lock:
+        if _explain_pool is None:
+            _explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+    _explain_pool.submit(_explain, engine, entry, statement, parameters)
+
+def _explain(engine, entry: dict, statement: str, parameters: Any) -> None:
+    try:
+        # Keep the EXPLAIN itself out of the slow-query log
+        with engine.connect().execution_options(slow_query_skip=True) as conn:
+            if engine.dialect.name == "postgresql":
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                explain = "EXPLAIN (ANALYZE, BUFFERS) "
+            else:
+                explain = "EXPLAIN QUERY PLAN "
+            rows = conn.exec_driver_sql(explain + statement, parameters).all()
+            conn.rollback()
+        plan = [" ".join(str(value) for value in row) if len(row) > 1 else str(row[0]) for row in rows]
+        slow_query_log.set_plan(entry, plan)
+    except Exception as e:
+        slow_query_log.set_plan(entry, error=str(e))
+
+def instrument_slow_queries(engine) -> None:
+    """Time each statement on `engine` and record those over SLOW_QUERY_MS"""
+    threshold = float(os.getenv("SLOW_QUERY_MS", "500")) / 1000
+    if threshold <= 0:
+        return
+    explain_rate = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+    # The async engines' sync facade cannot open connections off the event loop
+    explain_supported = engine.dialect.name in ("postgresql", "sqlite") and not engine.dialect.is_async
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if elapsed < threshold or conn.get_execution_options().get("slow_query_skip"):
+            return
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(elapsed * 1000, 1),
+            "route": current_route(),
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "parameters": parameter_shape(parameters, executemany),
+            "plan": None,
+            "plan_error": None,
+        }
+        slow_query_log.add(entry)
+        logger.warning(
+            "Slow query (%.1f ms) from %s: %s", entry["duration_ms"], entry["route"] or "-", entry["statement"],
+            extra={"duration_ms": entry["duration_ms"], "route": entry["route"], "parameters": entry["parameters"]},
+        )
+        if (
+            explain_supported and explain_rate > 0 and not executemany
+            and _explainable(statement) and random.random() < explain_rate
+        ):
+            _submit_explain(engine, entry, statement, parameters)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("slow_query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+def shutdown_explain_pool() -> None:
+    global _explain_pool
+    with _explain_pool_lock:
+        pool, _explain_pool = _explain_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,37 @@
+import re
+from typing import Optional
+
+# Modern (1981+) VINs are 17 characters and never use I, O or Q; older
+# vehicles carry shorter manufacturer serials, which are kept as given
+VIN_LENGTH = 17
+_VIN = re.compile(r"[A-HJ-NPR-Z0-9]{17}")
+_LEGACY_VIN = re.compile(r"[A-Z0-9]{1,16}")
+_SEPARATORS = re.compile(r"[\s\-]+")
+
+def normalize_vin(value: Optional[str]) -> str:
+    """Upper-case a VIN and drop the spaces and dashes people type into it"""
+    return _SEPARATORS.sub("", value or "").upper()
+
+def validate_vin(value: Optional[str]) -> str:
+    """Normalize a VIN, raising ValueError if it cannot be one; empty is allowed"""
+    vin = normalize_vin(value)
+    if not vin:
+        return vin
+    if len(vin) == VIN_LENGTH:
+        if not _VIN.fullmatch(vin):
+            raise ValueError("a 17-character VIN may only use digits and letters other than I, O and Q")
+    elif not _LEGACY_VIN.fullmatch(vin):
+        raise ValueError(f"VIN must be at most {VIN_LENGTH} letters and digits")
+    return vin
+
+def vin_prefix_filter(column, prefix: str, dialect_name: str):
+    """
+    Prefix match that can use an index: LIKE against the varchar_pattern_ops
+    index on Postgres, a range scan on the plain B-tree elsewhere (normalized
+    VINs are plain ASCII letters and digits, all below '~')
+    """
+    if dialect_name == "postgresql":
+        # Callers pass a validated VIN; escaping keeps % and _ literal regardless
+        escaped = prefix.replace("/", "//").replace("%", "/%").replace("_", "/_")
+        return column.like(f"{escaped}%", escape="/")
+    return (column >= prefix) & (column < prefix + "~")
@@ -1,4 +1,5 @@
 import { api } from './auth'
+import { fetchAllPages } from './pagination'
 
 export interface DailyExpenseData {
   id: number
@@ -80,9 +81,9 @@ export const dailyExpenseService = {
       }
       console.log('Request config:', config)
       
-      const response = await api.get('/transactions/daily-expenses/', config)
-      console.log('API Response:', response)
-      return response.data
+      const expenses = await fetchAllPages<DailyExpenseData>('/transactions/daily-expenses/', config)
+      console.log('API Response:', expenses)
+      return expenses
     } catch (error: any) {
       console.error('API Error Details:', {
         status: error.response?.status,
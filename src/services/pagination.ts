@@ -0,0 +1,20 @@
+import { AxiosRequestConfig } from 'axios';
+import { api } from './auth';
+
+// Largest page the list endpoints accept
+const PAGE_SIZE = 1000;
+
+// Follow the keyset cursors of a paginated list endpoint and return every row
+export async function fetchAllPages<T>(url: string, config: AxiosRequestConfig = {}): Promise<T[]> {
+  const rows: T[] = [];
+  let cursor: string | undefined = '';
+  while (cursor !== undefined) {
+    const response = await api.get<T[]>(url, {
+      ...config,
+      params: { ...config.params, limit: PAGE_SIZE, cursor },
+    });
+    rows.push(...response.data);
+    cursor = response.headers['x-next-cursor'] || undefined;
+  }
+  return rows;
+}
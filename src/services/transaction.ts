@@ -1,4 +1,5 @@
 import { api } from './auth';
+import { fetchAllPages } from './pagination';
 
 // Updated interfaces to match new schema
 export interface Transaction {
@@ -84,8 +85,7 @@ export const transactionService = {
     console.log('[transactionService] API Instance BaseURL:', api.defaults.baseURL);
     console.log('[transactionService] Protocol:', window.location.protocol);
     
-    const response = await api.get('/transactions/');
-    return response.data;
+    return fetchAllPages<Transaction>('/transactions/');
   },
 
   async getTransaction(id: number): Promise<Transaction> {